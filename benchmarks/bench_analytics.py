@@ -0,0 +1,30 @@
+"""Benchmarks of the difficulty statistics of the boards"""
+
+import pytest
+
+from analytics import board_stats, table_stats
+from conftest import rounds_for
+from field import Field
+from game_type import GameType
+from topology import TOPOLOGIES
+
+
+def bench_board_stats(benchmark, game_type: GameType):
+    """The statistics of a board on bitboards, checked against the table walk"""
+    field = Field(game_type.width, game_type.height, game_type.mines_prc, seed=1)
+    stats = benchmark.pedantic(
+        board_stats, args=(field,), rounds=rounds_for(game_type), iterations=1
+    )
+    assert stats == table_stats(field)
+
+
+@pytest.mark.parametrize("topology", TOPOLOGIES)
+def bench_table_stats(benchmark, game_type: GameType, topology: str):
+    """The statistics of a board of each topology, visiting every square"""
+    width, height = game_type.width, game_type.height
+    field = Field(width, height, game_type.mines_prc, seed=1, topology=topology)
+    stats = benchmark.pedantic(
+        table_stats, args=(field,), rounds=rounds_for(game_type), iterations=1
+    )
+    assert stats.openings <= stats.three_bv
+    assert stats.largest_opening <= stats.opening_squares
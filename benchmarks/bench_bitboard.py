@@ -0,0 +1,106 @@
+"""Benchmarks of the bitboard field, checked for parity with Field"""
+
+import random
+
+from bitboard_field import BitboardField
+from conftest import rounds_for
+from field import Field
+from game_type import GameType
+
+
+def play_random(field: Field, seed: int, moves: int = 200) -> list[list[int]]:
+    """Plays random reveals and markers.
+
+    Returns:
+        The sorted indexes changed by every move.
+    """
+    rng = random.Random(seed)
+    changes = []
+    for _ in range(moves):
+        x = rng.randrange(field.width)
+        y = rng.randrange(field.height)
+        if rng.random() < 0.2:
+            field.toggle_mine_marker(x, y)
+            changes.append([y * field.width + x])
+        else:
+            changes.append(sorted(field.reveal_square(x, y)))
+    return changes
+
+
+def assert_same_state(field: Field, bitboard: BitboardField) -> None:
+    """Checks that both backends hold the same game"""
+    assert bitboard.count_map == field.count_map
+    assert bytes(bitboard.mask_map) == bytes(field.mask_map)
+    assert bytes(bitboard.flag_map) == bytes(field.flag_map)
+    assert (
+        bitboard.cleared_squares,
+        bitboard.marked_mines,
+        bitboard.total_mines,
+        bitboard.mine_exploded,
+        bitboard.is_cleared(),
+    ) == (
+        field.cleared_squares,
+        field.marked_mines,
+        field.total_mines,
+        field.mine_exploded,
+        field.is_cleared(),
+    )
+    assert bitboard.to_bytes() == field.to_bytes()
+
+
+def bench_bitboard_parity(benchmark, game_type: GameType):
+    """Random games played on both backends, timed on the bitboards"""
+    mines_perc = min(game_type.mines_prc, 5)
+    fields = [
+        Field(game_type.width, game_type.height, mines_perc, seed=seed)
+        for seed in range(3)
+    ]
+    expected = [play_random(field, seed) for seed, field in enumerate(fields)]
+
+    bitboards = [
+        BitboardField(game_type.width, game_type.height, mines_perc, seed=seed)
+        for seed in range(3)
+    ]
+    rounds = iter(range(len(bitboards)))
+
+    def play():
+        seed = next(rounds)
+        return play_random(bitboards[seed], seed)
+
+    first = benchmark.pedantic(play, rounds=1, iterations=1)
+    changes = [first] + [play() for _ in range(len(bitboards) - 1)]
+
+    assert changes == expected
+    for field, bitboard in zip(fields, bitboards):
+        assert_same_state(field, bitboard)
+        restored = BitboardField.from_bytes(field.to_bytes())
+        assert_same_state(field, restored)
+
+
+def bench_bitboard_construction(benchmark, game_type: GameType):
+    """BitboardField creation: planting and counting on bit planes"""
+    benchmark.pedantic(
+        BitboardField,
+        args=(game_type.width, game_type.height, game_type.mines_prc),
+        kwargs={"seed": 1},
+        rounds=rounds_for(game_type),
+        iterations=1,
+    )
+
+
+def bench_bitboard_reveal_cascade(benchmark, game_type: GameType):
+    """Worst case reveal on bitboards: a field without mines cleared from one corner"""
+
+    def setup():
+        return (0, 0), {}
+
+    def reveal(x: int, y: int) -> list[int]:
+        return fields.pop().reveal_square(x, y)
+
+    rounds = rounds_for(game_type, 10)
+    fields = [
+        BitboardField(game_type.width, game_type.height, 0, seed=1)
+        for _ in range(rounds)
+    ]
+    changed = benchmark.pedantic(reveal, setup=setup, rounds=rounds, iterations=1)
+    assert len(changed) == game_type.width * game_type.height
@@ -0,0 +1,74 @@
+"""Benchmarks of the no-guess boards and their pool"""
+
+import time
+
+import pytest
+
+from bitboard_field import BitboardField
+from board_pool import MAX_FAILURES, BoardPool, generate_board
+from engine import GameEngine
+from field import Field
+from game_type import GAME_TYPES, GameType
+from generator import is_solvable, start_square
+
+EASY, MEDIUM = GAME_TYPES[:2]
+
+DENSE = GameType("Dense", 10, 10, 80)
+"""A game type without any no-guess board"""
+
+
+@pytest.mark.parametrize(
+    "game_type", [EASY, MEDIUM], ids=lambda game_type: game_type.name
+)
+def bench_generate_board(benchmark, game_type: GameType):
+    """Finding a no-guess board, planted again from its seed"""
+    seed = benchmark.pedantic(
+        generate_board, args=(game_type, 1), rounds=5, iterations=1
+    )
+    field = Field(game_type.width, game_type.height, game_type.mines_prc, seed=seed)
+    assert is_solvable(field, start_square(game_type))
+
+
+def bench_generate_board_failure(benchmark):
+    """Giving up on a game type without no-guess boards, and on its requests"""
+
+    def generate():
+        with pytest.raises(ValueError):
+            generate_board(DENSE, 1)
+
+    benchmark.pedantic(generate, rounds=1, iterations=1)
+
+    pool = BoardPool([DENSE], boards_per_type=1, workers=1)
+    try:
+        deadline = time.monotonic() + 60
+        while pool.failures.get(DENSE, 0) < MAX_FAILURES:
+            assert time.monotonic() < deadline, "The failures were not retried"
+            time.sleep(0.05)
+        time.sleep(1)
+        assert pool.failures[DENSE] == MAX_FAILURES
+        assert not pool.boards[DENSE]
+    finally:
+        pool.shutdown()
+
+
+def bench_pooled_board_seed(benchmark):
+    """Taking a pooled board, whose recorded seed rebuilds it everywhere"""
+    pool = BoardPool([EASY], workers=1)
+    try:
+        deadline = time.monotonic() + 60
+        while not pool.boards[EASY] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool.boards[EASY], "No board was generated"
+        field = benchmark.pedantic(pool.take, args=(EASY,), rounds=1, iterations=1)
+        seeded = EASY._replace(seed=field.seed)
+        assert pool.take(seeded).mine_map == field.mine_map
+    finally:
+        pool.shutdown()
+
+    width, height, mines_perc = EASY.width, EASY.height, EASY.mines_prc
+    rebuilt = Field(width, height, mines_perc, seed=field.seed)
+    assert rebuilt.mine_map == field.mine_map
+    assert Field.from_bytes(field.to_bytes()).mine_map == field.mine_map
+    assert GameEngine(seeded).field.mine_map == field.mine_map
+    bitboard = BitboardField(width, height, mines_perc, seed=field.seed)
+    assert bytearray(bitboard.mine_map) == field.mine_map
@@ -0,0 +1,54 @@
+"""Benchmarks of the Field generation and game logic"""
+
+from conftest import rounds_for
+from field import Field
+from game_type import GameType
+
+
+def new_field(game_type: GameType, mines_perc: int | None = None) -> Field:
+    """Returns a field of the game type, with a fixed seed"""
+    if mines_perc is None:
+        mines_perc = game_type.mines_prc
+    return Field(game_type.width, game_type.height, mines_perc, seed=1)
+
+
+def bench_field_construction(benchmark, game_type):
+    """Field creation: planting and counting"""
+    benchmark.pedantic(
+        new_field, args=(game_type,), rounds=rounds_for(game_type), iterations=1
+    )
+
+
+def bench_plant_mines(benchmark, game_type):
+    """Planting the mines of an empty field"""
+    field = new_field(game_type)
+
+    def setup():
+        field.mine_map = bytearray(field.width * field.height)
+
+    benchmark.pedantic(
+        field.plant_mines, setup=setup, rounds=rounds_for(game_type), iterations=1
+    )
+
+
+def bench_setup_mine_count(benchmark, game_type):
+    """Counting the neighbour mines of every square"""
+    field = new_field(game_type)
+    benchmark.pedantic(
+        field.setup_mine_count, rounds=rounds_for(game_type), iterations=1
+    )
+
+
+def bench_reveal_cascade(benchmark, game_type):
+    """Worst case reveal: a field without mines cleared from one corner"""
+
+    def setup():
+        return (0, 0), {}
+
+    def reveal(x: int, y: int) -> list[int]:
+        return fields.pop().reveal_square(x, y)
+
+    rounds = rounds_for(game_type, 10)
+    fields = [new_field(game_type, 0) for _ in range(rounds)]
+    changed = benchmark.pedantic(reveal, setup=setup, rounds=rounds, iterations=1)
+    assert len(changed) == game_type.width * game_type.height
@@ -0,0 +1,65 @@
+"""Benchmarks of the undo history"""
+
+from conftest import rounds_for
+from field import Field
+from game_type import GameType
+from history import History
+from journal import JournalWriter, restore
+
+
+def bench_history_mark(benchmark, game_type: GameType):
+    """A marker recorded, undone and redone: the cost does not grow with the board"""
+    field = Field(game_type.width, game_type.height, game_type.mines_prc, seed=1)
+    history = History(field)
+    x, y = field.width // 2, field.height // 2
+
+    def mark_undo_redo():
+        field.toggle_mine_marker(x, y)
+        history.record([y * field.width + x])
+        history.undo()
+        return history.redo()
+
+    changed = benchmark(mark_undo_redo)
+    assert changed == [y * field.width + x]
+
+
+def bench_history_cascade(benchmark, game_type: GameType):
+    """Undoing and redoing a reveal of the whole field"""
+    field = Field(game_type.width, game_type.height, 0, seed=1)
+    history = History(field, max_bytes=1 << 30)
+    history.record(field.reveal_square(0, 0))
+
+    def undo_redo():
+        history.undo()
+        return history.redo()
+
+    changed = benchmark.pedantic(undo_redo, rounds=rounds_for(game_type), iterations=1)
+    assert len(changed) == field.width * field.height
+    assert field.is_cleared()
+
+
+def bench_history_journal(benchmark, game_type: GameType, tmp_path):
+    """A marker undone and redone, journaled as its page and restored"""
+    field = Field(game_type.width, game_type.height, game_type.mines_prc, seed=1)
+    history = History(field)
+    path = tmp_path / "game.journal"
+    journal = JournalWriter(path, field)
+    snapshot_size = path.stat().st_size
+    x, y = field.width // 2, field.height // 2
+    field.toggle_mine_marker(x, y)
+    journal.record(1, x, y)
+    history.record([y * field.width + x])
+
+    def undo_redo():
+        journal.record_undo(history.undo())
+        journal.record_undo(history.redo())
+
+    benchmark.pedantic(undo_redo, rounds=rounds_for(game_type), iterations=1)
+    journal.record_undo(history.undo())
+    journal.close()
+    assert path.stat().st_size < 2 * snapshot_size + 100
+    restored = restore(path)
+    assert restored.field.flag_map == field.flag_map
+    assert restored.field.mask_map == field.mask_map
+    assert restored.field.marked_mines == field.marked_mines == 0
+    assert restore(path, from_start=True).field.flag_map == field.flag_map
@@ -0,0 +1,114 @@
+"""Benchmarks of the MinesGrid widget, driven headlessly by the Textual pilot"""
+
+import asyncio
+
+from textual.app import App, ComposeResult
+from textual.events import MouseMove
+from textual.geometry import Region
+
+from conftest import rounds_for
+from field import MARK, Field
+from game_type import GameType
+from mines_grid import MinesGrid
+
+TERMINAL_SIZE = (200, 60)
+
+
+class GridApp(App):
+    """An application showing only a MinesGrid"""
+
+    CSS_PATH = "../src/mines_grid.css"
+
+    def compose(self) -> ComposeResult:
+        yield MinesGrid()
+
+
+def run_with_grid(game_type: GameType, run) -> None:
+    """Mounts a MinesGrid playing a half revealed field and calls run(grid)"""
+
+    async def main():
+        app = GridApp()
+        async with app.run_test(size=TERMINAL_SIZE) as pilot:
+            field = Field(
+                game_type.width, game_type.height, game_type.mines_prc, seed=1
+            )
+            for index in range(0, field.width * field.height, 2):
+                if not field.mine_map[index]:
+                    field.reveal_square(*reversed(divmod(index, field.width)))
+            grid = app.query_one(MinesGrid)
+            grid.field = field
+            grid.active = True
+            await pilot.pause()
+            run(grid)
+
+    asyncio.run(main())
+
+
+def visible_region(grid: MinesGrid) -> Region:
+    """Returns the region of the grid shown on the terminal"""
+    return Region(0, 0, grid.size.width, grid.size.height)
+
+
+def bench_send_counters(benchmark, game_type):
+    """Reading the counters and notifying the header"""
+    run_with_grid(game_type, lambda grid: benchmark(grid.send_counters))
+
+
+def bench_apply_actions_batch(benchmark, game_type):
+    """A batch of markers toggled twice, notified once"""
+
+    def run(grid: MinesGrid):
+        width = min(grid.field.width, 32)
+        actions = [(MARK, x, 0) for x in range(width)] * 2
+
+        benchmark(grid.apply_actions, actions)
+
+    run_with_grid(game_type, run)
+
+
+def bench_render_full(benchmark, game_type):
+    """Rendering every visible line from scratch"""
+
+    def run(grid: MinesGrid):
+        def render():
+            grid.refresh()
+            grid.refresh_rows(*range(grid.field.height))
+            return grid.render_lines(visible_region(grid))
+
+        benchmark.pedantic(render, rounds=rounds_for(game_type, 50), iterations=1)
+
+    run_with_grid(game_type, run)
+
+
+def bench_render_cursor_move(benchmark, game_type):
+    """Rendering after the cursor moved one square"""
+
+    def run(grid: MinesGrid):
+        grid.render_lines(visible_region(grid))
+
+        def move_and_render():
+            grid.cursor_x = (grid.cursor_x + 1) % min(grid.field.width, grid.size.width)
+            return grid.render_lines(visible_region(grid))
+
+        benchmark(move_and_render)
+
+    run_with_grid(game_type, run)
+
+
+def bench_mouse_sweep(benchmark, game_type):
+    """The mouse moved across a row of the grid within one screen update"""
+
+    def run(grid: MinesGrid):
+        width = min(grid.field.width, grid.size.width)
+        events = [MouseMove(x, 1, 1, 0, 0, False, False, False) for x in range(width)]
+
+        def sweep():
+            grid.on_mouse_move(events[0])
+            for event in events:
+                grid.on_mouse_move(event)
+            grid.follow_mouse()
+            grid.refresh_cursor()
+
+        benchmark.pedantic(sweep, rounds=50, iterations=1)
+
+    run_with_grid(game_type, run)
@@ -0,0 +1,92 @@
+"""Benchmarks of the results store"""
+
+import random
+from pathlib import Path
+
+import pytest
+
+from game_type import GAME_TYPES
+from results import (
+    GameResult,
+    ResultsWriter,
+    best_times,
+    connect,
+    insert_results,
+    preset_totals,
+)
+
+STORED_GAMES = 200_000
+"""The number of games of the store queried by the leaderboard benchmarks"""
+
+
+def random_results(count: int, seed: int = 1) -> list[GameResult]:
+    """Returns the results of random games of the presets"""
+    rng = random.Random(seed)
+    return [
+        GameResult(
+            rng.choice(GAME_TYPES).name,
+            rng.getrandbits(64),
+            rng.randrange(1_000, 600_000),
+            rng.randrange(1, 500),
+            rng.randrange(1, 300),
+            rng.random() < 0.4,
+            1.7e9 + index,
+        )
+        for index in range(count)
+    ]
+
+
+@pytest.fixture(scope="module")
+def stored_games(tmp_path_factory) -> Path:
+    """A store of many games"""
+    path = tmp_path_factory.mktemp("results") / "results.sqlite3"
+    connection = connect(path)
+    insert_results(connection, random_results(STORED_GAMES))
+    connection.close()
+    return path
+
+
+def bench_results_writer(benchmark, tmp_path: Path):
+    """Recording games from the game thread, until written in batches"""
+    results = random_results(10_000)
+    writer = ResultsWriter(tmp_path / "results.sqlite3")
+
+    def record_all():
+        for result in results:
+            writer.record(result)
+        writer.flush()
+
+    benchmark.pedantic(record_all, rounds=5, iterations=1)
+    writer.close()
+    connection = connect(tmp_path / "results.sqlite3")
+    (games,) = connection.execute("SELECT COUNT(*) FROM results").fetchone()
+    assert games and games % len(results) == 0
+    assert sum(totals.games for totals in preset_totals(connection)) == games
+    connection.close()
+
+
+def bench_leaderboard_queries(benchmark, stored_games: Path):
+    """The queries of the leaderboard screen, which do not grow with the games"""
+    connection = connect(stored_games)
+
+    def leaderboard():
+        totals = preset_totals(connection)
+        return totals, [best_times(connection, preset.game_type) for preset in totals]
+
+    totals, best = benchmark(leaderboard)
+    assert sum(preset.games for preset in totals) == STORED_GAMES
+    for preset, results in zip(totals, best):
+        (wins,) = connection.execute(
+            "SELECT COUNT(*) FROM results WHERE game_type = ? AND won = 1",
+            (preset.game_type,),
+        ).fetchone()
+        assert preset.wins == wins
+        fastest = connection.execute(
+            "SELECT MIN(duration_ms) FROM results WHERE game_type = ? AND won",
+            (preset.game_type,),
+        ).fetchone()[0]
+        assert results[0].duration_ms == fastest
+        assert [result.duration_ms for result in results] == sorted(
+            result.duration_ms for result in results
+        )
+    connection.close()
@@ -0,0 +1,102 @@
+"""Benchmarks of the spectator feed"""
+
+from conftest import rounds_for
+from engine import GameStatus
+from field import Field
+from game_type import GameType
+from server import FRAME, cell_value
+from spectate import BoardView
+from spectator import (
+    FEED_DELTA_HEADER,
+    KEYFRAME_INTERVAL,
+    KEYFRAME_MIN_INTERVAL,
+    SpectatorFeed,
+)
+
+
+def replay(frames: list[bytes]) -> BoardView:
+    """Returns the view of a viewer that received the frames"""
+    view = BoardView(200, 60)
+    for frame in frames:
+        kind, _ = FRAME.unpack_from(frame)
+        view.apply(kind, frame[FRAME.size :])
+    return view
+
+
+def bench_feed_mark(benchmark, game_type: GameType):
+    """The frame of a marker: a few bytes whatever the size of the field"""
+    field = Field(game_type.width, game_type.height, game_type.mines_prc, seed=1)
+    feed = SpectatorFeed(1, field)
+    x, y = field.width // 2, field.height // 2
+
+    def mark() -> bytes:
+        field.toggle_mine_marker(x, y)
+        return feed.publish([y * field.width + x], GameStatus.PLAYING)
+
+    frame = benchmark(mark)
+    # The index of the square takes at most six bytes, on fields up to 2**38
+    assert len(frame) <= FRAME.size + FEED_DELTA_HEADER.size + 6
+
+
+def bench_feed_keyframes(benchmark, game_type: GameType):
+    """Marking squares one by one: the small deltas do not take a keyframe
+    at every move while the keyframe is small"""
+    field = Field(game_type.width, game_type.height, game_type.mines_prc, seed=1)
+    feed = SpectatorFeed(1, field)
+    squares = range(min(KEYFRAME_INTERVAL, field.width * field.height))
+
+    def marks() -> int:
+        keyframes = 0
+        for index in squares:
+            y, x = divmod(index, field.width)
+            field.toggle_mine_marker(x, y)
+            feed.publish([index], GameStatus.PLAYING)
+            keyframes += not feed.deltas
+        return keyframes
+
+    keyframes = benchmark.pedantic(marks, rounds=rounds_for(game_type), iterations=1)
+    assert keyframes <= len(squares) // KEYFRAME_MIN_INTERVAL
+
+
+def bench_feed_cascade(benchmark, game_type: GameType):
+    """Publishing a reveal of the whole field, replayed by a viewer"""
+
+    def setup():
+        field = Field(game_type.width, game_type.height, 0, seed=1)
+        feed = SpectatorFeed(1, field)
+        return (feed, field.reveal_square(0, 0)), {}
+
+    def publish(feed: SpectatorFeed, changed: list[int]) -> bytes:
+        return feed.publish(changed, GameStatus.WON)
+
+    frame = benchmark.pedantic(
+        publish, setup=setup, rounds=rounds_for(game_type, 10), iterations=1
+    )
+    squares = game_type.width * game_type.height
+    # One byte per cell of a cascade
+    assert len(frame) == FRAME.size + FEED_DELTA_HEADER.size + squares
+    empty = SpectatorFeed(1, Field(game_type.width, game_type.height, 0, seed=1))
+    view = replay([empty.keyframe, frame])
+    assert view.cells == dict.fromkeys(range(squares), 0)
+
+
+def bench_view_catch_up(benchmark, game_type: GameType):
+    """A viewer joining a game: the keyframe and the deltas, then a repaint"""
+    field = Field(game_type.width, game_type.height, game_type.mines_prc, seed=1)
+    feed = SpectatorFeed(1, field)
+    for index in range(0, field.width * field.height, 7):
+        y, x = divmod(index, field.width)
+        if field.mine_map[index]:
+            field.toggle_mine_marker(x, y)
+            feed.publish([index], GameStatus.PLAYING)
+        elif field.mask_map[index]:
+            feed.publish(field.reveal_square(x, y), GameStatus.PLAYING)
+
+    def catch_up() -> BoardView:
+        view = replay(feed.catch_up())
+        view.render()
+        return view
+
+    view = benchmark.pedantic(catch_up, rounds=rounds_for(game_type), iterations=1)
+    played = {index: cell_value(field, index) for index in field.played_squares()}
+    assert view.cells == played
@@ -0,0 +1,65 @@
+"""Benchmarks of the neighbour tables of the topologies"""
+
+import pytest
+
+from conftest import rounds_for
+from field import Field
+from game_type import GameType
+from mine_count import count_mines_batched, count_mines_table
+from topology import (
+    RECTANGLE,
+    TOPOLOGIES,
+    build_neighbour_table,
+    neighbour_table,
+    square_neighbours,
+)
+
+
+def bench_rectangle_table_parity(benchmark, game_type: GameType):
+    """The rectangle table counts the mines like the batched counting"""
+    width, height = game_type.width, game_type.height
+    field = Field(width, height, game_type.mines_prc, seed=1)
+    table = neighbour_table(RECTANGLE, width, height)
+    count_map = benchmark.pedantic(
+        count_mines_table,
+        args=(field.mine_map, table),
+        rounds=rounds_for(game_type),
+        iterations=1,
+    )
+    assert count_map == count_mines_batched(field.mine_map, width, height)
+
+
+@pytest.mark.parametrize("topology", TOPOLOGIES)
+def bench_neighbour_table(benchmark, game_type: GameType, topology: str):
+    """Building the table of a field shape, without the cache"""
+    width, height = game_type.width, game_type.height
+    table = benchmark.pedantic(
+        build_neighbour_table,
+        args=(topology, width, height),
+        rounds=rounds_for(game_type, 5),
+        iterations=1,
+    )
+    offsets, indexes = table
+    for index in range(0, width * height, max(width * height // 1000, 1)):
+        y, x = divmod(index, width)
+        neighbours = list(indexes[offsets[index] : offsets[index + 1]])
+        assert neighbours == square_neighbours(topology, width, height, x, y)
+
+
+@pytest.mark.parametrize("topology", TOPOLOGIES)
+def bench_topology_reveal_cascade(benchmark, game_type: GameType, topology: str):
+    """Worst case reveal of each topology: a field without mines"""
+
+    def setup():
+        return (0, 0), {}
+
+    def reveal(x: int, y: int) -> list[int]:
+        return fields.pop().reveal_square(x, y)
+
+    rounds = rounds_for(game_type, 10)
+    fields = [
+        Field(game_type.width, game_type.height, 0, seed=1, topology=topology)
+        for _ in range(rounds)
+    ]
+    changed = benchmark.pedantic(reveal, setup=setup, rounds=rounds, iterations=1)
+    assert len(changed) == game_type.width * game_type.height
@@ -0,0 +1,53 @@
+"""Compares the batched and the scalar neighbour mine counting.
+
+Usage: python benchmarks/compare_mine_count.py
+"""
+
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+# pylint: disable=wrong-import-position
+from mine_count import count_mines_batched, count_mines_scalar
+
+SIZES = [(10, 10), (30, 15), (60, 20), (300, 100), (1000, 1000), (2000, 2000)]
+MINES_PERC = 21
+
+
+def random_mine_map(width: int, height: int) -> bytearray:
+    """Returns a random mine map"""
+    squares_count = width * height
+    mine_map = bytearray(squares_count)
+    for coord in random.sample(range(squares_count), squares_count * MINES_PERC // 100):
+        mine_map[coord] = 1
+    return mine_map
+
+
+def best_of(func, repeat: int) -> float:
+    """Returns the best run time of func, in seconds"""
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    """Run the benchmark"""
+    print(f"{'size':>12} {'scalar ms':>12} {'batched ms':>12} {'speedup':>9}")
+    for width, height in SIZES:
+        mine_map = random_mine_map(width, height)
+        expected = count_mines_scalar(mine_map, width, height)
+        if count_mines_batched(mine_map, width, height) != expected:
+            raise AssertionError(f"Mine counts differ for {width}x{height}")
+
+        repeat = 5 if width * height <= 100_000 else 1
+        scalar = best_of(lambda: count_mines_scalar(mine_map, width, height), repeat)
+        batched = best_of(lambda: count_mines_batched(mine_map, width, height), repeat)
+        print(
+            f"{f'{width}x{height}':>12} {scalar * 1000:>12.2f} "
+            f"{batched * 1000:>12.2f} {scalar / batched:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
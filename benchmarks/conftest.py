@@ -0,0 +1,49 @@
+"""Shared setup of the benchmark suite.
+
+Run from the repository root:
+    pytest benchmarks --benchmark-autosave
+        runs the suite and stores the results as a new baseline
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:15%
+        compares with the latest baseline and fails on a regression
+    pytest benchmarks -m "not huge"
+        skips the synthetic huge boards
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+# pylint: disable=wrong-import-position
+from game_type import GAME_TYPES, GameType
+
+HUGE_GAME_TYPES = [
+    GameType("Huge500", 500, 500, 15),
+    GameType("Huge2000", 2000, 2000, 15),
+]
+
+BOARDS = [
+    *[pytest.param(game_type, id=game_type.name) for game_type in GAME_TYPES],
+    *[
+        pytest.param(game_type, id=game_type.name, marks=pytest.mark.huge)
+        for game_type in HUGE_GAME_TYPES
+    ],
+]
+
+
+def pytest_configure(config):
+    """Register the markers of the suite"""
+    config.addinivalue_line("markers", "huge: synthetic boards bigger than the presets")
+
+
+@pytest.fixture(params=BOARDS)
+def game_type(request) -> GameType:
+    """Every preset and the synthetic huge boards"""
+    return request.param
+
+
+def rounds_for(game_type: GameType, small: int = 20) -> int:
+    """Returns fewer rounds for the huge boards, whose runs take seconds"""
+    return small if game_type.width * game_type.height <= 10_000 else 3
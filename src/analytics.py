@@ -0,0 +1,332 @@
+"""Difficulty statistics of boards, aggregated over many seeded boards.
+
+Usage: python analytics.py --boards 100000 --workers 8 --output stats.json
+
+The 3BV of a board is the least number of clicks that clears it: one per
+opening, a connected region of empty squares revealed by a single click,
+and one per number that no opening reveals. The islands are the connected
+groups of those numbers.
+
+The regions are labelled on bitboards: each one grows from a seed square
+by dilations until it stops growing, so a step costs a few big integer
+operations instead of a visit of every square. On the boards larger than
+BANDED_SQUARES a region grows inside a band of rows around it, doubled
+whenever the region reaches its bottom row, so the small regions of a
+large board cost the size of their band rather than the size of the board.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from bitboard_field import (
+    BitboardField,
+    board_masks,
+    dilate_board,
+    join_rows,
+    split_rows,
+)
+from field import Field
+from game_type import GAME_TYPES, TOPOLOGY_GAME_TYPES, GameType, create_field
+from generator import generate_no_guess
+from topology import RECTANGLE
+
+BATCH_SIZE = 500
+
+BANDED_SQUARES = 4096
+"""The size of the boards above which the regions grow in bands of rows"""
+
+
+class BoardStats(NamedTuple):
+    """The difficulty statistics of a board"""
+
+    three_bv: int
+    """The least number of clicks that clears the board"""
+    openings: int
+    """The number of connected regions of empty squares"""
+    islands: int
+    """The number of connected groups of numbers that no opening reveals"""
+    opening_squares: int
+    """The number of squares revealed by the openings, each one once"""
+    largest_opening: int
+    """The number of squares revealed by the largest opening"""
+
+
+class BatchResult(NamedTuple):
+    """The distributions of the statistics of a batch of boards"""
+
+    game_type: GameType
+    boards: int
+    histograms: dict[str, Counter]
+    """The number of boards of every value of each statistic"""
+
+
+class Region(NamedTuple):
+    """A connected region of a board, held in a band of rows"""
+
+    top: int
+    """The first row of the band"""
+    height: int
+    """The number of rows of the band"""
+    bits: int
+    """The squares of the region, a board of the band"""
+
+
+def flood(region: int, bits: int, width: int, height: int) -> int:
+    """Grows a region through the squares of a board until it stops growing"""
+    while True:
+        grown = dilate_board(region, width, height) & bits
+        if grown == region:
+            return region
+        region = grown
+
+
+def components(bits: int, width: int, height: int) -> Iterator[Region]:
+    """Returns the connected regions of a board, one by one"""
+    if width * height <= BANDED_SQUARES:
+        while bits:
+            region = flood(bits & -bits, bits, width, height)
+            bits &= ~region
+            yield Region(0, height, region)
+        return
+
+    rows = split_rows(bits, width, height)
+    for top in range(height):
+        # The rows above are cleared already, the regions only grow down
+        while rows[top]:
+            bottom = top + 1
+            band = rows[top]
+            region = band & -band
+            while True:
+                region = flood(region, band, width, bottom - top)
+                if bottom == height or not region >> (bottom - top - 1) * width:
+                    break
+                bottom = min(2 * bottom - top, height)
+                band = join_rows(rows[top:bottom], width)
+
+            rows[top:bottom] = split_rows(band & ~region, width, bottom - top)
+            yield Region(top, bottom - top, region)
+
+
+def board_stats(field: Field) -> BoardStats:
+    """Returns the difficulty statistics of a field, from its mines only"""
+    if field.topology != RECTANGLE:
+        return table_stats(field)
+    width, height = field.width, field.height
+    boards = BitboardField(width, height, field.mines_perc, field.mine_map, field.seed)
+    openings = 0
+    largest_opening = 0
+    for region in components(boards.empty, width, height):
+        openings += 1
+        # The neighbours of an empty square are never mines, an opening
+        # reveals its region grown by one square, up to the row above
+        top = max(region.top - 1, 0)
+        bits = region.bits << (region.top - top) * width
+        revealed = dilate_board(bits, width, region.top + region.height - top)
+        largest_opening = max(largest_opening, revealed.bit_count())
+
+    opened = boards.dilate(boards.empty)
+    isolated = board_masks(width, height)[0] & ~boards.mines & ~opened
+    islands = sum(1 for _ in components(isolated, width, height))
+    return BoardStats(
+        openings + isolated.bit_count(),
+        openings,
+        islands,
+        opened.bit_count(),
+        largest_opening,
+    )
+
+
+def table_stats(field: Field) -> BoardStats:
+    """Returns the difficulty statistics of a field of any topology, visiting
+    the squares through its neighbour table"""
+    mine_map = field.mine_map
+    count_map = field.count_map
+    neighbours = field.neighbours
+    squares_count = field.width * field.height
+    # The opening that last revealed each square, the numbers between two
+    # openings are revealed by both
+    revealed = [0] * squares_count
+    openings = 0
+    largest_opening = 0
+    for start in range(squares_count):
+        if mine_map[start] or count_map[start] or revealed[start]:
+            continue
+        openings += 1
+        revealed[start] = openings
+        size = 1
+        pending = [start]
+        while pending:
+            for neighbour in neighbours(pending.pop()):
+                if revealed[neighbour] != openings:
+                    revealed[neighbour] = openings
+                    size += 1
+                    if not count_map[neighbour]:
+                        pending.append(neighbour)
+        largest_opening = max(largest_opening, size)
+    opening_squares = squares_count - revealed.count(0)
+
+    isolated = 0
+    islands = 0
+    for start in range(squares_count):
+        if mine_map[start] or revealed[start]:
+            continue
+        islands += 1
+        revealed[start] = 1
+        pending = [start]
+        while pending:
+            isolated += 1
+            for neighbour in neighbours(pending.pop()):
+                if not (mine_map[neighbour] or revealed[neighbour]):
+                    revealed[neighbour] = 1
+                    pending.append(neighbour)
+    return BoardStats(
+        openings + isolated, openings, islands, opening_squares, largest_opening
+    )
+
+
+def analyse_batch(
+    game_type: GameType, boards: int, seed: int, no_guess: bool
+) -> BatchResult:
+    """Computes the statistics of a batch of seeded boards in a worker process"""
+    rng = random.Random(seed)
+    histograms = {name: Counter() for name in BoardStats._fields}
+    for _ in range(boards):
+        board_seed = rng.getrandbits(64)
+        if no_guess:
+            board_seed = generate_no_guess(game_type, random.Random(board_seed))
+        stats = board_stats(create_field(game_type, seed=board_seed))
+        for name, value in zip(BoardStats._fields, stats):
+            histograms[name][value] += 1
+    return BatchResult(game_type, boards, histograms)
+
+
+def analyse(
+    game_types: list[GameType], boards: int, workers: int, seed: int, no_guess: bool
+) -> tuple[dict[GameType, BatchResult], float]:
+    """Computes the statistics of the specified number of boards of every
+    game type, merging the batches as they complete.
+
+    At most two batches per worker are queued, so the number of boards is
+    not limited by memory.
+
+    Returns:
+        The merged distributions per game type, and the elapsed seconds.
+    """
+    results = {
+        game_type: BatchResult(
+            game_type, 0, {name: Counter() for name in BoardStats._fields}
+        )
+        for game_type in game_types
+    }
+
+    def merge(futures) -> None:
+        for future in futures:
+            batch = future.result()
+            merged = results[batch.game_type]
+            for name, histogram in batch.histograms.items():
+                merged.histograms[name].update(histogram)
+            results[batch.game_type] = merged._replace(
+                boards=merged.boards + batch.boards
+            )
+
+    start = time.perf_counter()
+    batch_seed = seed
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for game_type in game_types:
+            for batch_start in range(0, boards, BATCH_SIZE):
+                batch = min(BATCH_SIZE, boards - batch_start)
+                future = executor.submit(
+                    analyse_batch, game_type, batch, batch_seed, no_guess
+                )
+                pending.add(future)
+                batch_seed += 1
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    merge(done)
+        merge(wait(pending).done)
+    return results, time.perf_counter() - start
+
+
+def summary(histogram: Counter) -> dict[str, float]:
+    """Returns the mean and the percentiles of a distribution"""
+    values = sorted(histogram.elements())
+    deciles = statistics.quantiles(values, n=10) if len(values) > 1 else values * 9
+    return {
+        "mean": statistics.fmean(values),
+        "min": values[0],
+        "p10": deciles[0],
+        "median": statistics.median(values),
+        "p90": deciles[-1],
+        "max": values[-1],
+    }
+
+
+def main():
+    """Parse the command line and compute the statistics"""
+    game_types = GAME_TYPES + TOPOLOGY_GAME_TYPES
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boards", type=int, default=10_000, help="boards per type")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--game-type",
+        action="append",
+        choices=[game_type.name for game_type in game_types],
+        help="game type to analyse, the rectangular ones by default",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-guess",
+        action="store_true",
+        help="analyse the boards dealt to the players, solvable without guessing",
+    )
+    parser.add_argument(
+        "--output", type=Path, help="JSON file to write the distributions to"
+    )
+    args = parser.parse_args()
+
+    names = args.game_type or [game_type.name for game_type in GAME_TYPES]
+    game_types = [game_type for game_type in game_types if game_type.name in names]
+    results, elapsed = analyse(
+        game_types, args.boards, args.workers, args.seed, args.no_guess
+    )
+    total_boards = args.boards * len(game_types)
+    print(
+        f"{total_boards} boards in {elapsed:.2f}s, "
+        f"{total_boards / elapsed:.0f} boards/sec"
+    )
+
+    report = {}
+    for game_type, result in results.items():
+        stats = {
+            name: summary(histogram) for name, histogram in result.histograms.items()
+        }
+        print(f"{game_type.name}:")
+        for name, values in stats.items():
+            print(
+                f"  {name:>16}: mean {values['mean']:7.1f}, "
+                f"p10 {values['p10']:6.1f}, median {values['median']:6.1f}, "
+                f"p90 {values['p90']:6.1f}, max {values['max']}"
+            )
+        report[game_type.name] = {
+            "boards": result.boards,
+            "stats": stats,
+            "histograms": {
+                name: dict(sorted(histogram.items()))
+                for name, histogram in result.histograms.items()
+            },
+        }
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""The bitboard field module.
+
+A BitboardField keeps the mines, the masked squares and the marked
+squares as Python integers, one bit per square in `y * width + x` order,
+the layout of the packed planes of board_format. The game logic works on
+whole boards at once:
+    neighbour counting adds the eight shifted mine boards with a
+    bit-sliced adder, four bit planes holding the counts
+    revealing dilates the region by one square at a time, masked by the
+    empty squares still masked, until it stops growing
+    the field is cleared when the masked board is 0
+"""
+
+from functools import lru_cache
+from typing import Iterator
+
+from board_format import (
+    EXPLODED,
+    HEADER,
+    pack_header,
+    pack_plane,
+    plane_size,
+    read_header,
+    unpack_plane,
+)
+from field import Field
+from profiling import timed
+from topology import RECTANGLE
+
+SHORT_BOARD = 16
+"""The number of rows up to which a board is split and joined row by row"""
+
+
+@lru_cache(maxsize=64)
+def board_masks(width: int, height: int) -> tuple[int, int, int]:
+    """Returns the boards of every square, of the first column without the
+    last one, and of the last column without the first one"""
+    board = (1 << width * height) - 1
+    first_column = int(("0" * (width - 1) + "1") * height, 2)
+    last_column = int(("1" + "0" * (width - 1)) * height, 2)
+    return board, board & ~first_column, board & ~last_column
+
+
+def dilate_board(bits: int, width: int, height: int) -> int:
+    """Returns the board grown by one square in every direction"""
+    board, not_first, not_last = board_masks(width, height)
+    row = bits | bits << 1 & not_first | bits >> 1 & not_last
+    return (row | row << width | row >> width) & board
+
+
+def split_rows(bits: int, width: int, height: int) -> list[int]:
+    """Returns one board per row of a board.
+
+    A board of many rows is halved recursively, so that the rows cost the
+    size of the board times the depth of the halving rather than times the
+    number of rows.
+    """
+    if height <= SHORT_BOARD:
+        row_mask = (1 << width) - 1
+        return [bits >> y * width & row_mask for y in range(height)]
+    half = height // 2
+    low = bits & (1 << half * width) - 1
+    high = bits >> half * width
+    return split_rows(low, width, half) + split_rows(high, width, height - half)
+
+
+def join_rows(rows: list[int], width: int) -> int:
+    """Returns the board made of one board per row, the reverse of split_rows"""
+    if len(rows) <= SHORT_BOARD:
+        bits = 0
+        for row in reversed(rows):
+            bits = bits << width | row
+        return bits
+    half = len(rows) // 2
+    high = join_rows(rows[half:], width)
+    return join_rows(rows[:half], width) | high << half * width
+
+
+def bit_indexes(bits: int) -> list[int]:
+    """Returns the indexes of the set bits, in increasing order"""
+    digits = bin(bits)[:1:-1]
+    indexes = []
+    index = digits.find("1")
+    while index >= 0:
+        indexes.append(index)
+        index = digits.find("1", index + 1)
+    return indexes
+
+
+def add_planes(first: list[int], second: list[int]) -> list[int]:
+    """Adds two numbers of every square, held as bit planes of the same size"""
+    planes = []
+    carry = 0
+    for first_plane, second_plane in zip(first, second):
+        partial = first_plane ^ second_plane
+        planes.append(partial ^ carry)
+        carry = first_plane & second_plane | partial & carry
+    return planes
+
+
+def equal_planes(first: list[int], second: list[int], board: int) -> int:
+    """Returns the board of the squares where two numbers held as bit planes
+    are equal"""
+    different = 0
+    for first_plane, second_plane in zip(first, second):
+        different |= first_plane ^ second_plane
+    return board & ~different
+
+
+def bits_to_bytes(bits: int, squares_count: int) -> bytearray:
+    """Returns one 0/1 byte per square of a board"""
+    return unpack_plane(
+        memoryview(bits.to_bytes(plane_size(squares_count), "little")), squares_count
+    )
+
+
+class BitPlane:
+    """A bytearray-like view over one board of a BitboardField.
+
+    Every access shifts the whole board, so the views are meant for the
+    occasional square, the game logic works on the boards.
+    """
+
+    __slots__ = ("field", "name")
+
+    def __init__(self, field: "BitboardField", name: str):
+        self.field = field
+        self.name = name
+
+    def __getitem__(self, index: int) -> int:
+        return getattr(self.field, self.name) >> index & 1
+
+    def __setitem__(self, index: int, value: int) -> None:
+        bits = getattr(self.field, self.name)
+        bit = 1 << index
+        setattr(self.field, self.name, bits | bit if value else bits & ~bit)
+
+    def __len__(self) -> int:
+        return self.field.width * self.field.height
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(bits_to_bytes(getattr(self.field, self.name), len(self)))
+
+    def count(self, value: int) -> int:
+        """Returns the number of squares set to value"""
+        ones = getattr(self.field, self.name).bit_count()
+        return ones if value else len(self) - ones
+
+
+class BitboardField(Field):
+    """A field kept as bitboards, with the API of Field.
+
+    mine_map, mask_map and flag_map are BitPlane views over the boards,
+    count_map is a bytearray computed once, since the mines never move.
+    """
+
+    buffers = ("mines", "masked", "flags", "empty", "count_planes", "count_map")
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        mines_perc: int,
+        mine_map: bytearray | None = None,
+        seed: int | None = None,
+        topology: str = RECTANGLE,
+    ):
+        # Set by setup_mine_count: the squares without mines around them,
+        # and the four bit planes of the neighbour counts
+        self.empty = 0
+        self.count_planes: list[int] = []
+        super().__init__(width, height, mines_perc, mine_map, seed, topology)
+
+    def setup_minefield(self, mine_map: bytearray | None = None):
+        """Setup the boards.
+
+        Raises:
+            ValueError: If the field is not a rectangle, the boards are shifted
+                by rows and columns.
+        """
+        if self.topology != RECTANGLE:
+            raise ValueError(f"Bitboards of a {self.topology} are not supported")
+        squares_count = self.width * self.height
+        if mine_map is None:
+            mine_map = bytearray(squares_count)
+            self.mine_map = mine_map
+            self.plant_mines()
+        self.mines = int.from_bytes(pack_plane(mine_map), "little")
+        self.masked = board_masks(self.width, self.height)[0]
+        self.flags = 0
+        self.cleared_squares = 0
+        self.marked_mines = 0
+        self.total_mines = self.mines.bit_count()
+        self.mine_map = BitPlane(self, "mines")
+        self.mask_map = BitPlane(self, "masked")
+        self.flag_map = BitPlane(self, "flags")
+        self.setup_mine_count()
+
+    def shifted(self, bits: int) -> list[int]:
+        """Returns the board shifted towards each of the eight neighbours:
+        a square is set when its neighbour in that direction is set"""
+        width = self.width
+        board, not_first, not_last = board_masks(width, self.height)
+        from_left = bits << 1 & not_first
+        from_right = bits >> 1 & not_last
+        return [
+            from_left,
+            from_right,
+            bits << width & board,
+            bits >> width,
+            from_left << width & board,
+            from_right << width & board,
+            from_left >> width,
+            from_right >> width,
+        ]
+
+    def dilate(self, bits: int) -> int:
+        """Returns the board grown by one square in every direction"""
+        return dilate_board(bits, self.width, self.height)
+
+    def neighbour_counts(self, bits: int) -> list[int]:
+        """Returns the number of set neighbours of every square, as four bit
+        planes from the lowest bit of the count to the highest"""
+        planes = [0, 0, 0, 0]
+        for carry in self.shifted(bits):
+            for bit, plane in enumerate(planes):
+                planes[bit] = plane ^ carry
+                carry &= plane
+                if not carry:
+                    break
+        return planes
+
+    def setup_mine_count(self):
+        """Counts the neighbour mines of every square into four bit planes"""
+        planes = self.neighbour_counts(self.mines)
+        board = board_masks(self.width, self.height)[0]
+        counted = planes[0] | planes[1] | planes[2] | planes[3]
+        self.empty = board & ~self.mines & ~counted
+        self.count_planes = planes
+        squares_count = self.width * self.height
+        counts = 0
+        for bit, plane in enumerate(planes):
+            plane_bytes = bits_to_bytes(plane, squares_count)
+            counts += int.from_bytes(plane_bytes, "little") << bit
+        self.count_map = bytearray(counts.to_bytes(squares_count, "little"))
+
+    def unmasked_squares(self) -> Iterator[int]:
+        """Returns the indexes of the squares that are not masked"""
+        board = board_masks(self.width, self.height)[0]
+        return iter(bit_indexes(board & ~self.masked))
+
+    def is_cleared(self) -> bool:
+        """Returns True when no square is masked anymore"""
+        return not self.masked
+
+    @timed("reveal_square", cells=len)
+    def reveal_square(self, x: int, y: int) -> list[int]:
+        """Reveal the specified square, like Field.reveal_square.
+
+        Returns:
+            list[int]: The indexes of the squares that were revealed, in
+                increasing order.
+        """
+        index = y * self.width + x
+        bit = 1 << index
+        revealed = self.reveal_board(bit)
+        if revealed == bit:
+            return [index]
+        return bit_indexes(revealed)
+
+    def reveal_board(self, bits: int) -> int:
+        """Reveals every masked square of a board at once, spreading from
+        the empty ones through their empty regions.
+
+        Returns:
+            int: The board of the squares that were revealed.
+        """
+        masked = self.masked
+        bits &= masked
+        if not bits:
+            return 0
+        if self.mines & bits:
+            self.mine_exploded = True
+
+        # The neighbours of an empty square are never mines
+        masked_empty = self.empty & masked
+        region = bits & masked_empty
+        revealed = bits
+        if region:
+            while True:
+                grown = self.dilate(region) & masked_empty
+                if grown == region:
+                    break
+                region = grown
+            revealed |= self.dilate(region) & masked
+
+        self.masked = masked & ~revealed
+        self.cleared_squares += revealed.bit_count()
+        return revealed
+
+    def mark_board(self, bits: int) -> int:
+        """Marks every masked square of a board as a mine.
+
+        Returns:
+            int: The board of the squares that were marked.
+        """
+        marked = bits & self.masked
+        self.flags |= marked
+        self.masked &= ~marked
+        count = marked.bit_count()
+        self.marked_mines += count
+        self.cleared_squares += count
+        return marked
+
+    @timed("toggle_mine_marker")
+    def toggle_mine_marker(self, x: int, y: int) -> bool:
+        """Toggles the mine marker on the specified square.
+
+        Returns:
+            bool: False if the square is revealed, and was left unchanged.
+        """
+        bit = 1 << y * self.width + x
+        if self.flags & bit:
+            self.flags &= ~bit
+            self.masked |= bit
+            self.marked_mines -= 1
+            self.cleared_squares -= 1
+        elif self.masked & bit:
+            self.flags |= bit
+            self.masked &= ~bit
+            self.marked_mines += 1
+            self.cleared_squares += 1
+        else:
+            return False
+        return True
+
+    def to_bytes(self) -> bytes:
+        """Serializes the field in the compact binary format of board_format"""
+        size = plane_size(self.width * self.height)
+        return b"".join(
+            [
+                pack_header(self),
+                self.mines.to_bytes(size, "little"),
+                self.masked.to_bytes(size, "little"),
+                self.flags.to_bytes(size, "little"),
+            ]
+        )
+
+    @classmethod
+    def from_bytes(
+        cls, data: bytes | bytearray | memoryview, offset: int = 0
+    ) -> "BitboardField":
+        """Loads a field serialized by to_bytes, of either backend"""
+        view = memoryview(data)[offset:]
+        width, height, mines_perc, state, seed, topology = read_header(view)
+        squares_count = width * height
+        size = plane_size(squares_count)
+        mines = view[HEADER.size : HEADER.size + size]
+
+        mine_map = unpack_plane(mines, squares_count)
+        field = cls(width, height, mines_perc, mine_map, seed, topology)
+        field.load_planes(view[HEADER.size + size :])
+        field.mine_exploded = bool(state & EXPLODED)
+        return field
+
+    def load_planes(self, planes: memoryview) -> None:
+        """Loads the masked and marked boards, packed one after the other"""
+        size = plane_size(self.width * self.height)
+        self.masked = int.from_bytes(planes[:size], "little")
+        self.flags = int.from_bytes(planes[size : 2 * size], "little")
+        self.marked_mines = self.flags.bit_count()
+        self.cleared_squares = self.width * self.height - self.masked.bit_count()
+
+    def resident_bytes(self) -> int:
+        """Returns the size of the boards and counts held in memory"""
+        return len(self.count_map) + 4 * plane_size(self.width * self.height)
+
+    def reload(self) -> None:
+        """Loads the boards saved by evict"""
+        if self.evicted_path is None:
+            return
+        view = memoryview(self.evicted_path.read_bytes())
+        size = plane_size(self.width * self.height)
+        mines = view[HEADER.size : HEADER.size + size]
+        self.mines = int.from_bytes(mines, "little")
+        self.setup_mine_count()
+        self.load_planes(view[HEADER.size + size :])
+        self.evicted_path.unlink()
+        self.evicted_path = None
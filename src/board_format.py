@@ -0,0 +1,94 @@
+"""The compact binary format of a field.
+
+A record is a header followed by three bit-packed planes, one bit per
+square in `y * width + x` order: the mines, the masked squares and the
+marked squares. The neighbour counts are not stored, they are recomputed
+when the record is loaded.
+
+The topology is the index of its name in topology.TOPOLOGIES, the records
+written before it was stored hold 0 there, the rectangle.
+"""
+
+import struct
+from typing import TYPE_CHECKING
+
+from topology import TOPOLOGIES
+
+if TYPE_CHECKING:
+    from field import Field
+
+MAGIC = b"MSWP"
+VERSION = 1
+EXPLODED = 0x01
+
+HEADER = struct.Struct("<4sBBBBIIQ")
+"""magic, version, mines_perc, state flags, topology, width, height, seed"""
+
+_TO_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+_FROM_DIGITS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class BoardFormatError(ValueError):
+    """The data is not a valid field record"""
+
+
+def plane_size(squares_count: int) -> int:
+    """Returns the size in bytes of a bit-packed plane"""
+    return (squares_count + 7) // 8
+
+
+def record_size(width: int, height: int) -> int:
+    """Returns the size in bytes of the record of a field"""
+    return HEADER.size + 3 * plane_size(width * height)
+
+
+def pack_plane(plane: bytearray) -> bytes:
+    """Packs a plane of 0/1 bytes into bits, square 0 in the lowest bit"""
+    if not plane:
+        return b""
+    digits = plane.translate(_TO_DIGITS)[::-1]
+    return int(digits, 2).to_bytes(plane_size(len(plane)), "little")
+
+
+def unpack_plane(data: memoryview, squares_count: int) -> bytearray:
+    """Unpacks a bit-packed plane into one 0/1 byte per square"""
+    if not squares_count:
+        return bytearray()
+    digits = format(int.from_bytes(data, "little"), f"0{squares_count}b").encode()
+    return bytearray(digits[::-1].translate(_FROM_DIGITS))
+
+
+def pack_header(field: "Field") -> bytes:
+    """Returns the header of the record of a field, of either backend"""
+    return HEADER.pack(
+        MAGIC,
+        VERSION,
+        field.mines_perc,
+        EXPLODED if field.mine_exploded else 0,
+        TOPOLOGIES.index(field.topology),
+        field.width,
+        field.height,
+        field.seed,
+    )
+
+
+def read_header(data: memoryview) -> tuple[int, int, int, int, int, str]:
+    """Reads and checks the header of a record.
+
+    Returns:
+        The width, height, mines percentage, state flags, seed and topology
+        of the field.
+    """
+    if len(data) < HEADER.size:
+        raise BoardFormatError("Truncated header")
+    header = HEADER.unpack_from(data)
+    magic, version, mines_perc, state, topology, width, height, seed = header
+    if magic != MAGIC:
+        raise BoardFormatError(f"Bad magic {magic!r}")
+    if version != VERSION:
+        raise BoardFormatError(f"Unsupported version {version}")
+    if topology >= len(TOPOLOGIES):
+        raise BoardFormatError(f"Unknown topology {topology}")
+    if len(data) < record_size(width, height):
+        raise BoardFormatError("Truncated planes")
+    return width, height, mines_perc, state, seed, TOPOLOGIES[topology]
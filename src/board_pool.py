@@ -0,0 +1,115 @@
+"""The board_pool module"""
+
+import multiprocessing
+import random
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from field import Field
+from game_type import GameType, create_field
+from generator import generate_no_guess
+from profiling import count
+
+MAX_ATTEMPTS = 1000
+"""The boards tried for one no-guess board, Hard needs about 50 on average"""
+
+MAX_FAILURES = 3
+"""The generations of a game type that can fail in a row before its boards
+are no longer requested"""
+
+
+def generate_board(game_type: GameType, seed: int) -> int:
+    """Finds a no-guess board in a worker process, trying the seeds drawn
+    from seed.
+
+    Returns:
+        The seed of the board, which plants it in the field.
+
+    Raises:
+        ValueError: If no board was found in MAX_ATTEMPTS attempts.
+    """
+    board_seed = generate_no_guess(game_type, random.Random(seed), MAX_ATTEMPTS)
+    if board_seed is None:
+        raise ValueError(
+            f"No no-guess {game_type.name} board in {MAX_ATTEMPTS} attempts"
+        )
+    return board_seed
+
+
+class BoardPool:
+    """Keeps a few no-guess boards ready for every game type.
+
+    The boards are generated by a pool of worker processes in the background,
+    and a new one is requested every time a board is taken, or when the
+    generation of one fails, up to MAX_FAILURES times in a row. The boards
+    taken before one is ready and the failed generations are counted as
+    "board_pool.fallback" and "board_pool.failed".
+
+    A board is kept as its seed only, the field plants its mines again.
+    """
+
+    def __init__(
+        self, game_types: list[GameType], boards_per_type: int = 2, workers: int = 2
+    ):
+        self.boards: dict[GameType, deque[int]] = {
+            game_type: deque() for game_type in game_types
+        }
+        self.boards_per_type = boards_per_type
+        self.failures: dict[GameType, int] = {}
+        self._rng = random.Random()
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        for game_type in game_types:
+            if game_type.chunked or game_type.seed is not None:
+                continue
+            for _ in range(boards_per_type):
+                self._request(game_type)
+
+    def take(self, game_type: GameType) -> Field:
+        """Returns a new field of the specified type.
+
+        A game type with a seed always gets the board planted from it, as
+        create_field does. When no board is ready for another game type,
+        returns a random field with a safe start instead of waiting for one.
+        Chunked fields are never pooled.
+        """
+        boards = self.boards.setdefault(game_type, deque())
+        if game_type.chunked or game_type.seed is not None:
+            return create_field(game_type)
+        if boards:
+            seed = boards.popleft()
+            self._request(game_type)
+        else:
+            count("board_pool.fallback")
+            seed = self._rng.getrandbits(64)
+        return create_field(game_type, seed=seed)
+
+    def shutdown(self) -> None:
+        """Stops the generation of boards"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _request(self, game_type: GameType) -> None:
+        """Requests the generation of a board of the specified type"""
+        try:
+            future = self._executor.submit(
+                generate_board, game_type, self._rng.getrandbits(64)
+            )
+        except RuntimeError:
+            # The pool was shut down or a worker died, take falls back to
+            # random boards
+            return
+
+        def done(future: Future[int]) -> None:
+            if future.cancelled():
+                return
+            if future.exception() is None:
+                self.failures.pop(game_type, None)
+                self.boards[game_type].append(future.result())
+                return
+            count("board_pool.failed")
+            failures = self.failures[game_type] = self.failures.get(game_type, 0) + 1
+            if failures < MAX_FAILURES:
+                self._request(game_type)
+
+        future.add_done_callback(done)
@@ -1,30 +1,28 @@
 """The choose game type screen module"""
 
 import re
-from typing import NamedTuple
+from pathlib import Path
 from textual.app import ComposeResult
 from textual.containers import Container, Vertical
 from textual.screen import ModalScreen
 from textual.widgets import Label, Button
 
+from game_type import GAME_TYPES, HUGE_GAME_TYPE, GameType
+from journal import JOURNAL_DIR, latest_journal
 
-class GameType(NamedTuple):
-    """Game type data"""
 
-    name: str
-    width: int
-    height: int
-    mines_prc: int
-
-
-class ChooseGameType(ModalScreen[GameType]):
+class ChooseGameType(ModalScreen[GameType | None]):
     """The choose game type screen class"""
 
-    game_types = [
-        GameType("Easy", 10, 10, 7),
-        GameType("Medium", 30, 15, 14),
-        GameType("Hard", 60, 20, 21),
-    ]
+    game_types = [*GAME_TYPES, HUGE_GAME_TYPE]
+
+    def __init__(self, journal_dir: Path = JOURNAL_DIR) -> None:
+        """
+        Args:
+            journal_dir (Path): The directory of the journals to resume from.
+        """
+        self.journal_dir = journal_dir
+        super().__init__()
 
     def compose(self) -> ComposeResult:
         with Container():
@@ -34,11 +32,16 @@ class ChooseGameType(ModalScreen[GameType]):
                     yield Button(
                         label=game_type.name, id=f"game_type_{i}", variant="success"
                     )
+                if latest_journal(self.journal_dir) is not None:
+                    yield Button(label="Resume", id="resume", variant="primary")
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         """Handles the game type selection"""
         if event.button.id is None:
             return
+        if event.button.id == "resume":
+            self.dismiss(None)
+            return
         matches = re.findall(r"\d+", event.button.id)
         game_type_id = int(matches[0])
         self.dismiss(self.game_types[game_type_id])
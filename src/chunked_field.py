@@ -0,0 +1,278 @@
+"""Contains the ChunkedField class"""
+
+import random
+import shutil
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator
+
+from board_format import pack_plane, plane_size, unpack_plane
+from field import Field
+from mine_count import count_mines_batched
+
+CHUNK_SIZE = 64
+"""The width and height of a chunk, in squares"""
+
+
+class Chunk:
+    """The squares of a CHUNK_SIZE x CHUNK_SIZE tile, in the layout of Field"""
+
+    __slots__ = ("mine_map", "mask_map", "flag_map", "count_map")
+
+    def __init__(self, mine_map: bytearray, count_map: bytearray):
+        self.mine_map = mine_map
+        self.count_map = count_map
+        self.mask_map = bytearray(b"\x01") * len(mine_map)
+        self.flag_map = bytearray(len(mine_map))
+
+    @property
+    def played(self) -> bool:
+        """True if a square of the chunk was revealed or marked"""
+        return self.mask_map.count(0) > 0
+
+
+class ChunkPlane:
+    """Gives access to one buffer of every chunk, indexed like the Field buffers"""
+
+    __slots__ = ("field", "name")
+
+    def __init__(self, field: "ChunkedField", name: str):
+        self.field = field
+        self.name = name
+
+    def __getitem__(self, index: int) -> int:
+        chunk, local = self.field.locate(index)
+        return getattr(chunk, self.name)[local]
+
+    def __setitem__(self, index: int, value: int) -> None:
+        chunk, local = self.field.locate(index)
+        getattr(chunk, self.name)[local] = value
+
+
+class ChunkedField(Field):
+    """A minefield made of chunks generated on demand.
+
+    The mines of a chunk come from a seed derived from the field seed and
+    the chunk position, so a chunk can be dropped and generated again at
+    any time. Only the chunks that are looked at are materialized; when
+    more than max_chunks are loaded, the least recently used one is
+    dropped, after being saved to disk if it was played.
+
+    The buffers of Field are replaced by ChunkPlane views, so the game
+    logic of Field and the MinesGrid widget work unchanged. The field is
+    always a rectangle, and is too big to be serialized.
+    """
+
+    serializable = False
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        mines_perc: int,
+        seed: int | None = None,
+        max_chunks: int = 256,
+    ):
+        self.max_chunks = max_chunks
+        super().__init__(width, height, mines_perc, seed=seed)
+
+    def setup_minefield(self, mine_map: bytearray | None = None):
+        """Setup the chunk planes, the chunks are generated on first access"""
+        self.cleared_squares = 0
+        self.marked_mines = 0
+
+        self.chunks: OrderedDict[tuple[int, int], Chunk] = OrderedDict()
+        self._mines: OrderedDict[tuple[int, int], bytearray] = OrderedDict()
+        self._last: tuple[tuple[int, int], Chunk] | None = None
+        self._spill_dir = Path(tempfile.mkdtemp(prefix="minesweeper-"))
+        self.spilled: set[tuple[int, int]] = set()
+
+        self.mine_map = ChunkPlane(self, "mine_map")
+        self.mask_map = ChunkPlane(self, "mask_map")
+        self.flag_map = ChunkPlane(self, "flag_map")
+        self.count_map = ChunkPlane(self, "count_map")
+        self.total_mines = self.count_total_mines()
+
+    def count_total_mines(self) -> int:
+        """Counts the mines of the whole field without generating any chunk"""
+        full_x, last_width = divmod(self.width, CHUNK_SIZE)
+        full_y, last_height = divmod(self.height, CHUNK_SIZE)
+        total = 0
+        for rows, chunk_height in ((full_y, CHUNK_SIZE), (1, last_height)):
+            for columns, chunk_width in ((full_x, CHUNK_SIZE), (1, last_width)):
+                squares = chunk_width * chunk_height
+                total += rows * columns * (squares * self.mines_perc // 100)
+        return total
+
+    def locate(self, index: int) -> tuple[Chunk, int]:
+        """Returns the chunk holding the specified square and its index in the chunk"""
+        y, x = divmod(index, self.width)
+        chunk_y, local_y = divmod(y, CHUNK_SIZE)
+        chunk_x, local_x = divmod(x, CHUNK_SIZE)
+        return self.chunk(chunk_x, chunk_y), local_y * CHUNK_SIZE + local_x
+
+    def chunk(self, chunk_x: int, chunk_y: int) -> Chunk:
+        """Returns the specified chunk, materializing it if needed"""
+        key = (chunk_x, chunk_y)
+        if self._last is not None and self._last[0] == key:
+            return self._last[1]
+
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            self.evicted_path = None
+            chunk = self.load_chunk(chunk_x, chunk_y)
+            self.chunks[key] = chunk
+            if len(self.chunks) > self.max_chunks:
+                self.evict_chunk()
+        else:
+            self.chunks.move_to_end(key)
+        self._last = (key, chunk)
+        return chunk
+
+    def load_chunk(self, chunk_x: int, chunk_y: int) -> Chunk:
+        """Generates the specified chunk, restoring its played state from disk"""
+        stride = CHUNK_SIZE + 2
+        padded = bytearray(stride * stride)
+        # Each padded row takes the end of the left neighbour, the row of the
+        # chunk and the start of the right neighbour
+        segments = (
+            (-1, CHUNK_SIZE - 1, CHUNK_SIZE, 0),
+            (0, 0, CHUNK_SIZE, 1),
+            (1, 0, 1, stride - 1),
+        )
+        for padded_y in range(stride):
+            delta_y, row = divmod(padded_y - 1, CHUNK_SIZE)
+            for delta_x, start, end, left in segments:
+                mines = self.chunk_mines(chunk_x + delta_x, chunk_y + delta_y)
+                if mines is None:
+                    continue
+                target = padded_y * stride + left
+                source = row * CHUNK_SIZE
+                padded[target : target + end - start] = mines[
+                    source + start : source + end
+                ]
+
+        counts = count_mines_batched(padded, stride, stride)
+        count_map = bytearray(CHUNK_SIZE * CHUNK_SIZE)
+        for row in range(CHUNK_SIZE):
+            start = (row + 1) * stride + 1
+            count_map[row * CHUNK_SIZE : (row + 1) * CHUNK_SIZE] = counts[
+                start : start + CHUNK_SIZE
+            ]
+
+        chunk = Chunk(bytearray(self.chunk_mines(chunk_x, chunk_y) or b""), count_map)
+        if (chunk_x, chunk_y) in self.spilled:
+            data = memoryview(self.chunk_path(chunk_x, chunk_y).read_bytes())
+            size = plane_size(CHUNK_SIZE * CHUNK_SIZE)
+            chunk.mask_map = unpack_plane(data[:size], CHUNK_SIZE * CHUNK_SIZE)
+            chunk.flag_map = unpack_plane(data[size:], CHUNK_SIZE * CHUNK_SIZE)
+        return chunk
+
+    def evict_chunk(self) -> None:
+        """Drops the least recently used chunk, saving it to disk if it was played"""
+        key, chunk = self.chunks.popitem(last=False)
+        if self._last is not None and self._last[0] == key:
+            self._last = None
+        if chunk.played:
+            self.chunk_path(*key).write_bytes(
+                pack_plane(chunk.mask_map) + pack_plane(chunk.flag_map)
+            )
+            self.spilled.add(key)
+        elif key in self.spilled:
+            # Every square of the chunk was unmarked since it was saved
+            self.chunk_path(*key).unlink()
+            self.spilled.discard(key)
+
+    def chunk_path(self, chunk_x: int, chunk_y: int) -> Path:
+        """Returns the file a played chunk is saved to when evicted"""
+        return self._spill_dir / f"{chunk_x}_{chunk_y}.chunk"
+
+    def chunk_mines(self, chunk_x: int, chunk_y: int) -> bytearray | None:
+        """Returns the mines of the specified chunk, None outside of the field.
+        Only the squares inside the field can hold a mine."""
+        chunk_width = min(CHUNK_SIZE, self.width - chunk_x * CHUNK_SIZE)
+        chunk_height = min(CHUNK_SIZE, self.height - chunk_y * CHUNK_SIZE)
+        if chunk_x < 0 or chunk_y < 0 or chunk_width <= 0 or chunk_height <= 0:
+            return None
+
+        key = (chunk_x, chunk_y)
+        mines = self._mines.get(key)
+        if mines is not None:
+            self._mines.move_to_end(key)
+            return mines
+
+        rng = random.Random(f"{self.seed}:{chunk_x}:{chunk_y}")
+        squares = [
+            y * CHUNK_SIZE + x for y in range(chunk_height) for x in range(chunk_width)
+        ]
+        mines = bytearray(CHUNK_SIZE * CHUNK_SIZE)
+        for index in rng.sample(squares, len(squares) * self.mines_perc // 100):
+            mines[index] = 1
+
+        self._mines[key] = mines
+        if len(self._mines) > 4 * self.max_chunks:
+            self._mines.popitem(last=False)
+        return mines
+
+    def unmasked_squares(self) -> Iterator[int]:
+        """Returns the indexes of the squares that are not masked, chunk by chunk"""
+        for chunk_x, chunk_y in sorted(set(self.chunks) | self.spilled):
+            chunk = self.chunk(chunk_x, chunk_y)
+            for local, mask in enumerate(chunk.mask_map):
+                if not mask:
+                    local_y, local_x = divmod(local, CHUNK_SIZE)
+                    y = chunk_y * CHUNK_SIZE + local_y
+                    yield y * self.width + chunk_x * CHUNK_SIZE + local_x
+
+    def played_squares(self) -> Iterator[int]:
+        """Returns the indexes of the squares that are not masked or are marked,
+        chunk by chunk"""
+        for chunk_x, chunk_y in sorted(set(self.chunks) | self.spilled):
+            chunk = self.chunk(chunk_x, chunk_y)
+            played = zip(chunk.mask_map, chunk.flag_map)
+            for local, (mask, flag) in enumerate(played):
+                if flag or not mask:
+                    local_y, local_x = divmod(local, CHUNK_SIZE)
+                    y = chunk_y * CHUNK_SIZE + local_y
+                    yield y * self.width + chunk_x * CHUNK_SIZE + local_x
+
+    def to_bytes(self) -> bytes:
+        """Chunked fields are not serialized, see Field.serializable.
+
+        Raises:
+            TypeError: Always, the planes of the whole field would not fit in
+                memory.
+        """
+        raise TypeError("Chunked fields are not serialized")
+
+    def resident_bytes(self) -> int:
+        """Returns the size of the chunks held in memory"""
+        chunk_bytes = CHUNK_SIZE * CHUNK_SIZE
+        return 4 * chunk_bytes * len(self.chunks) + chunk_bytes * len(self._mines)
+
+    def evict(self, path: Path) -> int:
+        """Evicts every chunk, the played ones to the spill directory of the
+        field rather than to path. The spill directory is the evicted_path
+        until a chunk is loaded again, on demand."""
+        released = self.resident_bytes()
+        while self.chunks:
+            self.evict_chunk()
+        self._mines.clear()
+        self.evicted_path = self._spill_dir
+        return released
+
+    def reload(self) -> None:
+        """Nothing to load, the chunks are loaded on demand"""
+        self.evicted_path = None
+
+    def close(self) -> None:
+        """Deletes the spill directory and the chunks saved in it"""
+        # Also called by __del__, on a field whose setup may have failed
+        spill_dir = getattr(self, "_spill_dir", None)
+        if spill_dir is not None:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+            self.spilled.clear()
+
+    def __del__(self):
+        self.close()
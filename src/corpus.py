@@ -0,0 +1,40 @@
+"""Files holding many fields, one record of board_format after the other"""
+
+import mmap
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from board_format import read_header, record_size
+from field import Field
+
+
+def write_corpus(path: Path, fields: Iterable[Field]) -> int:
+    """Writes the fields to a corpus file.
+
+    Returns:
+        int: The number of fields written.
+    """
+    count = 0
+    with open(path, "wb") as file:
+        for field in fields:
+            file.write(field.to_bytes())
+            count += 1
+    return count
+
+
+def read_corpus(path: Path) -> Iterator[Field]:
+    """Loads the fields of a corpus file one by one.
+    The file is memory-mapped and every field is read in place."""
+    with open(path, "rb") as file:
+        if Path(path).stat().st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                offset = 0
+                while offset < len(view):
+                    width, height, *_ = read_header(view[offset:])
+                    yield Field.from_bytes(view, offset)
+                    offset += record_size(width, height)
+            finally:
+                view.release()
@@ -0,0 +1,80 @@
+"""The headless game engine module"""
+
+from enum import Enum
+
+from field import Delta
+from game_type import GameType, create_field
+
+
+class GameStatus(Enum):
+    """The status of a game"""
+
+    PLAYING = "playing"
+    WON = "won"
+    LOST = "lost"
+
+
+class GameEngine:
+    """Plays a game on a field, without any user interface.
+    Applies the same rules as the MinesGrid widget."""
+
+    def __init__(self, game_type: GameType):
+        self.game_type = game_type
+        self.field = create_field(game_type)
+
+    def new_game(
+        self, game_type: GameType | None = None, seed: int | None = None
+    ) -> None:
+        """Start a new game, of the same type if none is specified.
+
+        Args:
+            game_type (GameType | None): The game type, the current one if None.
+            seed (int | None): The seed of the field, the seed of the game type
+                if None.
+        """
+        if game_type is not None:
+            self.game_type = game_type
+        self.field = create_field(self.game_type, seed=seed)
+
+    @property
+    def status(self) -> GameStatus:
+        """The status of the current game"""
+        field = self.field
+        if field.mine_exploded:
+            return GameStatus.LOST
+        if field.is_cleared():
+            return GameStatus.WON
+        return GameStatus.PLAYING
+
+    def reveal(self, x: int, y: int) -> list[int]:
+        """Reveals the specified square.
+
+        Returns:
+            list[int]: The indexes of the squares that were revealed.
+        """
+        if self.status != GameStatus.PLAYING:
+            return []
+        return self.field.reveal_square(x, y)
+
+    def flag(self, x: int, y: int) -> None:
+        """Toggles the mine marker on the specified square"""
+        if self.status != GameStatus.PLAYING:
+            return
+        self.field.toggle_mine_marker(x, y)
+
+    def chord(self, x: int, y: int) -> list[int]:
+        """Reveals the masked neighbours of the specified number when its mines
+        are all marked.
+
+        Returns:
+            list[int]: The indexes of the squares that were revealed.
+        """
+        if self.status != GameStatus.PLAYING:
+            return []
+        return self.field.chord(x, y)
+
+    def apply_actions(self, actions: list[tuple[int, int, int]]) -> Delta:
+        """Applies a batch of moves, see Field.apply_actions"""
+        if self.status != GameStatus.PLAYING:
+            return Delta([], 0)
+        return self.field.apply_actions(actions)
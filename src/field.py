@@ -1,121 +1,389 @@
 """Contains the Field class"""
 
 import random
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Sequence
+
+from board_format import (
+    EXPLODED,
+    HEADER,
+    pack_header,
+    pack_plane,
+    plane_size,
+    read_header,
+    record_size,
+    unpack_plane,
+)
+from mine_count import count_mines_batched, count_mines_table
+from profiling import timed
 from square import Square
+from topology import (
+    RECTANGLE,
+    neighbour_table,
+    rectangle_neighbours,
+    square_neighbours,
+)
+
+CLEAR = 0
+MARK = 1
+CHORD = 2
+"""The actions of a move"""
+
+
+class Delta(NamedTuple):
+    """The aggregated result of a batch of actions"""
+
+    changed: list[int]
+    """The indexes of the squares that changed, each one once"""
+    moves: int
+    """The number of actions applied, a batch stops when a mine explodes"""
 
 
 class Field:
     """Contains the information for the whole minefield.
-    The minefield has a rectangular shape and is composed of squares."""
+    The minefield is composed of squares laid out in rows, the topology of
+    the field decides which squares are adjacent.
+
+    The state of the squares is kept in flat buffers, one byte per square,
+    indexed by `y * width + x`:
+        mine_map: 1 if there is a mine on the square
+        mask_map: 1 if the square was not revealed yet
+        flag_map: 1 if the square is marked as a mine
+        count_map: the number of mines in the adjacent squares
+
+    Running counters are kept up to date by every change of the squares:
+        total_mines: the number of mines planted
+        cleared_squares: the number of squares that are not masked anymore,
+            either revealed or marked
+        marked_mines: the number of squares marked as mines
 
-    def __init__(self, width: int, height: int, mines_perc: int):
+    The buffers can be evicted to disk while the field is not played, the
+    counters stay in memory. They are loaded back on their first access.
+    """
+
+    evicted_path: Path | None = None
+    """The file holding the evicted buffers, None while they are in memory"""
+
+    serializable = True
+    """False for the fields that to_bytes cannot save, that have no journal"""
+
+    buffers = ("mine_map", "mask_map", "flag_map", "count_map")
+    """The attributes released by evict"""
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        mines_perc: int,
+        mine_map: bytearray | None = None,
+        seed: int | None = None,
+        topology: str = RECTANGLE,
+    ):
+        """
+        Args:
+            width (int): The width of the field.
+            height (int): The height of the field.
+            mines_perc (int): The percentage of squares with mines.
+            mine_map (bytearray | None): The mines to use instead of planting random ones.
+            seed (int | None): The seed the mines are planted from, a random one if None.
+            topology (str): One of topology.TOPOLOGIES.
+        """
         self.width = width
         self.height = height
         self.mines_perc = mines_perc
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.topology = topology
+        # The neighbours of a rectangle are computed from their coordinates,
+        # its table would be larger than the whole field
+        self.neighbour_table = (
+            None if topology == RECTANGLE else neighbour_table(topology, width, height)
+        )
         self.mine_exploded = False
-        self.setup_minefield()
+        self.setup_minefield(mine_map)
 
-    def setup_minefield(self):
+    def __getattr__(self, name: str):
+        # Only called for the attributes missing from the instance, as the
+        # buffers of an evicted field
+        if name in type(self).buffers and self.evicted_path is not None:
+            self.reload()
+            return getattr(self, name)
+        raise AttributeError(
+            f"{type(self).__name__!r} object has no attribute {name!r}"
+        )
+
+    def setup_minefield(self, mine_map: bytearray | None = None):
         """Setup the minefield"""
-        self.squares = [
-            [Square() for x in range(self.width)] for y in range(self.height)
-        ]
-        self.plant_mines()
+        squares_count = self.width * self.height
+        self.mask_map = bytearray(b"\x01") * squares_count
+        self.flag_map = bytearray(squares_count)
+        self.count_map = bytearray(squares_count)
+        self.cleared_squares = 0
+        self.marked_mines = 0
+        if mine_map is None:
+            self.mine_map = bytearray(squares_count)
+            self.plant_mines()
+        else:
+            self.mine_map = mine_map
+        self.total_mines = self.mine_map.count(1)
         self.setup_mine_count()
 
+    def square(self, x: int, y: int) -> Square:
+        """Returns a view over the specified square"""
+        return Square(self, x, y)
+
     def plant_mines(self):
-        """Plant the mines"""
-        self.squares[0][0].mine = True
-        self.squares[5][3].mine = True
-        self.squares[9][0].mine = True
-        self.squares[7][7].mine = True
+        """Plant the mines from the seed, keeping the start square in the middle
+        of the field and its neighbours empty.
 
-        squares_count = self.height * self.width
-        mines_count = squares_count * self.mines_perc // 100
-        coordinates = random.sample(range(squares_count), mines_count)
+        This is the only way a seed becomes mines, so the seed recorded with a
+        board always plants it again.
+        """
+        width, height = self.width, self.height
+        squares_count = height * width
+        start_x, start_y = width // 2, height // 2
+        excluded = {
+            start_y * width + start_x,
+            *square_neighbours(self.topology, width, height, start_x, start_y),
+        }
+        mines_count = min(
+            squares_count * self.mines_perc // 100, squares_count - len(excluded)
+        )
+        rng = random.Random(self.seed)
+        coordinates = rng.sample(
+            range(squares_count), min(mines_count + len(excluded), squares_count)
+        )
 
+        mine_map = self.mine_map
         for coord in coordinates:
-            row = coord // self.width
-            col = coord % self.width
-            self.squares[row][col].mine = True
+            mine_map[coord] = 1
+        # The mines are the first mines_count coordinates that are not
+        # excluded: the excluded squares and the last ones are cleared again
+        extra = len(coordinates) - mines_count
+        for coord in excluded:
+            if mine_map[coord]:
+                mine_map[coord] = 0
+                extra -= 1
+        for coord in reversed(coordinates):
+            if not extra:
+                break
+            if coord not in excluded:
+                mine_map[coord] = 0
+                extra -= 1
 
     def setup_mine_count(self):
         """Setup the mine count for every square"""
-        for y, row in enumerate(self.squares):
-            for x, square in enumerate(row):
-                if square.mine:
-                    square.mines = -1
-                    continue
-                square.mines = 0
-                if x > 0 and y > 0:
-                    if self.squares[y - 1][x - 1].mine:
-                        square.mines += 1
-                if x > 0:
-                    if self.squares[y][x - 1].mine:
-                        square.mines += 1
-                if x > 0 and y < self.height - 1:
-                    if self.squares[y + 1][x - 1].mine:
-                        square.mines += 1
-                if y < self.height - 1:
-                    if self.squares[y + 1][x].mine:
-                        square.mines += 1
-                if x < self.width - 1 and y < self.height - 1:
-                    if self.squares[y + 1][x + 1].mine:
-                        square.mines += 1
-                if x < self.width - 1:
-                    if self.squares[y][x + 1].mine:
-                        square.mines += 1
-                if x < self.width - 1 and y > 0:
-                    if self.squares[y - 1][x + 1].mine:
-                        square.mines += 1
-                if y > 0:
-                    if self.squares[y - 1][x].mine:
-                        square.mines += 1
-
-    def reveal_square(self, x: int, y: int):
+        if self.topology == RECTANGLE:
+            self.count_map = count_mines_batched(self.mine_map, self.width, self.height)
+        else:
+            self.count_map = count_mines_table(self.mine_map, self.neighbour_table)
+
+    def unmasked_squares(self) -> Iterator[int]:
+        """Returns the indexes of the squares that are not masked"""
+        return (index for index, mask in enumerate(self.mask_map) if not mask)
+
+    def played_squares(self) -> Iterator[int]:
+        """Returns the indexes of the squares that are not masked or are marked"""
+        # The squares masked and not marked are found at once, as the set bits
+        # of one integer, then the others are searched at C speed
+        hidden = int.from_bytes(self.mask_map, "little") & ~int.from_bytes(
+            self.flag_map, "little"
+        )
+        squares = hidden.to_bytes(len(self.mask_map), "little")
+        return (match.start() for match in re.finditer(b"\x00", squares))
+
+    def neighbours(self, index: int) -> Sequence[int]:
+        """Returns the indexes of the squares adjacent to the specified square"""
+        table = self.neighbour_table
+        if table is None:
+            return rectangle_neighbours(self.width, self.height, index)
+        offsets, indexes = table
+        return indexes[offsets[index] : offsets[index + 1]]
+
+    def is_cleared(self) -> bool:
+        """Returns True when no square is masked anymore"""
+        return self.cleared_squares == self.width * self.height
+
+    @timed("reveal_square", cells=len)
+    def reveal_square(self, x: int, y: int) -> list[int]:
         """
         Reveal the specified square, if masked.
         If there is a mine on that square sets game over.
-        If the square is empty, reveals recursively the adjacent squares without mines.
+        If the square is empty, reveals the adjacent squares without mines,
+        spreading through the whole empty region.
+
+        Returns:
+            list[int]: The indexes of the squares that were revealed.
         """
-        square = self.squares[y][x]
-        if not square.mask:
-            return
+        index = y * self.width + x
+        mask_map = self.mask_map
+        if not mask_map[index]:
+            return []
 
-        square.mask = False
+        mask_map[index] = 0
+        changed = [index]
+        self.cleared_squares += 1
 
-        if square.mine:
+        if self.mine_map[index]:
             self.mine_exploded = True
+            return changed
+
+        count_map = self.count_map
+        if count_map[index] > 0:
+            return changed
 
-        if square.mines > 0:
+        neighbours = self.neighbours
+        pending = [index]
+        while pending:
+            index = pending.pop()
+            # The neighbours of an empty square are never mines
+            for neighbour in neighbours(index):
+                if mask_map[neighbour]:
+                    mask_map[neighbour] = 0
+                    changed.append(neighbour)
+                    if count_map[neighbour] == 0:
+                        pending.append(neighbour)
+
+        self.cleared_squares += len(changed) - 1
+        return changed
+
+    @timed("toggle_mine_marker")
+    def toggle_mine_marker(self, x: int, y: int) -> bool:
+        """Toggles the mine marker on the specified square.
+
+        Returns:
+            bool: False if the square is revealed, and was left unchanged.
+        """
+        index = y * self.width + x
+        if (not self.mask_map[index]) and (not self.flag_map[index]):
+            return False
+        flag = self.flag_map[index] ^ 1
+        self.flag_map[index] = flag
+        self.mask_map[index] = flag ^ 1
+        change = 1 if flag else -1
+        self.marked_mines += change
+        self.cleared_squares += change
+        return True
+
+    def chord(self, x: int, y: int) -> list[int]:
+        """Reveals the masked neighbours of a revealed number when as many of
+        its neighbours are marked as mines.
+
+        Returns:
+            list[int]: The indexes of the squares that were revealed.
+        """
+        index = y * self.width + x
+        mines = self.count_map[index]
+        if self.mask_map[index] or self.flag_map[index] or not mines:
+            return []
+        neighbours = self.neighbours(index)
+        flag_map = self.flag_map
+        if sum(flag_map[neighbour] for neighbour in neighbours) != mines:
+            return []
+
+        changed = []
+        mask_map = self.mask_map
+        for neighbour in neighbours:
+            if mask_map[neighbour]:
+                neighbour_y, neighbour_x = divmod(neighbour, self.width)
+                changed.extend(self.reveal_square(neighbour_x, neighbour_y))
+        return changed
+
+    @timed("apply_actions", cells=lambda delta: len(delta.changed))
+    def apply_actions(self, actions: Iterable[tuple[int, int, int]]) -> Delta:
+        """Applies a batch of moves in one pass.
+
+        Args:
+            actions: The moves, as CLEAR, MARK or CHORD and the square x, y.
+
+        Returns:
+            Delta: The squares changed by the whole batch.
+        """
+        changed: dict[int, None] = {}
+        moves = 0
+        for action, x, y in actions:
+            if self.mine_exploded:
+                break
+            if action == CLEAR:
+                changed.update(dict.fromkeys(self.reveal_square(x, y)))
+            elif action == MARK:
+                if self.toggle_mine_marker(x, y):
+                    changed[y * self.width + x] = None
+            elif action == CHORD:
+                changed.update(dict.fromkeys(self.chord(x, y)))
+            else:
+                raise ValueError(f"Unknown action {action}")
+            moves += 1
+        return Delta(list(changed), moves)
+
+    def to_bytes(self) -> bytes:
+        """Serializes the field in the compact binary format of board_format"""
+        return b"".join(
+            [
+                pack_header(self),
+                pack_plane(self.mine_map),
+                pack_plane(self.mask_map),
+                pack_plane(self.flag_map),
+            ]
+        )
+
+    def resident_bytes(self) -> int:
+        """Returns the size of the buffers held in memory"""
+        return 4 * len(self.mine_map)
+
+    def evict(self, path: Path) -> int:
+        """Saves the buffers to path and releases them, until reload is called
+        or they are accessed.
+
+        Returns:
+            int: The number of bytes released.
+        """
+        released = self.resident_bytes()
+        path.write_bytes(self.to_bytes())
+        self.evicted_path = path
+        for name in self.buffers:
+            delattr(self, name)
+        return released
+
+    def reload(self) -> None:
+        """Loads the buffers saved by evict"""
+        if self.evicted_path is None:
             return
+        field = Field.from_bytes(self.evicted_path.read_bytes())
+        self.mine_map, self.mask_map = field.mine_map, field.mask_map
+        self.flag_map, self.count_map = field.flag_map, field.count_map
+        self.evicted_path.unlink()
+        self.evicted_path = None
+
+    def close(self) -> None:
+        """Releases what the field keeps outside of memory, when its game ends.
+        A Field keeps nothing, the file of evict belongs to the caller."""
+
+    @classmethod
+    def from_bytes(
+        cls, data: bytes | bytearray | memoryview, offset: int = 0
+    ) -> "Field":
+        """Loads a field serialized by to_bytes.
+
+        The data is read in place, so it can be a memoryview over a larger
+        buffer or a memory-mapped file holding several records.
+
+        Args:
+            data: The buffer holding the record.
+            offset (int): The position of the record in the buffer.
+        """
+        view = memoryview(data)[offset:]
+        width, height, mines_perc, state, seed, topology = read_header(view)
+        squares_count = width * height
+        size = plane_size(squares_count)
+        planes = [
+            unpack_plane(view[start : start + size], squares_count)
+            for start in range(HEADER.size, record_size(width, height), size)
+        ]
 
-        if x > 0 and y > 0:
-            if not self.squares[y - 1][x - 1].mine:
-                self.reveal_square(x - 1, y - 1)
-        if x > 0:
-            if not self.squares[y][x - 1].mine:
-                self.reveal_square(x - 1, y)
-        if x > 0 and y < self.height - 1:
-            if not self.squares[y + 1][x - 1].mine:
-                self.reveal_square(x - 1, y + 1)
-        if y < self.height - 1:
-            if not self.squares[y + 1][x].mine:
-                self.reveal_square(x, y + 1)
-        if x < self.width - 1 and y < self.height - 1:
-            if not self.squares[y + 1][x + 1].mine:
-                self.reveal_square(x + 1, y + 1)
-        if x < self.width - 1:
-            if not self.squares[y][x + 1].mine:
-                self.reveal_square(x + 1, y)
-        if x < self.width - 1 and y > 0:
-            if not self.squares[y - 1][x + 1].mine:
-                self.reveal_square(x + 1, y - 1)
-        if y > 0:
-            if not self.squares[y - 1][x].mine:
-                self.reveal_square(x, y - 1)
-
-    def toggle_mine_marker(self, x: int, y: int):
-        """Toggles the mine marker on the specified square"""
-        square = self.squares[y][x]
-        square.toggle_mine_marker()
+        field = cls(width, height, mines_perc, planes[0], seed, topology)
+        field.mask_map, field.flag_map = planes[1], planes[2]
+        field.mine_exploded = bool(state & EXPLODED)
+        field.marked_mines = field.flag_map.count(1)
+        field.cleared_squares = field.mask_map.count(0)
+        return field
@@ -1,16 +1,36 @@
 """The game screen"""
 
+import time
+from pathlib import Path
+
 from textual.app import ComposeResult
 from textual.binding import Binding
 from textual.reactive import reactive
 from textual.screen import Screen
 from textual.widgets import Footer
 
-from choose_game_type import GameType, ChooseGameType
+from board_pool import BoardPool
+from choose_game_type import ChooseGameType
 from field import Field
 from game_header import GameHeader
 from game_message import GameMessage
+from game_type import GAME_TYPES, GameType
+from generator import start_square
+from history import History
+from journal import (
+    JOURNAL_DIR,
+    JournalWriter,
+    latest_journal,
+    new_journal_path,
+    restore,
+)
 from mines_grid import MinesGrid
+from profiling import ENABLED as PROFILING_ENABLED, timed
+from results import RESULTS_PATH, ResultsWriter, game_result
+from startup import mark
+
+if PROFILING_ENABLED:
+    from profile_overlay import ProfileOverlay
 
 
 class Game(Screen[None]):
@@ -18,18 +38,54 @@ class Game(Screen[None]):
 
     BINDINGS = [
         Binding("n", "new_game", "New Game"),
+        Binding("r", "resume", "Resume"),
+        Binding("l", "leaderboard", "Leaderboard"),
         Binding("question_mark", "push_screen('help')", "Help", key_display="?"),
         Binding("q", "quit", "Quit"),
     ]
+    if PROFILING_ENABLED:
+        BINDINGS.append(Binding("p", "toggle_profile", "Profile"))
 
     game_type = reactive[GameType | None]
-    field: reactive[Field | None]
+    field: reactive[Field | None] = None
+    journal: JournalWriter | None = None
+    results: ResultsWriter | None = None
+
+    def __init__(
+        self,
+        board_pool: BoardPool | None = None,
+        journal_dir: Path = JOURNAL_DIR,
+        results_path: Path = RESULTS_PATH,
+    ) -> None:
+        """
+        Args:
+            board_pool (BoardPool | None): A pool shared with other games, a pool
+                of its own is started if None.
+            journal_dir (Path): The directory the games are journaled to.
+            results_path (Path): The database the outcomes of the games are
+                recorded in.
+        """
+        self.owns_board_pool = board_pool is None
+        self.board_pool = BoardPool(GAME_TYPES) if board_pool is None else board_pool
+        self.journal_dir = journal_dir
+        self.results_path = results_path
+        self.started = time.monotonic()
+        self.result_recorded = False
+        # Created once and kept, instead of queried on every message
+        self.game_header = GameHeader()
+        self.mines_grid = MinesGrid()
+        self.game_message = GameMessage()
+        if PROFILING_ENABLED:
+            self.profile_overlay = ProfileOverlay()
+        super().__init__()
 
     def compose(self) -> ComposeResult:
-        yield GameHeader()
-        yield MinesGrid()
+        yield self.game_header
+        yield self.mines_grid
         yield Footer()
-        yield GameMessage()
+        yield self.game_message
+        if PROFILING_ENABLED:
+            yield self.profile_overlay
 
     def game_playable(self, playable: bool) -> None:
         """Mark the game as playable, or not.
@@ -37,55 +93,173 @@ class Game(Screen[None]):
         Args:
             playable (bool): Should the game currently be playable?
         """
-        self.query_one(GameHeader).active = playable
-        self.query_one(MinesGrid).active = playable
+        self.game_header.active = playable
+        self.mines_grid.active = playable
 
     def action_new_game(self) -> None:
         """Start a new game."""
 
-        def type_choosen(game_type_choosen: GameType) -> None:
-            """Called when ChooseGameType is dismissed."""
+        def type_choosen(game_type_choosen: GameType | None) -> None:
+            """Called when ChooseGameType is dismissed, without a game type to resume."""
+            if game_type_choosen is None:
+                self.action_resume()
+                return
             self.game_type = game_type_choosen
+            field = self.board_pool.take(self.game_type)
+            journal = None
+            if field.serializable:
+                journal = JournalWriter(new_journal_path(self.journal_dir), field)
+            self.start_game(field, start_square(self.game_type), journal)
 
-            self.field = Field(
-                self.game_type.width, self.game_type.height, self.game_type.mines_prc
-            )
+        self.app.push_screen(ChooseGameType(self.journal_dir), type_choosen)
+        self.game_message.hide()
+        self.game_playable(False)
 
-            self.query_one(GameHeader).marked_mines = 0
+    def action_resume(self) -> None:
+        """Resume the most recent game saved in the journals."""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        path = latest_journal(self.journal_dir)
+        if path is None:
+            return
+        restored = restore(path)
+        field = restored.field
+        journal = JournalWriter(
+            path,
+            field,
+            moves=restored.moves,
+            elapsed_ms=restored.elapsed_ms,
+            size=restored.size,
+        )
+        self.game_type = find_game_type(field)
+        self.game_message.hide()
+        self.start_game(
+            field,
+            (field.width // 2, field.height // 2),
+            journal,
+            restored.moves,
+            restored.elapsed_ms,
+        )
 
-            mines_grid = self.query_one(MinesGrid)
-            mines_grid.field = self.field
-            mines_grid.cursor_x = self.field.width // 2
-            mines_grid.cursor_y = self.field.height // 2
+    def action_leaderboard(self) -> None:
+        """Show the win rates and the best times."""
+        # Imported on first use, to keep it out of the start-up imports
+        from leaderboard import Leaderboard  # pylint: disable=import-outside-toplevel
 
-            self.game_playable(True)
+        self.app.push_screen(Leaderboard(self.results_path))
 
-        self.app.push_screen(ChooseGameType(), type_choosen)
-        self.query_one(GameMessage).hide()
-        self.game_playable(False)
+    def start_game(
+        self,
+        field: Field,
+        cursor: tuple[int, int],
+        journal: JournalWriter | None,
+        moves: int = 0,
+        elapsed_ms: int = 0,
+    ) -> None:
+        """Start playing on the specified field.
 
-    def on_mines_grid_square_cleared(self, message: MinesGrid.SquareCleared) -> None:
-        """Handler for the SquareCleared event generated by the MinesGrid"""
-        game_header = self.query_one(GameHeader)
-        game_header.cleared_squares = message.cleared
-        game_header.total_squares = message.total
+        Args:
+            field (Field): The field, new or restored.
+            cursor (tuple[int, int]): The initial position of the cursor.
+            journal (JournalWriter | None): The journal recording the moves.
+            moves (int): The number of moves already played on the field.
+            elapsed_ms (int): The duration of the game so far.
+        """
+        if self.journal is not None:
+            self.journal.close()
+        if self.field is not None:
+            self.field.close()
+        self.journal = journal
+        self.field = field
+
+        mines_grid = self.mines_grid
+        mines_grid.journal = journal
+        # Chunked fields have neither a journal nor a history
+        mines_grid.history = None if journal is None else History(field)
+        mines_grid.field = field
+        mines_grid.cursor_x, mines_grid.cursor_y = cursor
+        mines_grid.moves = moves
+        self.started = time.monotonic() - elapsed_ms / 1000
+
+        playable = not field.mine_exploded and not field.is_cleared()
+        # A game is recorded once, when it ends first, not again when its end
+        # is undone and it ends another time
+        self.result_recorded = not playable
+        self.game_playable(playable)
+
+    def record_result(self) -> None:
+        """Record the outcome of the game that just ended, in the background."""
+        if self.result_recorded or self.results is None:
+            return
+        self.result_recorded = True
+        field = self.field
+        game_type = self.game_type
+        if game_type is None:
+            name = f"{field.width}x{field.height}"
+        else:
+            name = game_type.name
+        duration_ms = int((time.monotonic() - self.started) * 1000)
+        result = game_result(name, field, duration_ms, self.mines_grid.moves)
+        # The 3BV of a chunked field would read all its chunks
+        chunked = game_type is not None and game_type.chunked
+        self.results.record(result, None if chunked else field)
+
+    def action_toggle_profile(self) -> None:
+        """Show or hide the profiling statistics."""
+        self.profile_overlay.toggle()
 
-    def on_mines_grid_mine_marked(self, message: MinesGrid.MineMarked) -> None:
-        """Handler for the MineMarked event generated by the MinesGrid"""
-        game_header = self.query_one(GameHeader)
+    @timed("on_counters_changed")
+    def on_mines_grid_counters_changed(
+        self, message: MinesGrid.CountersChanged
+    ) -> None:
+        """Handler for the CountersChanged event generated by the MinesGrid"""
+        game_header = self.game_header
+        game_header.cleared_squares = message.cleared
+        game_header.total_squares = message.total_squares
         game_header.marked_mines = message.marked
-        game_header.total_mines = message.total
+        game_header.total_mines = message.total_mines
 
     def on_mines_grid_mine_exploded(self, message: MinesGrid.MineExploded) -> None:
         """Handler for the MineExploded event generated by the MinesGrid"""
+        self.record_result()
         self.game_playable(False)
-        self.query_one(GameMessage).show(False)
+        self.game_message.show(False)
+
+    def on_mines_grid_play_resumed(self, message: MinesGrid.PlayResumed) -> None:
+        """Handler for the PlayResumed event generated by the MinesGrid"""
+        self.game_message.hide()
+        self.game_playable(True)
 
     def on_mines_grid_field_cleared(self, message: MinesGrid.FieldCleared) -> None:
         """Handler for the FieldCleared event generated by the MinesGrid"""
+        self.record_result()
         self.game_playable(False)
-        self.query_one(GameMessage).show(True)
+        self.game_message.show(True)
 
     def on_mount(self) -> None:
         """Handler for the Mount event"""
+        mark("game mounted")
+        self.results = ResultsWriter(self.results_path)
         self.action_new_game()
+        self.call_after_refresh(mark, "first frame")
+
+    def on_unmount(self) -> None:
+        """Handler for the Unmount event"""
+        if self.owns_board_pool:
+            self.board_pool.shutdown()
+        if self.journal is not None:
+            self.journal.close()
+        if self.field is not None:
+            self.field.close()
+        if self.results is not None:
+            self.results.close()
+
+
+def find_game_type(field: Field) -> GameType | None:
+    """Returns the preset of a field, None if it has none"""
+    shape = (field.width, field.height, field.mines_perc, field.topology)
+    for game_type in GAME_TYPES:
+        if game_type[1:4] + (game_type.topology,) == shape:
+            return game_type
+    return None
@@ -21,6 +21,12 @@ class GameHeader(Widget):
     total_mines = reactive(0)
     """int: Keep track of how many mines are on the field."""
 
+    def __init__(self) -> None:
+        self.squares_label = Label(id="squares")
+        self.mines_label = Label(id="mines")
+        self.update_scheduled = False
+        super().__init__()
+
     def compose(self) -> ComposeResult:
         """Compose the game header.
 
@@ -29,14 +35,12 @@ class GameHeader(Widget):
         """
         with Horizontal():
             yield Label(self.app.title, id="app-title")
-            yield Label(id="squares")
-            yield Label(id="mines")
+            yield self.squares_label
+            yield self.mines_label
 
     def watch_active(self, new_value: bool):
         """Watch the active reactive and hide/show the labels when it changes."""
-
-        self.update_mines_label()
-        self.update_squares_label()
+        self.schedule_update()
 
     def watch_cleared_squares(self, new_value: int):
         """Watch the cleared_squares reactive and update the squares label when it changes.
@@ -44,7 +48,7 @@ class GameHeader(Widget):
         Args:
             moves (int): The number of cleared squares.
         """
-        self.update_squares_label()
+        self.schedule_update()
 
     def watch_total_squares(self, new_value: int):
         """Watch the total squares reactive and update the squares label when it changes.
@@ -52,7 +56,7 @@ class GameHeader(Widget):
         Args:
             filled (int): The number of cells that are currently on.
         """
-        self.update_squares_label()
+        self.schedule_update()
 
     def watch_marked_mines(self, new_value: int):
         """Watch the marked_mines reactive and update the label when it changes.
@@ -60,7 +64,7 @@ class GameHeader(Widget):
         Args:
             moves (int): The number of marked mines.
         """
-        self.update_mines_label()
+        self.schedule_update()
 
     def watch_total_mines(self, new_value: int):
         """Watch the total mines reactive and update the label when it changes.
@@ -68,22 +72,24 @@ class GameHeader(Widget):
         Args:
             filled (int): The number of cells that are currently on.
         """
-        self.update_mines_label()
-
-    def update_mines_label(self):
-        """Update mines label"""
-        text = (
-            f"Mines marked {self.marked_mines} of {self.total_mines}"
-            if self.active
-            else ""
-        )
-        self.query_one("#mines", Label).update(text)
-
-    def update_squares_label(self):
-        """Updates squares label"""
-        text = (
-            f"Squares cleared {self.cleared_squares} of {self.total_squares}"
-            if self.active
-            else ""
-        )
-        self.query_one("#squares", Label).update(text)
+        self.schedule_update()
+
+    def schedule_update(self):
+        """Updates the labels once the pending messages are handled, so the
+        reactives changed together are rendered together"""
+        if not self.update_scheduled:
+            self.update_scheduled = True
+            self.call_later(self.update_labels)
+
+    def update_labels(self):
+        """Updates the labels whose text changed"""
+        self.update_scheduled = False
+        if self.active:
+            squares = f"Squares cleared {self.cleared_squares} of {self.total_squares}"
+            mines = f"Mines marked {self.marked_mines} of {self.total_mines}"
+        else:
+            squares = mines = ""
+        if str(self.squares_label.renderable) != squares:
+            self.squares_label.update(squares)
+        if str(self.mines_label.renderable) != mines:
+            self.mines_label.update(mines)
@@ -0,0 +1,73 @@
+"""The game_type module"""
+
+from typing import NamedTuple
+
+from bitboard_field import BitboardField
+from chunked_field import ChunkedField
+from field import Field
+from topology import HEXAGONAL, RECTANGLE, TORUS
+
+
+class GameType(NamedTuple):
+    """Game type data"""
+
+    name: str
+    width: int
+    height: int
+    mines_prc: int
+    seed: int | None = None
+    """The seed of the boards, random boards if None"""
+    chunked: bool = False
+    """True to generate the field in chunks, on demand"""
+    bitboard: bool = False
+    """True to keep the field as bitboards, for bulk simulation"""
+    topology: str = RECTANGLE
+    """Which squares are adjacent, one of topology.TOPOLOGIES"""
+
+
+GAME_TYPES = [
+    GameType("Easy", 10, 10, 7),
+    GameType("Medium", 30, 15, 14),
+    GameType("Hard", 60, 20, 21),
+]
+
+TOPOLOGY_GAME_TYPES = [
+    GameType("Torus", 30, 15, 14, topology=TORUS),
+    GameType("Hexagonal", 30, 15, 12, topology=HEXAGONAL),
+]
+"""Fields whose squares are not laid out as a rectangle"""
+
+HUGE_GAME_TYPE = GameType("Huge", 1_000_000, 1_000_000, 15, chunked=True)
+"""A field too big to be held in memory, generated in chunks"""
+
+
+def create_field(
+    game_type: GameType, mine_map: bytearray | None = None, seed: int | None = None
+) -> Field:
+    """Creates a field of the specified game type.
+
+    Args:
+        game_type (GameType): The game type.
+        mine_map (bytearray | None): The mines to use, ignored by chunked fields.
+        seed (int | None): The seed of the field, the seed of the game type if None.
+
+    Raises:
+        ValueError: If a chunked field is not a rectangle.
+    """
+    if seed is None:
+        seed = game_type.seed
+    if game_type.chunked:
+        if game_type.topology != RECTANGLE:
+            raise ValueError(f"Unsupported chunked {game_type.topology} field")
+        return ChunkedField(
+            game_type.width, game_type.height, game_type.mines_prc, seed
+        )
+    field_class = BitboardField if game_type.bitboard else Field
+    return field_class(
+        game_type.width,
+        game_type.height,
+        game_type.mines_prc,
+        mine_map,
+        seed,
+        game_type.topology,
+    )
@@ -0,0 +1,66 @@
+"""Generation of boards that can be cleared without guessing"""
+
+import random
+
+from field import Field
+from game_type import GameType
+from solver import Solver
+
+
+def start_square(game_type: GameType) -> tuple[int, int]:
+    """Returns the square the player starts from, where the cursor is placed.
+    Field.plant_mines keeps it and its neighbours empty."""
+    return game_type.width // 2, game_type.height // 2
+
+
+def is_solvable(field: Field, start: tuple[int, int]) -> bool:
+    """Plays the field from the start square with the solver only.
+
+    Returns:
+        bool: True if every square without a mine could be revealed without guessing.
+    """
+    free_squares = field.width * field.height - field.total_mines
+    solver = Solver(field)
+    solver.update(field.reveal_square(*start))
+    while field.cleared_squares - field.marked_mines < free_squares:
+        if solver.safe:
+            changed = []
+            for index in list(solver.safe):
+                y, x = divmod(index, field.width)
+                changed.extend(field.reveal_square(x, y))
+            solver.update(changed)
+        elif solver.mines:
+            marked = list(solver.mines)
+            for index in marked:
+                y, x = divmod(index, field.width)
+                field.toggle_mine_marker(x, y)
+            solver.update(marked)
+        else:
+            return False
+    return True
+
+
+def generate_no_guess(
+    game_type: GameType, rng: random.Random, max_attempts: int | None = None
+) -> int | None:
+    """Finds the seed of a board that can be cleared from the start square
+    without guessing, trying the seeds drawn from rng.
+
+    Returns:
+        int | None: The seed, which plants the board in any field of the game
+            type, or None if no board was found in max_attempts.
+    """
+    attempt = 0
+    while max_attempts is None or attempt < max_attempts:
+        attempt += 1
+        seed = rng.getrandbits(64)
+        field = Field(
+            game_type.width,
+            game_type.height,
+            game_type.mines_prc,
+            seed=seed,
+            topology=game_type.topology,
+        )
+        if is_solvable(field, start_square(game_type)):
+            return seed
+    return None
@@ -1,11 +1,18 @@
 """Help screen"""
 
+from functools import lru_cache
 from pathlib import Path
 from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.widgets import Markdown
 
 
+@lru_cache(maxsize=None)
+def help_markdown() -> str:
+    """Returns the help document, read from disk once"""
+    return Path(__file__).with_suffix(".md").read_text()
+
+
 class Help(Screen):
     """The help screen for the application."""
 
@@ -18,4 +25,4 @@ class Help(Screen):
         Returns:
             ComposeResult: The result of composing the help screen.
         """
-        yield Markdown(Path(__file__).with_suffix(".md").read_text())
+        yield Markdown(help_markdown())
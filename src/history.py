@@ -0,0 +1,157 @@
+"""Undo and redo of the moves played on a field.
+
+The masked and marked planes of the field are split in pages of PAGE_SIZE
+squares. The history keeps every page as of the last move, as immutable
+bytes; a step keeps only the pages a move changed, before and after it,
+and the counters of the field. The page before a step is the page after
+the previous step that changed it, the same object, so the unchanged
+squares are never copied and undoing or redoing a step copies back only
+its pages.
+"""
+
+from array import array
+from collections import deque
+from typing import Iterable, NamedTuple
+
+from field import Field
+
+PAGE_SIZE = 64
+"""The number of squares of a page"""
+
+PLANES = ("mask_map", "flag_map")
+"""The planes changed by the moves, the mines and their counts never change"""
+
+MAX_BYTES = 8 << 20
+"""The default size of the pages kept by the steps"""
+
+
+class Counters(NamedTuple):
+    """The running counters of a field"""
+
+    cleared_squares: int
+    marked_mines: int
+    mine_exploded: bool
+
+
+class Page(NamedTuple):
+    """A page of a plane changed by a step"""
+
+    plane: str
+    number: int
+    before: bytes
+    after: bytes
+
+
+class Step(NamedTuple):
+    """The changes of one batch of moves"""
+
+    pages: list[Page]
+    changed: array
+    """The indexes of the squares changed, in increasing order"""
+    before: Counters
+    after: Counters
+    size: int
+    """The number of bytes of the pages and the indexes"""
+
+
+class History:
+    """The undo and redo steps of a field, played with bytearray planes.
+
+    The oldest steps are dropped when the pages kept by the steps exceed
+    max_bytes.
+    """
+
+    def __init__(self, field: Field, max_bytes: int = MAX_BYTES):
+        """
+        Args:
+            field (Field): The field the moves are played on.
+            max_bytes (int): The size of the pages to keep at most.
+        """
+        self.field = field
+        self.max_bytes = max_bytes
+        self.pages: dict[str, list[bytes]] = {}
+        for name in PLANES:
+            plane = getattr(field, name)
+            self.pages[name] = [
+                bytes(plane[start : start + PAGE_SIZE])
+                for start in range(0, len(plane), PAGE_SIZE)
+            ]
+        self.counters = self.read_counters()
+        self.undo_steps: deque[Step] = deque()
+        self.redo_steps: list[Step] = []
+        self.size = 0
+
+    def read_counters(self) -> Counters:
+        """Returns the current counters of the field"""
+        field = self.field
+        return Counters(field.cleared_squares, field.marked_mines, field.mine_exploded)
+
+    def record(self, changed: Iterable[int]) -> None:
+        """Records the step of the moves just played, dropping the undone steps.
+
+        Args:
+            changed: The indexes of the squares the moves changed.
+        """
+        changed = array("I", sorted(set(changed)))
+        numbers = sorted({index // PAGE_SIZE for index in changed})
+        pages = []
+        for name in PLANES:
+            plane = getattr(self.field, name)
+            kept = self.pages[name]
+            for number in numbers:
+                start = number * PAGE_SIZE
+                after = bytes(plane[start : start + PAGE_SIZE])
+                if after != kept[number]:
+                    pages.append(Page(name, number, kept[number], after))
+                    kept[number] = after
+        if not pages:
+            return
+
+        counters = self.read_counters()
+        size = sum(len(page.before) + len(page.after) for page in pages)
+        size += changed.itemsize * len(changed)
+        self.undo_steps.append(Step(pages, changed, self.counters, counters, size))
+        self.counters = counters
+        self.size += size
+        self.size -= sum(step.size for step in self.redo_steps)
+        self.redo_steps.clear()
+        while self.size > self.max_bytes and self.undo_steps:
+            self.size -= self.undo_steps.popleft().size
+
+    def undo(self) -> list[int]:
+        """Takes back the last step.
+
+        Returns:
+            list[int]: The indexes of the squares that changed.
+        """
+        if not self.undo_steps:
+            return []
+        step = self.undo_steps.pop()
+        self.redo_steps.append(step)
+        return self.restore(step, undo=True)
+
+    def redo(self) -> list[int]:
+        """Plays again the last step taken back.
+
+        Returns:
+            list[int]: The indexes of the squares that changed.
+        """
+        if not self.redo_steps:
+            return []
+        step = self.redo_steps.pop()
+        self.undo_steps.append(step)
+        return self.restore(step, undo=False)
+
+    def restore(self, step: Step, undo: bool) -> list[int]:
+        """Copies back the pages and the counters of one side of a step"""
+        field = self.field
+        for name, number, before, after in step.pages:
+            page = before if undo else after
+            start = number * PAGE_SIZE
+            getattr(field, name)[start : start + len(page)] = page
+            self.pages[name][number] = page
+
+        counters = step.before if undo else step.after
+        field.cleared_squares, field.marked_mines, field.mine_exploded = counters
+        self.counters = counters
+        return step.changed.tolist()
@@ -0,0 +1,297 @@
+"""The move journal module.
+
+A journal is an append-only file of records, each one a kind byte and a
+payload size followed by the payload:
+    SNAPSHOT: the number of moves before it and the duration of the game,
+        then the field in the format of Field.to_bytes
+    MOVES: a batch of moves, MOVE.size bytes each
+    UNDO: the squares changed by an undo or a redo, UNDO_HEADER then runs
+        of whole pages of history.PAGE_SIZE squares, each one RUN and the
+        bit-packed masked and marked planes of its squares
+
+The first record is a snapshot of the new field. Restoring a game loads
+the last snapshot and plays again only the moves and the undos recorded
+after it.
+"""
+
+import struct
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterator, NamedTuple, Sequence
+
+from board_format import pack_plane, plane_size, unpack_plane
+from field import Field
+from history import PAGE_SIZE
+
+JOURNAL_DIR = Path.home() / ".minesweeper" / "journals"
+
+KEEP_JOURNALS = 20
+"""The number of journals kept in a directory, the oldest are deleted"""
+
+SNAPSHOT = ord("S")
+MOVES = ord("M")
+UNDO = ord("U")
+RECORD = struct.Struct("<BI")
+"""kind, payload size"""
+SNAPSHOT_HEADER = struct.Struct("<II")
+"""moves before the snapshot, milliseconds since the start of the game"""
+
+MOVE = struct.Struct("<BIII")
+"""action of field, x, y, milliseconds since the start of the game"""
+
+UNDO_HEADER = struct.Struct("<IIIB")
+"""milliseconds since the start of the game, cleared squares, marked mines,
+mine exploded"""
+RUN = struct.Struct("<II")
+"""first square, number of squares"""
+
+
+class Move(NamedTuple):
+    """A move of the player"""
+
+    action: int
+    x: int
+    y: int
+    elapsed_ms: int
+
+
+def apply_move(field: Field, move: Move) -> list[int]:
+    """Plays a move on the field.
+
+    Returns:
+        list[int]: The indexes of the squares that changed.
+    """
+    return field.apply_actions([(move.action, move.x, move.y)]).changed
+
+
+def apply_undo(field: Field, payload: memoryview) -> int:
+    """Copies the squares and the counters of an UNDO record to the field.
+
+    Returns:
+        int: The milliseconds since the start of the game of the undo.
+    """
+    elapsed_ms, cleared_squares, marked_mines, exploded = UNDO_HEADER.unpack_from(
+        payload
+    )
+    offset = UNDO_HEADER.size
+    while offset < len(payload):
+        start, squares_count = RUN.unpack_from(payload, offset)
+        offset += RUN.size
+        size = plane_size(squares_count)
+        for plane in (field.mask_map, field.flag_map):
+            squares = unpack_plane(payload[offset : offset + size], squares_count)
+            plane[start : start + squares_count] = squares
+            offset += size
+    field.cleared_squares, field.marked_mines = cleared_squares, marked_mines
+    field.mine_exploded = bool(exploded)
+    return elapsed_ms
+
+
+class JournalWriter:
+    """Records the moves of a game in a journal file.
+
+    The moves are written in batches of batch_size, and a snapshot of the
+    field is written every snapshot_interval moves.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        field: Field,
+        batch_size: int = 32,
+        snapshot_interval: int = 512,
+        moves: int = 0,
+        elapsed_ms: int = 0,
+        size: int | None = None,
+    ):
+        """
+        Args:
+            path (Path): The journal file, appended to if it exists.
+            field (Field): The field the moves are played on.
+            batch_size (int): The number of moves written at once.
+            snapshot_interval (int): The number of moves between two snapshots.
+            moves (int): The number of moves already in the journal.
+            elapsed_ms (int): The duration of the game already in the journal.
+            size (int | None): The size of the complete records of the journal,
+                the file is truncated to it to drop a record cut by a crash.
+        """
+        self.path = path
+        self.field = field
+        self.batch_size = batch_size
+        self.snapshot_interval = snapshot_interval
+        self.moves = moves
+        self.elapsed_ms = elapsed_ms
+        self.pending: list[bytes] = []
+        self._start = time.monotonic() - elapsed_ms / 1000
+        self._last_snapshot = moves
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("ab") as file:
+            if size is not None:
+                file.truncate(size)
+        if moves == 0:
+            self.write_snapshot()
+
+    def record(self, action: int, x: int, y: int) -> None:
+        """Records a move, after it was played on the field"""
+        self.elapsed_ms = int((time.monotonic() - self._start) * 1000)
+        self.pending.append(MOVE.pack(action, x, y, self.elapsed_ms))
+        self.moves += 1
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        if self.moves - self._last_snapshot >= self.snapshot_interval:
+            self.write_snapshot()
+
+    def write_record(self, kind: int, payload: bytes) -> None:
+        """Appends a record to the journal, written to disk at once"""
+        with self.path.open("ab") as file:
+            file.write(RECORD.pack(kind, len(payload)) + payload)
+
+    def flush(self) -> None:
+        """Writes the pending moves to disk"""
+        if self.pending:
+            self.write_record(MOVES, b"".join(self.pending))
+            self.pending.clear()
+
+    def record_undo(self, changed: Sequence[int]) -> None:
+        """Writes the pending moves and the squares changed by an undo or a
+        redo, after it was played on the field.
+
+        Only the pages holding the changed squares are written, in runs of
+        consecutive pages, so the record stays small on the largest fields.
+
+        Args:
+            changed: The indexes of the squares the undo or the redo changed,
+                in increasing order as History.undo and History.redo return them.
+        """
+        self.flush()
+        self.elapsed_ms = int((time.monotonic() - self._start) * 1000)
+        field = self.field
+        parts = [
+            UNDO_HEADER.pack(
+                self.elapsed_ms,
+                field.cleared_squares,
+                field.marked_mines,
+                field.mine_exploded,
+            )
+        ]
+        squares_count, count = len(field.mask_map), len(changed)
+        position = 0
+        while position < count:
+            # The changed squares are sorted and distinct, the squares of a
+            # page are found by bisecting at most PAGE_SIZE of them
+            start = changed[position] // PAGE_SIZE * PAGE_SIZE
+            end = start + PAGE_SIZE
+            position = bisect_left(
+                changed, end, position, min(position + PAGE_SIZE, count)
+            )
+            while position < count and changed[position] < end + PAGE_SIZE:
+                end += PAGE_SIZE
+                position = bisect_left(
+                    changed, end, position, min(position + PAGE_SIZE, count)
+                )
+            end = min(end, squares_count)
+            parts.append(RUN.pack(start, end - start))
+            parts.append(pack_plane(field.mask_map[start:end]))
+            parts.append(pack_plane(field.flag_map[start:end]))
+        self.write_record(UNDO, b"".join(parts))
+
+    def write_snapshot(self) -> None:
+        """Writes the pending moves and a snapshot of the field"""
+        self.flush()
+        header = SNAPSHOT_HEADER.pack(self.moves, self.elapsed_ms)
+        self.write_record(SNAPSHOT, header + self.field.to_bytes())
+        self._last_snapshot = self.moves
+
+    def close(self) -> None:
+        """Writes the pending moves"""
+        self.flush()
+
+
+def read_records(data: memoryview) -> Iterator[tuple[int, int, memoryview]]:
+    """Returns the kind, offset and payload of every record of a journal.
+    A truncated last record, left by a crash, is ignored."""
+    offset = 0
+    while offset + RECORD.size <= len(data):
+        kind, size = RECORD.unpack_from(data, offset)
+        start = offset + RECORD.size
+        if start + size > len(data):
+            return
+        yield kind, offset, data[start : start + size]
+        offset = start + size
+
+
+def read_moves(payload: memoryview) -> Iterator[Move]:
+    """Returns the moves of a MOVES record"""
+    for fields in MOVE.iter_unpack(payload):
+        yield Move(*fields)
+
+
+class Restored(NamedTuple):
+    """A game restored from a journal"""
+
+    field: Field
+    moves: int
+    """The number of moves in the journal"""
+    elapsed_ms: int
+    """The duration of the game when its last move was played"""
+    size: int
+    """The offset of the end of the last complete record"""
+
+
+def restore(path: Path, from_start: bool = False) -> Restored:
+    """Restores the game of a journal.
+
+    Args:
+        path (Path): The journal file.
+        from_start (bool): Replay every move and undo from the first snapshot,
+            instead of starting from the last snapshot.
+    """
+    data = memoryview(path.read_bytes())
+    snapshot = None
+    records: list[tuple[int, memoryview]] = []
+    size = 0
+    for kind, offset, payload in read_records(data):
+        size = offset + RECORD.size + len(payload)
+        if kind == SNAPSHOT and (snapshot is None or not from_start):
+            snapshot = payload
+            records.clear()
+        elif kind in (MOVES, UNDO):
+            records.append((kind, payload))
+    if snapshot is None:
+        raise ValueError(f"{path} has no snapshot")
+
+    moves, elapsed_ms = SNAPSHOT_HEADER.unpack_from(snapshot)
+    field = Field.from_bytes(snapshot, SNAPSHOT_HEADER.size)
+    for kind, payload in records:
+        if kind == UNDO:
+            elapsed_ms = apply_undo(field, payload)
+            continue
+        for move in read_moves(payload):
+            apply_move(field, move)
+            moves += 1
+            elapsed_ms = move.elapsed_ms
+    return Restored(field, moves, elapsed_ms, size)
+
+
+def new_journal_path(directory: Path = JOURNAL_DIR, keep: int = KEEP_JOURNALS) -> Path:
+    """Returns the path of a new journal in directory, deleting the oldest
+    journals so that keep are left with the new one.
+
+    Raises:
+        ValueError: If keep is not positive.
+    """
+    if keep < 1:
+        raise ValueError(f"At least one journal is kept, not {keep}")
+    journals = sorted(directory.glob("*.journal"))
+    for path in journals[: max(len(journals) - keep + 1, 0)]:
+        path.unlink(missing_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}"
+    return directory / f"{name}.journal"
+
+
+def latest_journal(directory: Path = JOURNAL_DIR) -> Path | None:
+    """Returns the most recent journal of directory, if any"""
+    journals = sorted(directory.glob("*.journal"))
+    return journals[-1] if journals else None
@@ -0,0 +1,106 @@
+"""The leaderboard screen module"""
+
+import time
+from pathlib import Path
+
+from rich.table import Table
+from textual.app import ComposeResult
+from textual.containers import VerticalScroll
+from textual.screen import Screen
+from textual.widgets import Static
+
+from results import (
+    RESULTS_PATH,
+    GameResult,
+    PresetTotals,
+    best_times,
+    preset_totals,
+    read_only,
+)
+
+
+def format_ms(duration_ms: int) -> str:
+    """Returns a duration as minutes and seconds"""
+    minutes, seconds = divmod(duration_ms / 1000, 60)
+    return f"{int(minutes)}:{seconds:04.1f}"
+
+
+class Leaderboard(Screen):
+    """The win rates and the best times of every game type played.
+
+    Every query reads a table of totals or an index, so the screen opens
+    at once however many games were recorded.
+    """
+
+    BINDINGS = [("escape,space,q,l", "pop_screen", "Close")]
+    """Bindings for the leaderboard screen."""
+
+    def __init__(self, results_path: Path = RESULTS_PATH, limit: int = 10) -> None:
+        """
+        Args:
+            results_path (Path): The database of the results.
+            limit (int): The number of best times shown per game type.
+        """
+        self.results_path = results_path
+        self.limit = limit
+        super().__init__()
+
+    def compose(self) -> ComposeResult:
+        """Compose the tables of the results.
+
+        Returns:
+            ComposeResult: The result of composing the leaderboard screen.
+        """
+        connection = read_only(self.results_path)
+        if connection is None:
+            yield Static("No game finished yet")
+            return
+        try:
+            totals = preset_totals(connection)
+            best = {
+                preset.game_type: best_times(connection, preset.game_type, self.limit)
+                for preset in totals
+            }
+        finally:
+            connection.close()
+
+        with VerticalScroll():
+            yield Static(totals_table(totals))
+            for game_type, results in best.items():
+                yield Static(best_times_table(game_type, results))
+
+
+def totals_table(totals: list[PresetTotals]) -> Table:
+    """Returns the table of the win rates of every game type"""
+    table = Table("game type", "games", "wins", "win rate", "mean win")
+    table.title = "Statistics"
+    for game_type, games, wins, won_ms in totals:
+        table.add_row(
+            game_type,
+            str(games),
+            str(wins),
+            f"{wins / games:.0%}",
+            format_ms(won_ms // wins) if wins else "",
+        )
+    return table
+
+
+def best_times_table(game_type: str, results: list[GameResult]) -> Table:
+    """Returns the table of the best times of a game type"""
+    table = Table("#", "time", "clicks", "3BV", "3BV/s", "seed", "date")
+    table.title = f"{game_type} best times"
+    for place, result in enumerate(results, 1):
+        three_bv = result.three_bv
+        speed = ""
+        if three_bv is not None and result.duration_ms:
+            speed = f"{three_bv * 1000 / result.duration_ms:.2f}"
+        table.add_row(
+            str(place),
+            format_ms(result.duration_ms),
+            str(result.clicks),
+            "" if three_bv is None else str(three_bv),
+            speed,
+            "" if result.seed is None else str(result.seed),
+            time.strftime("%Y-%m-%d", time.localtime(result.finished_at)),
+        )
+    return table
@@ -0,0 +1,170 @@
+"""Load test of the multiplayer server, with many concurrent games.
+
+Usage: python load_test.py --games 2000 --players 2 --moves 50
+
+Starts a server in the same process unless --port is given.
+"""
+
+import argparse
+import asyncio
+import random
+import resource
+import statistics
+import time
+
+from engine import GameStatus
+from field import CLEAR, MARK
+from game_type import GAME_TYPES
+from server import (
+    ACTION,
+    ACTION_PAYLOAD,
+    DELTA,
+    DELTA_HEADER,
+    FRAME,
+    GAME,
+    GAME_HEADER,
+    JOIN,
+    JOIN_PAYLOAD,
+    NEW_GAME,
+    SERVER_GAME_TYPES,
+    STATUSES,
+    GameServer,
+    encode_frame,
+)
+
+PLAYING = STATUSES.index(GameStatus.PLAYING)
+
+
+class LoadClient:
+    """A player connection that makes random moves"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.game_id = 0
+        self.player_id = 0
+        self.width = 0
+        self.height = 0
+        self.frames = 0
+        self.latencies: list[float] = []
+
+    async def read_frame(self) -> tuple[int, bytes]:
+        """Reads the next frame, updating the game on a GAME frame"""
+        kind, size = FRAME.unpack(await self.reader.readexactly(FRAME.size))
+        payload = await self.reader.readexactly(size)
+        self.frames += 1
+        if kind == GAME:
+            header = GAME_HEADER.unpack_from(payload)
+            self.game_id, self.player_id, self.width, self.height = header
+        return kind, payload
+
+    async def join(self, game_type_index: int, game_id: int) -> None:
+        """Joins a game and waits for its field"""
+        self.writer.write(
+            encode_frame(JOIN, JOIN_PAYLOAD.pack(game_type_index, game_id))
+        )
+        while (await self.read_frame())[0] != GAME:
+            pass
+
+    async def play(self, moves: int, rng: random.Random) -> None:
+        """Makes random moves, restarting the game when this player ends it"""
+        for _ in range(moves):
+            action = MARK if rng.random() < 0.2 else CLEAR
+            x = rng.randrange(self.width)
+            y = rng.randrange(self.height)
+            start = time.perf_counter()
+            self.writer.write(encode_frame(ACTION, ACTION_PAYLOAD.pack(action, x, y)))
+            while True:
+                kind, payload = await self.read_frame()
+                if kind != DELTA:
+                    continue
+                player_id, status, cells = DELTA_HEADER.unpack_from(payload)
+                if player_id == self.player_id:
+                    break
+            self.latencies.append(time.perf_counter() - start)
+            if status != PLAYING and cells:
+                self.writer.write(encode_frame(NEW_GAME, b""))
+
+    async def close(self) -> None:
+        """Closes the connection"""
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play_game(
+    host: str, port: int, game_type_index: int, players: int, moves: int, seed: int
+) -> list[LoadClient]:
+    """Plays one shared game with several clients"""
+    clients = [LoadClient(*await asyncio.open_connection(host, port))]
+    await clients[0].join(game_type_index, 0)
+    for _ in range(players - 1):
+        client = LoadClient(*await asyncio.open_connection(host, port))
+        await client.join(game_type_index, clients[0].game_id)
+        clients.append(client)
+    rng = random.Random(seed)
+    await asyncio.gather(*(client.play(moves, rng) for client in clients))
+    for client in clients:
+        await client.close()
+    return clients
+
+
+async def load_test(args: argparse.Namespace) -> None:
+    """Runs the games concurrently and prints the throughput"""
+    server = None
+    port = args.port
+    if not port:
+        game_server = GameServer()
+        server = await game_server.serve(args.host, 0)
+        port = server.sockets[0].getsockname()[1]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            play_game(args.host, port, args.game_type, args.players, args.moves, seed)
+            for seed in range(args.games)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+
+    clients = [client for game in results for client in game]
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    frames = sum(client.frames for client in clients)
+    print(
+        f"{args.games} games of {SERVER_GAME_TYPES[args.game_type].name}, "
+        f"{len(clients)} players: {len(latencies)} moves in {elapsed:.2f}s, "
+        f"{len(latencies) / elapsed:.0f} moves/s, {frames / elapsed:.0f} frames/s"
+    )
+    print(
+        f"latency median {statistics.median(latencies) * 1000:.2f} ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms"
+    )
+
+
+def main():
+    """Parse the command line and run the load test"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=2, help="players per game")
+    parser.add_argument("--moves", type=int, default=50, help="moves per player")
+    parser.add_argument(
+        "--game-type",
+        type=int,
+        default=len(GAME_TYPES) - 1,
+        help="index of the game type, Huge is the last one",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0 to serve in-process")
+    args = parser.parse_args()
+
+    # Each player and, in-process, each server side holds a socket
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    asyncio.run(load_test(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,28 @@
 """Main code of the game"""
 
+# pylint: disable=wrong-import-position
+from startup import mark, report
+
+import argparse
+import cProfile
+from functools import lru_cache
+from pathlib import Path
+
 from textual.app import App
+from textual.screen import Screen
+from board_pool import BoardPool
 from game import Game
-from help import Help
+from game_type import GAME_TYPES
+from profiling import CPROFILE_PATH, JSON_PATH, STATS
+
+mark("imports")
+
+
+def help_screen() -> Screen:
+    """Creates the help screen, importing it on first use"""
+    from help import Help  # pylint: disable=import-outside-toplevel
+
+    return Help()
 
 
 class MinesweeperApp(App):
@@ -15,17 +35,82 @@ class MinesweeperApp(App):
         "game_header.css",
         "game_message.css",
         "help.css",
+        "leaderboard.css",
         "mines_grid.css",
+        "profile_overlay.css",
     ]
-    SCREENS = {"help": Help}
+    SCREENS = {"help": help_screen}
 
     TITLE = "MineSweeper"
 
+    def __init__(
+        self, bundle_css: bool = False, board_pool: BoardPool | None = None
+    ) -> None:
+        """
+        Args:
+            bundle_css (bool): Load the stylesheets as one bundled source, read once
+                per process, instead of reading every file. Disables CSS live reload.
+            board_pool (BoardPool | None): The pool the games draw their boards
+                from, the main screen starts one of its own if None.
+        """
+        self.board_pool = board_pool
+        super().__init__()
+        if bundle_css:
+            self.css_path = []
+            self.CSS = bundled_css()  # pylint: disable=invalid-name
+        mark("app created")
+
     def on_mount(self) -> None:
         """Show the main screen"""
-        self.push_screen(Game())
+        self.push_screen(self.create_game())
+
+    def create_game(self) -> Game:
+        """Returns the main screen"""
+        return Game(self.board_pool)
+
+
+@lru_cache(maxsize=None)
+def bundled_css() -> str:
+    """Returns the stylesheets of MinesweeperApp.CSS_PATH joined in one source"""
+    folder = Path(__file__).parent
+    return "\n".join(
+        (folder / css_path).read_text() for css_path in MinesweeperApp.CSS_PATH
+    )
+
+
+def main():
+    """Parse the command line and run the game"""
+    parser = argparse.ArgumentParser(description="MineSweeper")
+    parser.add_argument(
+        "--bundle-css",
+        action="store_true",
+        help="load the stylesheets as one bundled source",
+    )
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="report import and mount timings on exit",
+    )
+    args = parser.parse_args()
+
+    # Started first, so the workers generate boards while the app starts
+    board_pool = BoardPool(GAME_TYPES)
+    mark("board pool")
+    app = MinesweeperApp(bundle_css=args.bundle_css, board_pool=board_pool)
+    try:
+        if CPROFILE_PATH:
+            profiler = cProfile.Profile()
+            profiler.runcall(app.run)
+            profiler.dump_stats(CPROFILE_PATH)
+        else:
+            app.run()
+    finally:
+        board_pool.shutdown()
+    if JSON_PATH:
+        STATS.export_json(Path(JSON_PATH))
+    if args.startup_profile:
+        print(report())
 
 
 if __name__ == "__main__":
-    app = MinesweeperApp()
-    app.run()
+    main()
@@ -0,0 +1,85 @@
+"""Neighbour mine counting for the whole minefield.
+
+The batched engine packs the mine mask, padded with a one square border,
+into a single big integer with one byte per square. Adding copies of that
+integer shifted by one square and by one padded row sums the 3x3
+neighbourhood of every square at once; a count never exceeds 8, so the
+bytes never carry into each other. It only knows the rectangle, the other
+topologies are counted from their neighbour tables.
+"""
+
+from topology import NeighbourTable
+
+
+def count_mines_batched(mine_map: bytearray, width: int, height: int) -> bytearray:
+    """Returns the number of adjacent mines for every square.
+
+    Args:
+        mine_map (bytearray): 1 for every square with a mine, indexed by `y * width + x`.
+        width (int): The width of the field.
+        height (int): The height of the field.
+    """
+    stride = width + 2
+    padded = bytearray(stride * (height + 2))
+    for y in range(height):
+        start = (y + 1) * stride + 1
+        padded[start : start + width] = mine_map[y * width : (y + 1) * width]
+
+    mines = int.from_bytes(padded, "little")
+    rows = mines + (mines << 8) + (mines >> 8)
+    counts = rows + (rows << (8 * stride)) + (rows >> (8 * stride)) - mines
+
+    # The left shifts spill past the padded area, the extra bytes are dropped.
+    summed = counts.to_bytes(len(padded) + stride + 1, "little")
+
+    count_map = bytearray(width * height)
+    for y in range(height):
+        start = (y + 1) * stride + 1
+        count_map[y * width : (y + 1) * width] = summed[start : start + width]
+    return count_map
+
+
+def count_mines_table(mine_map: bytearray, table: NeighbourTable) -> bytearray:
+    """Returns the number of adjacent mines for every square, of any topology.
+
+    Each mine adds one to the count of its neighbours, so the cost grows
+    with the number of mines rather than the number of squares.
+    """
+    offsets, indexes = table
+    count_map = bytearray(len(mine_map))
+    index = mine_map.find(1)
+    while index >= 0:
+        for neighbour in indexes[offsets[index] : offsets[index + 1]]:
+            count_map[neighbour] += 1
+        index = mine_map.find(1, index + 1)
+    return count_map
+
+
+def count_mines_scalar(mine_map: bytearray, width: int, height: int) -> bytearray:
+    """Returns the number of adjacent mines for every square, visiting each square.
+
+    This is the reference implementation for `count_mines_batched`.
+    """
+    count_map = bytearray(width * height)
+    for y in range(height):
+        row = y * width
+        for x in range(width):
+            mines = 0
+            if x > 0 and y > 0:
+                mines += mine_map[row - width + x - 1]
+            if x > 0:
+                mines += mine_map[row + x - 1]
+            if x > 0 and y < height - 1:
+                mines += mine_map[row + width + x - 1]
+            if y < height - 1:
+                mines += mine_map[row + width + x]
+            if x < width - 1 and y < height - 1:
+                mines += mine_map[row + width + x + 1]
+            if x < width - 1:
+                mines += mine_map[row + x + 1]
+            if x < width - 1 and y > 0:
+                mines += mine_map[row - width + x + 1]
+            if y > 0:
+                mines += mine_map[row - width + x]
+            count_map[row + x] = mines
+    return count_map
@@ -1,16 +1,25 @@
 """The mines_grid module"""
 
-from rich.text import Text
+from functools import lru_cache
+
+from rich.segment import Segment
 from rich.style import Style
 
-from textual.app import RenderResult
 from textual.binding import Binding
 from textual.events import Click, MouseMove
+from textual.geometry import Region, Size
 from textual.message import Message
 from textual.reactive import reactive
-from textual.widget import Widget
+from textual.screen import UPDATE_PERIOD
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.timer import Timer
 
-from field import Field
+from field import CHORD, CLEAR, MARK, Delta, Field
+from history import History
+from journal import JournalWriter
+from profiling import ENABLED as PROFILING_ENABLED, count, timed
+from solver import Solver
 
 CURSOR = 1
 EMPTY = CURSOR + 1
@@ -26,29 +35,61 @@ MINES_7 = MINES_6 + 1
 MINES_8 = MINES_7 + 1
 MINE = MINES_8 + 1
 
-
-class MinesGrid(Widget, can_focus=True):
+STYLES = {
+    CURSOR: Style(color="red", blink=True, bold=True),
+    MASKED: Style(color="white", bgcolor="white"),
+    MARKED: Style(color="red", bgcolor="white"),
+    EMPTY: Style(color="white", bgcolor="black"),
+    MINES_1: Style(color="green", bgcolor="black"),
+    MINES_2: Style(color="green", bgcolor="black"),
+    MINES_3: Style(color="yellow", bgcolor="black"),
+    MINES_4: Style(color="yellow", bgcolor="black"),
+    MINES_5: Style(color="yellow", bgcolor="black"),
+    MINES_6: Style(color="red", bgcolor="black"),
+    MINES_7: Style(color="red", bgcolor="black"),
+    MINES_8: Style(color="red", bgcolor="black"),
+    MINE: Style(color="red", bgcolor="black"),
+}
+
+CURSOR_SEGMENT = Segment("*", STYLES[CURSOR])
+MASKED_SEGMENT = Segment(" ", STYLES[MASKED])
+MARKED_SEGMENT = Segment("*", STYLES[MARKED])
+MINE_SEGMENT = Segment("*", STYLES[MINE])
+COUNT_SEGMENTS = [Segment(" ", STYLES[EMPTY])] + [
+    Segment(str(mines), STYLES[MINES_1 + mines - 1]) for mines in range(1, 9)
+]
+
+MOUSE_MOVE_PERIOD = UPDATE_PERIOD
+"""Seconds between two cursor moves following the mouse, one per screen update"""
+
+
+@lru_cache(maxsize=16)
+def cursor_strip(style: Style) -> Strip:
+    """Returns the cursor in the style of a grid, shared by every grid"""
+    return Strip([CURSOR_SEGMENT]).apply_style(style)
+
+
+class MinesGrid(ScrollView, can_focus=True):
     """The main playable grid of game cells."""
 
-    class SquareCleared(Message):
-        """Mines marked changed message"""
+    class CountersChanged(Message):
+        """The cleared squares or marked mines changed, sent once per batch of actions"""
 
-        def __init__(self, cleared: int, total: int) -> None:
+        def __init__(
+            self, cleared: int, total_squares: int, marked: int, total_mines: int
+        ) -> None:
             self.cleared = cleared
-            self.total = total
-            super().__init__()
-
-    class MineMarked(Message):
-        """Mines marked changed message"""
-
-        def __init__(self, marked: int, total: int) -> None:
+            self.total_squares = total_squares
             self.marked = marked
-            self.total = total
+            self.total_mines = total_mines
             super().__init__()
 
     class MineExploded(Message):
         """A mine exploded"""
 
+    class PlayResumed(Message):
+        """The end of the game was undone"""
+
     class FieldCleared(Message):
         """The field was cleared"""
 
@@ -59,65 +100,113 @@ class MinesGrid(Widget, can_focus=True):
         Binding("right", "move_right", "Move Right", False),
         Binding("m", "mark", "mark", False),
         Binding("space", "clear", "Toggle", False),
+        Binding("c", "chord", "Chord", False),
+        Binding("h", "hint", "Hint", False),
+        Binding("u", "undo", "Undo", False),
+        Binding("y", "redo", "Redo", False),
     ]
 
     field = reactive(Field(10, 10, 7), layout=True)
     active = reactive(False)
-    cursor_x = reactive(0)
-    cursor_y = reactive(0)
+    cursor_x = reactive(0, repaint=False)
+    cursor_y = reactive(0, repaint=False)
 
     def __init__(self) -> None:
         self.total_mines = 0
         self.total_squares = 0
+        self.solver: Solver | None = None
+        self.journal: JournalWriter | None = None
+        self.history: History | None = None
+        # The number of moves played on the field, undone ones included
+        self.moves = 0
+        self._lines: dict[int, Strip] = {}
+        self._lines_key: tuple = ()
+        self._cursor_rows: set[int] = set()
+        self._mouse_position: tuple[int, int] | None = None
+        self._mouse_timer: Timer | None = None
 
         super().__init__()
 
-    def render(self) -> RenderResult:
-        if not self.active:
-            return Text("")
-
-        styles = {
-            CURSOR: Style(color="red", blink=True, bold=True),
-            MASKED: Style(color="white", bgcolor="white"),
-            MARKED: Style(color="red", bgcolor="white"),
-            EMPTY: Style(color="white", bgcolor="black"),
-            MINES_1: Style(color="green", bgcolor="black"),
-            MINES_2: Style(color="green", bgcolor="black"),
-            MINES_3: Style(color="yellow", bgcolor="black"),
-            MINES_4: Style(color="yellow", bgcolor="black"),
-            MINES_5: Style(color="yellow", bgcolor="black"),
-            MINES_6: Style(color="red", bgcolor="black"),
-            MINES_7: Style(color="red", bgcolor="black"),
-            MINES_8: Style(color="red", bgcolor="black"),
-            MINE: Style(color="red", bgcolor="black"),
-        }
-
-        field_text = Text("")
-        for y, row in enumerate(self.field.squares):
-            if y > 0:
-                field_text.append("\n")
-            for x, square in enumerate(row):
-                cell_text = Text(" ")
-                if (x == self.cursor_x) and (y == self.cursor_y):
-                    # Draw the current position
-                    cell_text = Text("*", style=styles[CURSOR])
-                else:
-                    if square.mask:
-                        cell_text = Text(" ", style=styles[MASKED])
-                    elif square.flag:
-                        cell_text = Text("*", style=styles[MARKED])
-                    elif square.mine:
-                        cell_text = Text("*", style=styles[MINE])
-                    elif square.mines == 0:
-                        cell_text = Text(" ", style=styles[EMPTY])
-                    elif (square.mines >= 1) and (square.mines <= 8):
-                        displayed_char = str(square.mines)
-                        color = MINES_1 + square.mines - 1
-                        cell_text = Text(displayed_char, style=styles[color])
-
-                field_text.append(cell_text)
-
-        return field_text
+    @timed("render_line")
+    def render_line(self, y: int) -> Strip:
+        """Renders one line of the visible part of the field.
+
+        The lines are cached without the cursor and re-rendered only when
+        one of their squares changed or the viewport moved, the cursor is
+        drawn over the cached line.
+        """
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.size.width
+        row = scroll_y + y
+        if not self.active or row >= self.field.height:
+            return Strip.blank(width, self.rich_style)
+
+        lines_key = (scroll_x, scroll_y, width, self.rich_style)
+        if self._lines_key != lines_key:
+            self._lines_key = lines_key
+            self._lines.clear()
+
+        strip = self._lines.get(y)
+        if strip is None:
+            strip = self.render_row(row, scroll_x, scroll_x + width)
+            strip = strip.apply_style(self.rich_style)
+            strip = strip.adjust_cell_length(width, self.rich_style)
+            self._lines[y] = strip
+
+        cursor_x = self.cursor_x - scroll_x
+        if row == self.cursor_y and 0 <= cursor_x < width:
+            cursor = cursor_strip(self.rich_style)
+            strip = Strip.join(
+                [strip.crop(0, cursor_x), cursor, strip.crop(cursor_x + 1, width)]
+            )
+        return strip
+
+    @timed("render_row")
+    def render_row(self, y: int, start_x: int, end_x: int) -> Strip:
+        """Renders the squares of a row between start_x and end_x, without the cursor"""
+        field = self.field
+        start = y * field.width
+        end_x = min(end_x, field.width)
+        mask_map = field.mask_map
+        flag_map = field.flag_map
+        mine_map = field.mine_map
+        count_map = field.count_map
+
+        segments = []
+        for index in range(start + start_x, start + end_x):
+            if mask_map[index]:
+                segments.append(MASKED_SEGMENT)
+            elif flag_map[index]:
+                segments.append(MARKED_SEGMENT)
+            elif mine_map[index]:
+                segments.append(MINE_SEGMENT)
+            else:
+                segments.append(COUNT_SEGMENTS[count_map[index]])
+
+        return Strip(Segment.simplify(segments), max(end_x - start_x, 0))
+
+    def refresh_rows(self, *rows: int) -> None:
+        """Marks the specified rows of the field for re-rendering"""
+        scroll_y = self.scroll_offset.y
+        for row in rows:
+            self._lines.pop(row - scroll_y, None)
+        self.refresh_cursor_rows(*rows)
+
+    def refresh_cursor_rows(self, *rows: int) -> None:
+        """Repaints the specified rows of the field, without re-rendering their squares"""
+        scroll_y = self.scroll_offset.y
+        width, height = self.size
+        self.refresh(
+            *[
+                Region(0, row - scroll_y, width, 1)
+                for row in rows
+                if 0 <= row - scroll_y < height
+            ]
+        )
+
+    def scroll_to_cursor(self) -> None:
+        """Pans the viewport so that the cursor is visible"""
+        self.scroll_to_region(Region(self.cursor_x, self.cursor_y, 1, 1), animate=False)
 
     def action_move_up(self) -> None:
         """Moves the cursor up, if possible"""
@@ -139,36 +228,168 @@ class MinesGrid(Widget, can_focus=True):
         if self.cursor_x < self.field.width - 1:
             self.cursor_x += 1
 
+    @timed("action_clear")
     def action_clear(self) -> None:
-        """Clear the square under the cursor"""
-        self.field.reveal_square(self.cursor_x, self.cursor_y)
-        if self.field.mine_exploded:
-            self.post_message(self.MineExploded())
+        """Clear the square under the cursor, or chord when it is already revealed"""
+        index = self.cursor_y * self.field.width + self.cursor_x
+        if self.field.mask_map[index] or self.field.flag_map[index]:
+            self.apply_actions([(CLEAR, self.cursor_x, self.cursor_y)])
         else:
-            self.count_cleared_squares_and_send_notification()
+            self.action_chord()
 
+    @timed("action_mark")
     def action_mark(self) -> None:
         """Toggles the mine marker for the square under the cursor"""
-        self.field.toggle_mine_marker(self.cursor_x, self.cursor_y)
-        self.count_marked_mines_and_send_notification()
-        self.count_cleared_squares_and_send_notification()
+        self.apply_actions([(MARK, self.cursor_x, self.cursor_y)])
+
+    def action_chord(self) -> None:
+        """Clears the neighbours of the number under the cursor, when all its
+        mines are marked"""
+        self.apply_actions([(CHORD, self.cursor_x, self.cursor_y)])
+
+    @timed("grid_apply_actions")
+    def apply_actions(self, actions: list[tuple[int, int, int]]) -> Delta:
+        """Plays a batch of moves, repainting the changed rows and notifying
+        the counters once for the whole batch.
+
+        Args:
+            actions: The moves, as CLEAR, MARK or CHORD and the square x, y.
+
+        Returns:
+            Delta: The squares changed by the batch.
+        """
+        delta = self.field.apply_actions(actions)
+        self.moves += delta.moves
+        if self.journal is not None:
+            for action, x, y in actions[: delta.moves]:
+                self.journal.record(action, x, y)
+        if self.history is not None:
+            self.history.record(delta.changed)
+        if self.solver is not None:
+            self.solver.update(delta.changed)
+        self.show_changes(delta.changed)
+        return delta
+
+    def action_undo(self) -> None:
+        """Takes back the last move"""
+        if self.history is not None:
+            self.show_history_step(self.history.undo())
+
+    def action_redo(self) -> None:
+        """Plays again the last move taken back"""
+        if self.history is not None:
+            self.show_history_step(self.history.redo())
+
+    def show_history_step(self, changed: list[int]) -> None:
+        """Shows the squares changed by an undo or a redo.
+
+        The changed squares are recorded in the journal, so a resumed or
+        replayed game goes on from the field as it is now.
+        """
+        if not changed:
+            return
+        self.solver = None
+        if self.journal is not None:
+            self.journal.record_undo(changed)
+        field = self.field
+        if not self.active and not field.mine_exploded and not field.is_cleared():
+            self.post_game_message(self.PlayResumed())
+        self.show_changes(changed)
+
+    def show_changes(self, changed: list[int]) -> None:
+        """Repaints the changed rows and notifies the counters, or the end of
+        the game"""
+        width = self.field.width
+        self.refresh_rows(*{index // width for index in changed})
+        if self.field.mine_exploded:
+            self.post_game_message(self.MineExploded())
+            return
+        self.send_counters()
+        if self.field.is_cleared():
+            self.post_game_message(self.FieldCleared())
+
+    @timed("action_hint")
+    def action_hint(self) -> None:
+        """Moves the cursor to a square that is safe to clear or that must be marked.
+        When there is no such square, moves it to the least risky square."""
+        if self.solver is None:
+            self.solver = Solver(self.field)
+        hint = self.solver.hint()
+        if hint is not None:
+            self.cursor_y, self.cursor_x = divmod(hint.index, self.field.width)
 
     def on_click(self, event: Click):
         """Clears or marks the square depending on the button clicked"""
-        self.cursor_x = event.x
-        self.cursor_y = event.y
+        self._mouse_position = None
+        if not self.move_cursor_to(event.x, event.y):
+            return
 
         # Left-click to clear
         if event.button == 1:
             self.action_clear()
+        # Middle-click to chord
+        elif event.button == 2:
+            self.action_chord()
         # Right click to mark
         elif event.button == 3:
             self.action_mark()
 
     def on_mouse_move(self, event: MouseMove):
-        """Moves the cursor following the movements of the mouse"""
-        self.cursor_x = event.x
-        self.cursor_y = event.y
+        """Moves the cursor following the movements of the mouse.
+
+        The cursor moves at most once per screen update: the first move is
+        followed at once, the later ones only to the last position.
+        """
+        if self._mouse_timer is None:
+            self.move_cursor_to(event.x, event.y)
+            self._mouse_timer = self.set_timer(MOUSE_MOVE_PERIOD, self.follow_mouse)
+        else:
+            self._mouse_position = (event.x, event.y)
+
+    def follow_mouse(self) -> None:
+        """Moves the cursor to the last position of the mouse, if it moved"""
+        self._mouse_timer = None
+        if self._mouse_position is not None:
+            self.move_cursor_to(*self._mouse_position)
+            self._mouse_position = None
+            self._mouse_timer = self.set_timer(MOUSE_MOVE_PERIOD, self.follow_mouse)
+
+    def move_cursor_to(self, x: int, y: int) -> bool:
+        """Moves the cursor to the square under the specified widget position.
+
+        Returns:
+            bool: False if there is no square under that position.
+        """
+        scroll_x, scroll_y = self.scroll_offset
+        x += scroll_x
+        y += scroll_y
+        if not (0 <= x < self.field.width and 0 <= y < self.field.height):
+            return False
+        self.cursor_x = x
+        self.cursor_y = y
+        return True
+
+    def watch_cursor_x(self, old_value: int, new_value: int):
+        """Watch the cursor_x reactive and repaint the cursor row when it changes."""
+        self.schedule_cursor_refresh(self.cursor_y)
+
+    def watch_cursor_y(self, old_value: int, new_value: int):
+        """Watch the cursor_y reactive and repaint the old and new cursor rows."""
+        self.schedule_cursor_refresh(old_value, new_value)
+
+    def schedule_cursor_refresh(self, *rows: int) -> None:
+        """Repaints the rows once the pending messages are handled, so that
+        moving the cursor on both axes costs one refresh"""
+        if not self._cursor_rows:
+            self.call_later(self.refresh_cursor)
+        self._cursor_rows.update(rows)
+
+    def refresh_cursor(self) -> None:
+        """Repaints the rows the cursor left or entered and follows it"""
+        rows = self._cursor_rows
+        self._cursor_rows = set()
+        self.refresh_cursor_rows(*rows)
+        self.scroll_to_cursor()
 
     def watch_field(self, new_value: Field):
         """Watch the field reactive and update total squares and mines when it changes.
@@ -176,41 +397,31 @@ class MinesGrid(Widget, can_focus=True):
         Args:
             new_value (int): The new value of field.
         """
+        self.solver = None
+        self._lines.clear()
+        self.virtual_size = Size(self.field.width, self.field.height)
+        self.call_after_refresh(self.scroll_to_cursor)
         self.total_squares = self.field.width * self.field.height
 
-        total_mines = 0
-
-        for row in self.field.squares:
-            for square in row:
-                if square.mine:
-                    total_mines += 1
-
-        self.total_mines = total_mines
-
-        self.post_message(self.SquareCleared(0, self.total_squares))
-        self.post_message(self.MineMarked(0, self.total_mines))
-
-    def count_cleared_squares_and_send_notification(self):
-        """Counts the cleared squares and send notification message"""
-        cleared_squares = 0
-
-        for row in self.field.squares:
-            for square in row:
-                if not square.mask:
-                    cleared_squares += 1
-
-        self.post_message(self.SquareCleared(cleared_squares, self.total_squares))
-
-        if cleared_squares == self.total_squares:
-            self.post_message(self.FieldCleared())
-
-    def count_marked_mines_and_send_notification(self):
-        """Counts the marked mines and send nitification message"""
-        marked_mines = 0
-
-        for row in self.field.squares:
-            for square in row:
-                if square.flag:
-                    marked_mines += 1
-
-        self.post_message(self.MineMarked(marked_mines, self.total_mines))
+        self.total_mines = self.field.total_mines
+
+        self.send_counters()
+
+    def post_game_message(self, message: Message) -> None:
+        """Posts a message for the game, counted when profiling is enabled"""
+        if PROFILING_ENABLED:
+            count(f"posted.{type(message).__name__}")
+        self.post_message(message)
+
+    @timed("send_counters")
+    def send_counters(self) -> None:
+        """Reads the counters of the field and sends them in one message"""
+        field = self.field
+        self.post_game_message(
+            self.CountersChanged(
+                field.cleared_squares,
+                self.total_squares,
+                field.marked_mines,
+                self.total_mines,
+            )
+        )
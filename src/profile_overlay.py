@@ -0,0 +1,44 @@
+"""The profile_overlay module"""
+
+from rich.table import Table
+from textual.timer import Timer
+from textual.widgets import Static
+
+from profiling import STATS
+
+
+class ProfileOverlay(Static):
+    """Shows the profiling statistics over the game screen."""
+
+    timer: Timer | None = None
+
+    def on_mount(self) -> None:
+        """Refresh the statistics twice a second, while visible"""
+        self.timer = self.set_interval(0.5, self.update_stats, pause=True)
+
+    def toggle(self) -> None:
+        """Show or hide the overlay."""
+        self.toggle_class("visible")
+        if self.timer is None:
+            return
+        if self.has_class("visible"):
+            self.update_stats()
+            self.timer.resume()
+        else:
+            self.timer.pause()
+
+    def update_stats(self) -> None:
+        """Render the latest statistics."""
+        summary = STATS.summary()
+        table = Table("path", "calls", "p50 ms", "p99 ms", "total ms", box=None)
+        for name, timing in summary["timings"].items():
+            table.add_row(
+                name,
+                str(timing["calls"]),
+                f"{timing['p50_ms']:.3f}",
+                f"{timing['p99_ms']:.3f}",
+                f"{timing['total_ms']:.1f}",
+            )
+        for name, value in summary["counters"].items():
+            table.add_row(name, str(value), "", "", "")
+        self.update(table)
@@ -0,0 +1,129 @@
+"""Timing hooks for the hot paths of the game.
+
+Profiling is switched on with the MINESWEEPER_PROFILE environment
+variable, read once at import time. When it is off, `timed` returns the
+functions unchanged, so the hooks cost nothing.
+
+    MINESWEEPER_PROFILE=1: collect the statistics, shown by the overlay
+    MINESWEEPER_PROFILE_JSON=<path>: also write them as JSON on exit
+    MINESWEEPER_PROFILE_CPROFILE=<path>: also run cProfile and dump it on exit
+"""
+
+import functools
+import json
+import os
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+ENABLED = os.environ.get("MINESWEEPER_PROFILE", "") not in ("", "0")
+JSON_PATH = os.environ.get("MINESWEEPER_PROFILE_JSON")
+CPROFILE_PATH = os.environ.get("MINESWEEPER_PROFILE_CPROFILE")
+
+SAMPLES = 1024
+"""The number of latest samples kept per timed path"""
+
+Function = TypeVar("Function", bound=Callable[..., Any])
+
+
+class RingBuffer:
+    """Keeps the latest samples of a timed path, in a fixed size array"""
+
+    __slots__ = ("samples", "position", "calls", "total")
+
+    def __init__(self, size: int = SAMPLES):
+        self.samples = array("d", bytes(8 * size))
+        self.position = 0
+        self.calls = 0
+        self.total = 0.0
+
+    def add(self, value: float) -> None:
+        """Adds a sample, overwriting the oldest one when full"""
+        self.samples[self.position] = value
+        self.position = (self.position + 1) % len(self.samples)
+        self.calls += 1
+        self.total += value
+
+    def percentile(self, percent: float) -> float:
+        """Returns the specified percentile of the kept samples"""
+        kept = sorted(self.samples[: min(self.calls, len(self.samples))])
+        if not kept:
+            return 0.0
+        return kept[min(int(len(kept) * percent / 100), len(kept) - 1)]
+
+
+class Stats:
+    """The timings and counters collected by the hooks"""
+
+    def __init__(self):
+        self.timings: dict[str, RingBuffer] = {}
+        self.counters: dict[str, int] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        """Records the duration of a call"""
+        timing = self.timings.get(name)
+        if timing is None:
+            timing = self.timings[name] = RingBuffer()
+        timing.add(seconds)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Increments a counter"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self) -> dict[str, Any]:
+        """Returns the statistics, with the latencies in milliseconds"""
+        return {
+            "timings": {
+                name: {
+                    "calls": timing.calls,
+                    "total_ms": timing.total * 1000,
+                    "p50_ms": timing.percentile(50) * 1000,
+                    "p99_ms": timing.percentile(99) * 1000,
+                }
+                for name, timing in sorted(self.timings.items())
+            },
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def export_json(self, path: Path) -> None:
+        """Writes the statistics to a JSON file"""
+        path.write_text(json.dumps(self.summary(), indent=2))
+
+
+STATS = Stats()
+
+
+def timed(
+    name: str, cells: Callable[[Any], int] | None = None
+) -> Callable[[Function], Function]:
+    """Times every call of the decorated function, when profiling is enabled.
+
+    Args:
+        name (str): The name of the timed path.
+        cells (Callable | None): Returns the number of cells touched from the
+            result of the function, counted as "<name>.cells".
+    """
+
+    def decorator(function: Function) -> Function:
+        if not ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            STATS.record(name, time.perf_counter() - start)
+            if cells is not None:
+                STATS.count(f"{name}.cells", cells(result))
+            return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Increments a counter, when profiling is enabled"""
+    if ENABLED:
+        STATS.count(name, amount)
@@ -0,0 +1,67 @@
+"""Replays move journals and reports the outcome of their games.
+
+Usage: python replay.py [--from-start] JOURNAL_OR_DIRECTORY...
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from journal import JOURNAL_DIR, restore
+
+
+def journal_paths(paths: list[Path]) -> list[Path]:
+    """Expands directories into the journals they contain"""
+    journals = []
+    for path in paths:
+        if path.is_dir():
+            journals.extend(sorted(path.glob("*.journal")))
+        else:
+            journals.append(path)
+    return journals
+
+
+def main():
+    """Parse the command line and replay the journals"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", type=Path, nargs="*", default=[JOURNAL_DIR])
+    parser.add_argument(
+        "--from-start",
+        action="store_true",
+        help="replay every move since the start or the last undo, instead of "
+        "starting from the last snapshot",
+    )
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args()
+
+    outcomes = {"won": 0, "lost": 0, "playing": 0}
+    moves = 0
+    start = time.perf_counter()
+    journals = journal_paths(args.paths)
+    for path in journals:
+        field, journal_moves, elapsed_ms, _ = restore(path, args.from_start)
+        if field.mine_exploded:
+            outcome = "lost"
+        elif field.is_cleared():
+            outcome = "won"
+        else:
+            outcome = "playing"
+        outcomes[outcome] += 1
+        moves += journal_moves
+        if not args.quiet:
+            print(
+                f"{path.name}: {outcome}, {journal_moves} moves, "
+                f"{elapsed_ms / 1000:.1f}s, {field.width}x{field.height}"
+            )
+
+    elapsed = time.perf_counter() - start
+    rate = len(journals) / elapsed if elapsed else 0
+    print(
+        f"{len(journals)} journals, {moves} moves in {elapsed:.2f}s "
+        f"({rate:.0f} journals/sec): "
+        + ", ".join(f"{count} {outcome}" for outcome, count in outcomes.items())
+    )
+
+
+if __name__ == "__main__":
+    main()
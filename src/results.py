@@ -0,0 +1,237 @@
+"""The results store module.
+
+The outcome of every game is kept in a SQLite database. The results are
+written by a background thread, a batch of results in one transaction,
+so the game never waits for the disk.
+
+Besides the results, the database keeps the totals of every game type,
+updated in the same transactions, so the win rates are read without
+counting the games, and an index of the winning times per game type, so
+the best times are read without sorting the games.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from field import Field
+
+RESULTS_PATH = Path.home() / ".minesweeper" / "results.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    game_type TEXT NOT NULL,
+    seed INTEGER,
+    duration_ms INTEGER NOT NULL,
+    clicks INTEGER NOT NULL,
+    three_bv INTEGER,
+    won INTEGER NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_by_time ON results (game_type, won, duration_ms);
+CREATE TABLE IF NOT EXISTS totals (
+    game_type TEXT PRIMARY KEY,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    won_ms INTEGER NOT NULL
+);
+"""
+
+INSERT_RESULT = """
+INSERT INTO results (
+    game_type, seed, duration_ms, clicks, three_bv, won, finished_at
+) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+ADD_TOTALS = """
+INSERT INTO totals (game_type, games, wins, won_ms) VALUES (?, ?, ?, ?)
+ON CONFLICT (game_type) DO UPDATE SET
+    games = games + excluded.games,
+    wins = wins + excluded.wins,
+    won_ms = won_ms + excluded.won_ms
+"""
+
+SEED_BITS = 64
+"""The seeds are unsigned, stored as the signed integers of SQLite"""
+
+
+class GameResult(NamedTuple):
+    """The outcome of a game"""
+
+    game_type: str
+    seed: int | None
+    duration_ms: int
+    clicks: int
+    """The number of moves played"""
+    three_bv: int | None
+    """The least number of clicks that clears the board, None if unknown"""
+    won: bool
+    finished_at: float
+    """When the game ended, in seconds since the epoch"""
+
+
+class PresetTotals(NamedTuple):
+    """The totals of the games of a game type"""
+
+    game_type: str
+    games: int
+    wins: int
+    won_ms: int
+    """The duration of the games won, added up"""
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Opens the database, creating it if needed"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path)
+    # The readers do not wait for the writer, nor the writer for the readers
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def insert_results(connection: sqlite3.Connection, results: list[GameResult]) -> None:
+    """Inserts the results and adds them to the totals, in one transaction"""
+    totals: dict[str, PresetTotals] = {}
+    rows = []
+    for result in results:
+        seed = result.seed
+        if seed is not None and seed >= 1 << (SEED_BITS - 1):
+            seed -= 1 << SEED_BITS
+        rows.append(result._replace(seed=seed))
+        game_type = result.game_type
+        _, games, wins, won_ms = totals.get(game_type, (game_type, 0, 0, 0))
+        if result.won:
+            wins += 1
+            won_ms += result.duration_ms
+        totals[game_type] = PresetTotals(game_type, games + 1, wins, won_ms)
+    with connection:
+        connection.executemany(INSERT_RESULT, rows)
+        connection.executemany(ADD_TOTALS, totals.values())
+
+
+def preset_totals(connection: sqlite3.Connection) -> list[PresetTotals]:
+    """Returns the totals of every game type played"""
+    rows = connection.execute(
+        "SELECT game_type, games, wins, won_ms FROM totals ORDER BY game_type"
+    )
+    return [PresetTotals(*row) for row in rows]
+
+
+def best_times(
+    connection: sqlite3.Connection, game_type: str, limit: int = 10
+) -> list[GameResult]:
+    """Returns the fastest games won of a game type, read from the index"""
+    rows = connection.execute(
+        """
+        SELECT game_type, seed, duration_ms, clicks, three_bv, won, finished_at
+        FROM results INDEXED BY results_by_time
+        WHERE game_type = ? AND won = 1
+        ORDER BY duration_ms
+        LIMIT ?
+        """,
+        (game_type, limit),
+    )
+    results = []
+    for row in rows:
+        result = GameResult(*row)
+        if result.seed is not None and result.seed < 0:
+            result = result._replace(seed=result.seed + (1 << SEED_BITS))
+        results.append(result._replace(won=bool(result.won)))
+    return results
+
+
+def read_only(path: Path) -> sqlite3.Connection | None:
+    """Opens the database for reading, None if no game was recorded yet"""
+    if not path.exists():
+        return None
+    return sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+
+
+class ResultsWriter:
+    """Writes the results of the games from a background thread.
+
+    The results recorded while a batch is written are written together in
+    the next batch, of at most batch_size results.
+    """
+
+    def __init__(self, path: Path = RESULTS_PATH, batch_size: int = 256):
+        """
+        Args:
+            path (Path): The database, created if it does not exist.
+            batch_size (int): The number of results written at most at once.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self._queue: queue.Queue[tuple[GameResult, Field | None] | None] = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="results-writer", daemon=True
+        )
+        self._thread.start()
+
+    def record(self, result: GameResult, field: Field | None = None) -> None:
+        """Queues a result, without waiting for the disk.
+
+        Args:
+            result (GameResult): The outcome of the game.
+            field (Field | None): The field of the game, to compute the 3BV
+                of the result in the background when it is None.
+        """
+        self._queue.put((result, field))
+
+    def flush(self) -> None:
+        """Waits until the results recorded are written"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Writes the results recorded and stops the thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        """Writes the queued results, until closed"""
+        # Imported in the thread, to keep it out of the start-up imports
+        from analytics import board_stats  # pylint: disable=import-outside-toplevel
+
+        connection = connect(self.path)
+        closed = False
+        while not closed:
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            results = []
+            for item in items:
+                if item is None:
+                    closed = True
+                    continue
+                result, field = item
+                if result.three_bv is None and field is not None:
+                    result = result._replace(three_bv=board_stats(field).three_bv)
+                results.append(result)
+            if results:
+                insert_results(connection, results)
+            for _ in items:
+                self._queue.task_done()
+        connection.close()
+
+
+def game_result(
+    game_type: str, field: Field, duration_ms: int, clicks: int
+) -> GameResult:
+    """Returns the result of a game that just ended, its 3BV to be computed"""
+    return GameResult(
+        game_type,
+        field.seed,
+        duration_ms,
+        clicks,
+        None,
+        not field.mine_exploded,
+        time.time(),
+    )
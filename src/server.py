@@ -0,0 +1,303 @@
+"""Multiplayer server: hosts many games, each shared by several players.
+
+Usage: python server.py --port 8765
+
+Every message is a frame: a kind byte and a payload size, then the payload.
+From the client:
+    JOIN: a game type index and a game id, 0 to start a new game
+    ACTION: one or more moves, each one CLEAR, MARK or CHORD at x, y
+    NEW_GAME: restarts the shared game, with the same type
+To the client:
+    GAME: the game id, the player id and the size of the field, then a
+        DELTA payload with every cell that is not masked
+    DELTA: the player that moved, the status of the game and the changed
+        cells, each one an index and a cell value
+
+The moves of an ACTION frame are applied as one batch and broadcast to
+every player of the game as one DELTA frame. The
+frames for a player are queued and written together once per loop
+iteration, so a burst of moves costs one write per player. A player whose
+unsent frames exceed MAX_BUFFER bytes gets no frame until their connection
+drains, then a GAME frame with the current field.
+"""
+
+import argparse
+import asyncio
+import itertools
+import struct
+from typing import Iterable
+
+from engine import GameEngine, GameStatus
+from field import CHORD, CLEAR, MARK, Field
+from game_type import GAME_TYPES, HUGE_GAME_TYPE
+
+SERVER_GAME_TYPES = [*GAME_TYPES, HUGE_GAME_TYPE]
+
+JOIN = ord("J")
+ACTION = ord("A")
+NEW_GAME = ord("N")
+GAME = ord("G")
+DELTA = ord("D")
+
+FRAME = struct.Struct("<BI")
+"""kind, payload size"""
+JOIN_PAYLOAD = struct.Struct("<BQ")
+"""game type index, game id"""
+ACTION_PAYLOAD = struct.Struct("<BII")
+"""action, x, y, repeated for every move of the frame"""
+GAME_HEADER = struct.Struct("<QIII")
+"""game id, player id, width, height"""
+DELTA_HEADER = struct.Struct("<IBI")
+"""player id, game status, number of cells"""
+CELL = struct.Struct("<QB")
+"""square index, cell value"""
+
+MINE = 9
+FLAGGED = 10
+MASKED = 11
+"""Cell values besides the mine counts 0 to 8"""
+
+STATUSES = list(GameStatus)
+ACTIONS = (CLEAR, MARK, CHORD)
+
+MAX_PAYLOAD = 1 << 16
+
+MAX_BUFFER = 1 << 18
+"""The bytes a player can fall behind before their frames are dropped"""
+
+
+class ProtocolError(ValueError):
+    """Raised when a client sends a malformed frame"""
+
+
+def cell_value(field: Field, index: int) -> int:
+    """Returns the value of a square as seen by the players"""
+    if field.flag_map[index]:
+        return FLAGGED
+    if field.mask_map[index]:
+        return MASKED
+    if field.mine_map[index]:
+        return MINE
+    return field.count_map[index]
+
+
+def encode_frame(kind: int, payload: bytes) -> bytes:
+    """Returns the frame of a message"""
+    return FRAME.pack(kind, len(payload)) + payload
+
+
+def encode_cells(field: Field, indexes: Iterable[int]) -> tuple[int, bytes]:
+    """Returns the number of cells and their encoding"""
+    pack = CELL.pack
+    cells = [pack(index, cell_value(field, index)) for index in indexes]
+    return len(cells), b"".join(cells)
+
+
+def encode_delta(player_id: int, status: GameStatus, field: Field, changed) -> bytes:
+    """Returns the DELTA frame of a move"""
+    count, cells = encode_cells(field, changed)
+    return encode_frame(
+        DELTA, DELTA_HEADER.pack(player_id, STATUSES.index(status), count) + cells
+    )
+
+
+class Player:
+    """A connection to the server, playing in one game at a time"""
+
+    __slots__ = ("player_id", "writer", "game", "pending", "flush_scheduled", "lagging")
+
+    def __init__(self, player_id: int, writer: asyncio.StreamWriter):
+        self.player_id = player_id
+        self.writer = writer
+        self.game: "SharedGame | None" = None
+        self.pending: list[bytes] = []
+        self.flush_scheduled = False
+        self.lagging = False
+
+    def send(self, frame: bytes) -> None:
+        """Queues a frame, written with the others at the next loop iteration"""
+        self.pending.append(frame)
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self.flush)
+
+    def flush(self) -> None:
+        """Writes the queued frames at once, or drops them when the player is
+        too far behind"""
+        self.flush_scheduled = False
+        writer = self.writer
+        if self.pending and not writer.is_closing():
+            if writer.transport.get_write_buffer_size() > MAX_BUFFER:
+                self.lagging = True
+            elif self.lagging and self.game is not None:
+                # The dropped frames are replaced by the whole field
+                self.lagging = False
+                writer.write(self.game.game_frame(self))
+            else:
+                self.lagging = False
+                writer.writelines(self.pending)
+        self.pending.clear()
+
+
+class SharedGame:
+    """A game played by several players.
+
+    The moves are applied in place, one at a time, between two awaits of
+    the event loop, so the game needs no lock.
+    """
+
+    def __init__(self, game_id: int, game_type_index: int):
+        self.game_id = game_id
+        self.engine = GameEngine(SERVER_GAME_TYPES[game_type_index])
+        self.players: list[Player] = []
+
+    def game_frame(self, player: Player) -> bytes:
+        """Returns the GAME frame, with the current state of the field"""
+        field = self.engine.field
+        count, cells = encode_cells(field, field.unmasked_squares())
+        status = STATUSES.index(self.engine.status)
+        header = GAME_HEADER.pack(
+            self.game_id, player.player_id, field.width, field.height
+        )
+        return encode_frame(GAME, header + DELTA_HEADER.pack(0, status, count) + cells)
+
+    def join(self, player: Player) -> None:
+        """Adds a player and sends them the current field"""
+        self.players.append(player)
+        player.game = self
+        player.send(self.game_frame(player))
+
+    def leave(self, player: Player) -> None:
+        """Removes a player"""
+        self.players.remove(player)
+        player.game = None
+
+    def play(self, player: Player, moves: list[tuple[int, int, int]]) -> list[int]:
+        """Applies a batch of moves and broadcasts the changed cells.
+
+        The moves outside of the field are ignored, a batch that changes
+        nothing is only acknowledged to its player.
+
+        Returns:
+            list[int]: The indexes of the squares that changed.
+        """
+        engine = self.engine
+        field = engine.field
+        width, height = field.width, field.height
+        changed = engine.apply_actions(
+            [
+                (action, x, y)
+                for action, x, y in moves
+                if action in ACTIONS and 0 <= x < width and 0 <= y < height
+            ]
+        ).changed
+        frame = encode_delta(player.player_id, engine.status, field, changed)
+        if not changed:
+            player.send(frame)
+            return changed
+        for other in self.players:
+            other.send(frame)
+        return changed
+
+    def restart(self) -> None:
+        """Starts a new field and sends it to every player"""
+        self.engine.new_game()
+        for player in self.players:
+            player.send(self.game_frame(player))
+
+
+class GameServer:
+    """Accepts the connections of the players and routes their messages"""
+
+    game_class = SharedGame
+    """The class of the games started"""
+
+    def __init__(self):
+        self.games: dict[int, SharedGame] = {}
+        self.game_ids = itertools.count(1)
+        self.player_ids = itertools.count(1)
+        self.moves = 0
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serves one connection until it is closed"""
+        player = Player(next(self.player_ids), writer)
+        try:
+            while True:
+                kind, size = FRAME.unpack(await reader.readexactly(FRAME.size))
+                if size > MAX_PAYLOAD:
+                    raise ProtocolError(f"Payload of {size} bytes")
+                self.handle_frame(player, kind, await reader.readexactly(size))
+                if writer.transport.get_write_buffer_size() > MAX_PAYLOAD:
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ProtocolError):
+            pass
+        finally:
+            self.leave(player)
+            writer.close()
+
+    def handle_frame(self, player: Player, kind: int, payload: bytes) -> None:
+        """Applies a message of a player"""
+        try:
+            if kind == ACTION and player.game is not None:
+                moves = list(ACTION_PAYLOAD.iter_unpack(payload))
+                self.moves += len(moves)
+                player.game.play(player, moves)
+            elif kind == JOIN:
+                self.join(player, *JOIN_PAYLOAD.unpack(payload))
+            elif kind == NEW_GAME and player.game is not None:
+                player.game.restart()
+            else:
+                raise ProtocolError(f"Unexpected frame {kind}")
+        except struct.error as error:
+            raise ProtocolError(str(error)) from error
+
+    def join(self, player: Player, game_type_index: int, game_id: int) -> None:
+        """Moves a player to a game, starting a new one if game_id is 0"""
+        self.leave(player)
+        game = self.games.get(game_id)
+        if game is None:
+            if game_type_index >= len(SERVER_GAME_TYPES):
+                raise ProtocolError(f"Unknown game type {game_type_index}")
+            game = self.game_class(next(self.game_ids), game_type_index)
+            self.games[game.game_id] = game
+        game.join(player)
+
+    def leave(self, player: Player) -> None:
+        """Removes a player from their game, ending the game if it is empty"""
+        game = player.game
+        if game is None:
+            return
+        game.leave(player)
+        if not game.players:
+            del self.games[game.game_id]
+
+    async def serve(self, host: str, port: int) -> asyncio.Server:
+        """Starts listening for players"""
+        return await asyncio.start_server(self.handle_client, host, port)
+
+
+async def run(host: str, port: int) -> None:
+    """Serves until interrupted"""
+    server = await GameServer().serve(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving on {address[0]}:{address[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """Parse the command line and run the server"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
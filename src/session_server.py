@@ -0,0 +1,468 @@
+"""Serves the game to many terminal sessions from one process.
+
+Usage: python session_server.py --port 8766 --budget 8 --clients 200
+
+This is the local stand-in for an SSH or web socket gateway: the gateway
+owns the terminals of the users and forwards them as frames, a kind byte
+and a payload size followed by the payload:
+    RESIZE: the size of the terminal, sent first and on every resize
+    INPUT: terminal input, UTF-8
+    OUTPUT: terminal output, UTF-8, from the server
+
+The sessions share what does not change between them: the board pool,
+the bundled CSS and its parsed rules, the help document and the styles
+of the grid. Each session has a memory budget; when the process grows
+past the budget of all the sessions, the fields of the sessions idle for
+the longest are evicted to disk, and loaded back on their next input.
+"""
+
+import argparse
+import asyncio
+import random
+import resource
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from textual import events
+from textual.driver import Driver
+from textual.geometry import Size
+
+from board_pool import BoardPool
+from field import Field
+from game import Game
+from game_type import GAME_TYPES
+from main import MinesweeperApp, bundled_css
+from profiling import RingBuffer
+from textual_compat import SharedStylesheet, input_parser, set_driver_size
+
+RESIZE = ord("R")
+INPUT = ord("I")
+OUTPUT = ord("O")
+
+FRAME = struct.Struct("<BI")
+"""kind, payload size"""
+TERMINAL_SIZE = struct.Struct("<HH")
+"""width, height"""
+
+MAX_PAYLOAD = 1 << 16
+MB = 1 << 20
+
+
+def current_rss() -> int:
+    """Returns the resident set size of the process, in bytes"""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # The peak size, where /proc is missing
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def encode_frame(kind: int, payload: bytes) -> bytes:
+    """Returns the frame of a message"""
+    return FRAME.pack(kind, len(payload)) + payload
+
+
+class SessionMetrics(NamedTuple):
+    """The metrics of a session"""
+
+    session_id: int
+    startup_rss: int
+    """The growth of the process while the session started, in bytes"""
+    field_bytes: int
+    """The memory held by the field of the session, 0 once evicted"""
+    evictions: int
+    idle: float
+    """Seconds since the last input"""
+    latency_p50: float
+    latency_p99: float
+    """Seconds from an input to the next output"""
+
+
+class Session:
+    """The connection of a terminal and the app it runs"""
+
+    def __init__(
+        self,
+        session_id: int,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        size: tuple[int, int],
+        spill_dir: Path,
+    ):
+        self.session_id = session_id
+        self.reader = reader
+        self.writer = writer
+        self.size = size
+        self.spill_dir = spill_dir
+        self.journal_dir = spill_dir / f"journals-{session_id}"
+        self.app: SessionApp | None = None
+        self.last_input = time.monotonic()
+        self.input_time: float | None = None
+        self.latencies = RingBuffer()
+        self.start_rss = current_rss()
+        self.startup_rss = 0
+        self.evictions = 0
+        self.output: list[str] = []
+
+    @property
+    def field(self) -> Field | None:
+        """The field of the game played, if any"""
+        if self.app is None or self.app.game is None:
+            return None
+        return getattr(self.app.game, "field", None)
+
+    def started(self) -> None:
+        """Measures the growth of the process up to the first frame, shared
+        with the sessions that started at the same time"""
+        self.startup_rss = current_rss() - self.start_rss
+
+    def touch(self) -> None:
+        """Marks the session active, loading its field back if evicted"""
+        self.last_input = time.monotonic()
+        if self.input_time is None:
+            self.input_time = time.perf_counter()
+        field = self.field
+        if field is not None and field.evicted_path is not None:
+            field.reload()
+
+    def evict(self) -> int:
+        """Evicts the field of the session to disk.
+
+        Returns:
+            int: The number of bytes released.
+        """
+        field = self.field
+        if field is None or field.evicted_path is not None:
+            return 0
+        released = field.evict(self.spill_dir / f"session-{self.session_id}.field")
+        self.evictions += released > 0
+        return released
+
+    def write(self, data: str) -> None:
+        """Queues terminal output, sent by flush"""
+        self.output.append(data)
+
+    def flush(self) -> None:
+        """Sends the queued output as one frame"""
+        if not self.output:
+            return
+        if self.input_time is not None:
+            self.latencies.add(time.perf_counter() - self.input_time)
+            self.input_time = None
+        if not self.writer.is_closing():
+            self.writer.write(encode_frame(OUTPUT, "".join(self.output).encode()))
+        self.output.clear()
+
+    def metrics(self) -> SessionMetrics:
+        """Returns the metrics of the session"""
+        field = self.field
+        return SessionMetrics(
+            self.session_id,
+            self.startup_rss,
+            0 if field is None or field.evicted_path else field.resident_bytes(),
+            self.evictions,
+            time.monotonic() - self.last_input,
+            self.latencies.percentile(50),
+            self.latencies.percentile(99),
+        )
+
+
+class SessionDriver(Driver):
+    """Drives an app through the frames of its session"""
+
+    def __init__(
+        self, app: "SessionApp", *, debug: bool = False, size: tuple[int, int] | None
+    ) -> None:
+        super().__init__(app, debug=debug, size=size)
+        self.session = app.session
+        self.debug = debug
+        self._input_task: asyncio.Task | None = None
+
+    def write(self, data: str) -> None:
+        self.session.write(data)
+
+    def flush(self) -> None:
+        self.session.flush()
+
+    def start_application_mode(self) -> None:
+        self.write("\x1b[?1049h")  # Alt screen
+        self.write("\x1b[?1000h\x1b[?1003h\x1b[?1015h\x1b[?1006h")  # Mouse
+        self.write("\x1b[?25l")  # Hide cursor
+        self.flush()
+        self.resize(self.session.size)
+        self._input_task = asyncio.create_task(self.read_input())
+
+    def resize(self, size: tuple[int, int]) -> None:
+        """Sends the new size of the terminal to the app"""
+        set_driver_size(self, size)
+        textual_size = Size(*size)
+        self.send_event(events.Resize(textual_size, textual_size))
+
+    async def read_input(self) -> None:
+        """Feeds the input frames to the app until the connection is closed"""
+        parser = input_parser(self.debug)
+        session = self.session
+        try:
+            while True:
+                header = await session.reader.readexactly(FRAME.size)
+                kind, size = FRAME.unpack(header)
+                if size > MAX_PAYLOAD:
+                    break
+                payload = await session.reader.readexactly(size)
+                session.touch()
+                if kind == RESIZE:
+                    self.resize(TERMINAL_SIZE.unpack(payload))
+                elif kind == INPUT:
+                    for event in parser.feed(payload.decode(errors="replace")):
+                        self.process_event(event)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        self.session.app.exit()
+
+    def disable_input(self) -> None:
+        if self._input_task is not None:
+            self._input_task.cancel()
+            self._input_task = None
+
+    def stop_application_mode(self) -> None:
+        self.disable_input()
+        self.write("\x1b[?1000l\x1b[?1003l\x1b[?1015l\x1b[?1006l")
+        self.write("\x1b[?1049l\x1b[?25h")
+        self.flush()
+
+
+class SessionApp(MinesweeperApp):
+    """The app of a session, built from the assets shared by the sessions"""
+
+    def __init__(self, session: Session, board_pool: BoardPool) -> None:
+        self.session = session
+        self.game: Game | None = None
+        super().__init__(bundle_css=True, board_pool=board_pool)
+        self.driver_class = SessionDriver
+        self.stylesheet = SharedStylesheet(variables=self.get_css_variables())
+
+    def create_game(self) -> Game:
+        """Returns the main screen, drawing boards from the shared pool"""
+        self.game = Game(self.board_pool, self.session.journal_dir)
+        return self.game
+
+    def on_mount(self) -> None:
+        """Measures the start-up of the session"""
+        self.call_after_refresh(self.session.started)
+
+
+class SessionServer:
+    """Runs the sessions and keeps them within their memory budget"""
+
+    def __init__(self, budget: int, idle_seconds: float = 30.0):
+        """
+        Args:
+            budget (int): The memory budget of a session, in bytes.
+            idle_seconds (float): The idle time before a field can be evicted.
+        """
+        self.budget = budget
+        self.idle_seconds = idle_seconds
+        self.sessions: dict[int, Session] = {}
+        self.finished: list[SessionMetrics] = []
+        self.session_ids = 0
+        self._spill_dir = Path(tempfile.mkdtemp(prefix="minesweeper-sessions-"))
+        self.board_pool = BoardPool(GAME_TYPES)
+        bundled_css()
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Runs a session until its connection is closed"""
+        try:
+            kind, size = FRAME.unpack(await reader.readexactly(FRAME.size))
+            payload = await reader.readexactly(size)
+            if kind != RESIZE or size != TERMINAL_SIZE.size:
+                raise ConnectionError("The first frame must be RESIZE")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+
+        self.session_ids += 1
+        session = Session(
+            self.session_ids,
+            reader,
+            writer,
+            TERMINAL_SIZE.unpack(payload),
+            self._spill_dir,
+        )
+        self.sessions[session.session_id] = session
+        session.app = SessionApp(session, self.board_pool)
+        try:
+            await session.app.run_async(size=session.size)
+        finally:
+            self.finished.append(session.metrics())
+            del self.sessions[session.session_id]
+            writer.close()
+
+    def enforce_budget(self) -> int:
+        """Evicts the fields of the idle sessions, the longest idle first, until
+        the process fits in the budget of its sessions.
+
+        Returns:
+            int: The number of bytes released.
+        """
+        excess = current_rss() - self.budget * len(self.sessions)
+        released = 0
+        now = time.monotonic()
+        idle_sessions = sorted(
+            (
+                session
+                for session in self.sessions.values()
+                if now - session.last_input >= self.idle_seconds
+            ),
+            key=lambda session: session.last_input,
+        )
+        for session in idle_sessions:
+            if released >= excess:
+                break
+            released += session.evict()
+        return released
+
+    def report(self, file=sys.__stdout__) -> None:
+        """Prints the metrics of the process and of the sessions"""
+        metrics = [session.metrics() for session in self.sessions.values()]
+        rss = current_rss()
+        per_session = rss / len(metrics) if metrics else 0
+        latencies = sorted(m.latency_p50 for m in metrics if m.latency_p50)
+        median = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+        worst = max((m.latency_p99 for m in metrics), default=0.0) * 1000
+        print(
+            f"{len(metrics)} sessions, RSS {rss / MB:.1f} MB, "
+            f"{per_session / MB:.2f} MB per session, "
+            f"fields {sum(m.field_bytes for m in metrics) / MB:.2f} MB resident, "
+            f"{sum(m.evictions for m in metrics)} evictions, "
+            f"latency p50 {median:.1f} ms, worst p99 {worst:.1f} ms",
+            file=file,
+            flush=True,
+        )
+
+    def report_sessions(self, file=sys.__stdout__) -> None:
+        """Prints the metrics of every session, finished ones included"""
+        print(
+            f"{'session':>8} {'startup MB':>10} {'field KB':>9} {'evicted':>7} "
+            f"{'idle s':>7} {'p50 ms':>7} {'p99 ms':>7}",
+            file=file,
+        )
+        live = [session.metrics() for session in self.sessions.values()]
+        for m in sorted(self.finished + live):
+            print(
+                f"{m.session_id:>8} {m.startup_rss / MB:>10.2f} "
+                f"{m.field_bytes / 1024:>9.1f} {m.evictions:>7} {m.idle:>7.1f} "
+                f"{m.latency_p50 * 1000:>7.1f} {m.latency_p99 * 1000:>7.1f}",
+                file=file,
+            )
+
+    async def monitor(self, interval: float) -> None:
+        """Enforces the budget every second and reports every interval"""
+        last_report = time.monotonic()
+        while True:
+            await asyncio.sleep(1.0)
+            self.enforce_budget()
+            if interval and time.monotonic() - last_report >= interval:
+                last_report = time.monotonic()
+                self.report()
+
+    def close(self) -> None:
+        """Stops the board pool and removes the evicted fields"""
+        self.board_pool.shutdown()
+        shutil.rmtree(self._spill_dir, ignore_errors=True)
+
+
+async def simulate_client(
+    host: str, port: int, duration: float, keys_per_second: float, seed: int
+) -> None:
+    """Plays like a user at a terminal: starts an Easy game and moves and
+    clears at random, then goes idle for the rest of the duration."""
+    reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(seed)
+    end = time.monotonic() + duration
+
+    async def drain_output() -> None:
+        while True:
+            _, size = FRAME.unpack(await reader.readexactly(FRAME.size))
+            await reader.readexactly(size)
+
+    output = asyncio.create_task(drain_output())
+    writer.write(encode_frame(RESIZE, TERMINAL_SIZE.pack(80, 24)))
+    await asyncio.sleep(1.0)
+    writer.write(encode_frame(INPUT, b"\r"))  # Easy, the focused button
+    active_until = time.monotonic() + duration * rng.random()
+    keys = ["\x1b[A", "\x1b[B", "\x1b[C", "\x1b[D", " "]
+    try:
+        while time.monotonic() < active_until:
+            await asyncio.sleep(rng.expovariate(keys_per_second))
+            writer.write(encode_frame(INPUT, rng.choice(keys).encode()))
+        await asyncio.sleep(max(0.0, end - time.monotonic()))
+    finally:
+        output.cancel()
+        writer.close()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    """Serves the sessions, with simulated clients if requested"""
+    server = SessionServer(args.budget * MB, args.idle)
+    listener = await asyncio.start_server(server.handle_client, args.host, args.port)
+    port = listener.sockets[0].getsockname()[1]
+    print(f"Serving on {args.host}:{port}", file=sys.__stdout__, flush=True)
+    monitor = asyncio.create_task(server.monitor(args.report))
+    try:
+        if args.clients:
+            await asyncio.gather(
+                *(
+                    simulate_client(
+                        args.host, port, args.duration, args.keys_per_second, seed
+                    )
+                    for seed in range(args.clients)
+                )
+            )
+        else:
+            await listener.serve_forever()
+    finally:
+        server.report()
+        server.report_sessions()
+        monitor.cancel()
+        listener.close()
+        server.close()
+
+
+def main():
+    """Parse the command line and run the server"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument(
+        "--budget", type=float, default=16.0, help="memory budget per session, MB"
+    )
+    parser.add_argument(
+        "--idle", type=float, default=30.0, help="idle seconds before eviction"
+    )
+    parser.add_argument(
+        "--report", type=float, default=10.0, help="seconds between reports"
+    )
+    parser.add_argument(
+        "--clients", type=int, default=0, help="simulated clients, then exit"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30.0, help="seconds per simulated client"
+    )
+    parser.add_argument("--keys-per-second", type=float, default=4.0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
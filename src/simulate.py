@@ -0,0 +1,223 @@
+"""Plays games with a built-in strategy, spread over several processes.
+
+Usage: python simulate.py --games 100000 --workers 8 --scaling
+"""
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from bitboard_field import (
+    BitboardField,
+    add_planes,
+    bit_indexes,
+    board_masks,
+    equal_planes,
+)
+from engine import GameEngine, GameStatus
+from game_type import GAME_TYPES, TOPOLOGY_GAME_TYPES, GameType
+from topology import RECTANGLE
+
+BATCH_SIZE = 500
+
+
+class BatchResult(NamedTuple):
+    """The outcome of a batch of games"""
+
+    game_type: GameType
+    games: int
+    won: int
+
+
+def play_game(engine: GameEngine, rng: random.Random) -> GameStatus:
+    """Plays one game until it is won or lost.
+
+    Marks the masked neighbours of a number when they must all be mines,
+    reveals them when the number is already satisfied, and otherwise
+    reveals a random masked square.
+    """
+    field = engine.field
+    if isinstance(field, BitboardField):
+        return play_game_bitboard(engine, field, rng)
+    width = field.width
+    mask_map = field.mask_map
+    flag_map = field.flag_map
+    count_map = field.count_map
+    # The revealed numbers that may still have masked neighbours
+    frontier = set(engine.reveal(width // 2, field.height // 2))
+
+    while engine.status == GameStatus.PLAYING:
+        progress = False
+        for index in list(frontier):
+            neighbours = field.neighbours(index)
+            masked = [n for n in neighbours if mask_map[n]]
+            if not masked:
+                frontier.discard(index)
+                continue
+            mines = count_map[index]
+            flagged = sum(flag_map[n] for n in neighbours)
+            if flagged == mines:
+                for neighbour in masked:
+                    y, x = divmod(neighbour, width)
+                    frontier.update(engine.reveal(x, y))
+            elif flagged + len(masked) == mines:
+                for neighbour in masked:
+                    y, x = divmod(neighbour, width)
+                    engine.flag(x, y)
+            else:
+                continue
+            progress = True
+            frontier.discard(index)
+            if engine.status != GameStatus.PLAYING:
+                break
+
+        if not progress and engine.status == GameStatus.PLAYING:
+            masked = [index for index, mask in enumerate(mask_map) if mask]
+            y, x = divmod(rng.choice(masked), width)
+            frontier.update(engine.reveal(x, y))
+
+    return engine.status
+
+
+def play_game_bitboard(
+    engine: GameEngine, field: BitboardField, rng: random.Random
+) -> GameStatus:
+    """Plays one game with the strategy of play_game, applying each rule to
+    every revealed number of the board at once.
+
+    Both reach the same squares before each random reveal, so they play
+    the same games from the same random generator.
+    """
+    board = board_masks(field.width, field.height)[0]
+    engine.reveal(field.width // 2, field.height // 2)
+
+    while engine.status == GameStatus.PLAYING:
+        masked = field.masked
+        numbers = board & ~masked & ~field.flags
+        flagged = field.neighbour_counts(field.flags)
+        satisfied = numbers & equal_planes(flagged, field.count_planes, board)
+        enclosed = add_planes(flagged, field.neighbour_counts(masked))
+        all_mines = numbers & equal_planes(enclosed, field.count_planes, board)
+
+        safe = field.dilate(satisfied) & masked
+        if safe:
+            field.reveal_board(safe)
+            continue
+        mines = field.dilate(all_mines & ~satisfied) & masked
+        if mines:
+            field.mark_board(mines)
+            continue
+        index = rng.choice(bit_indexes(masked))
+        y, x = divmod(index, field.width)
+        engine.reveal(x, y)
+
+    return engine.status
+
+
+def play_batch(game_type: GameType, games: int, seed: int) -> BatchResult:
+    """Plays a batch of games in a worker process.
+
+    The boards and the random reveals come from one generator seeded with
+    seed, the global one of the worker is not reseeded.
+    """
+    rng = random.Random(seed)
+    engine = GameEngine(game_type)
+    won = 0
+    for _ in range(games):
+        engine.new_game(seed=rng.getrandbits(64))
+        if play_game(engine, rng) == GameStatus.WON:
+            won += 1
+    return BatchResult(game_type, games, won)
+
+
+def simulate(
+    game_types: list[GameType], games: int, workers: int, seed: int
+) -> tuple[dict[GameType, tuple[int, int]], float]:
+    """Plays the specified number of games of every game type.
+
+    Returns:
+        The number of games played and won per game type, and the elapsed seconds.
+    """
+    results = {game_type: (0, 0) for game_type in game_types}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for game_type in game_types:
+            for batch_start in range(0, games, BATCH_SIZE):
+                batch = min(BATCH_SIZE, games - batch_start)
+                futures.append(
+                    executor.submit(play_batch, game_type, batch, seed + len(futures))
+                )
+        for future in futures:
+            result = future.result()
+            played, won = results[result.game_type]
+            results[result.game_type] = (played + result.games, won + result.won)
+    return results, time.perf_counter() - start
+
+
+def main():
+    """Parse the command line and run the simulation"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=10_000, help="games per type")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--game-type",
+        action="append",
+        choices=[game_type.name for game_type in GAME_TYPES + TOPOLOGY_GAME_TYPES],
+        help="game type to play, the rectangular ones by default",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--bitboard",
+        action="store_true",
+        help="play on the bitboard field backend, rectangles only",
+    )
+    parser.add_argument(
+        "--scaling",
+        action="store_true",
+        help="also run with 1, 2, 4... workers and report the speedup",
+    )
+    args = parser.parse_args()
+
+    names = args.game_type or [game_type.name for game_type in GAME_TYPES]
+    game_types = [
+        game_type
+        for game_type in GAME_TYPES + TOPOLOGY_GAME_TYPES
+        if game_type.name in names
+    ]
+    if args.bitboard:
+        others = [
+            game_type.name
+            for game_type in game_types
+            if game_type.topology != RECTANGLE
+        ]
+        if others:
+            parser.error(f"--bitboard plays rectangles only, not {', '.join(others)}")
+        game_types = [game_type._replace(bitboard=True) for game_type in game_types]
+    total_games = args.games * len(game_types)
+
+    results, elapsed = simulate(game_types, args.games, args.workers, args.seed)
+    print(
+        f"{total_games} games in {elapsed:.2f}s, {total_games / elapsed:.0f} games/sec"
+    )
+    for game_type, (played, won) in results.items():
+        print(f"{game_type.name:>8}: {won / played:6.1%} won of {played}")
+
+    if args.scaling:
+        workers = 1
+        single = 0.0
+        print(f"{'workers':>8} {'games/sec':>10} {'speedup':>8}")
+        while workers <= args.workers:
+            _, elapsed = simulate(game_types, args.games, workers, args.seed)
+            single = single or elapsed
+            print(
+                f"{workers:>8} {total_games / elapsed:>10.0f} {single / elapsed:>7.2f}x"
+            )
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""The solver module"""
+
+from typing import Iterable, NamedTuple
+
+from field import Field
+
+MAX_COMPONENT_SQUARES = 24
+"""Frontier components with more masked squares are not enumerated."""
+
+
+class Hint(NamedTuple):
+    """A suggested move"""
+
+    index: int
+    """The index of the square"""
+    mine_probability: float
+    """0 for a square that is safe to reveal, 1 for a square that must be marked"""
+
+
+class Solver:
+    """Derives the safe squares and the certain mines of a field from its
+    visible state: the revealed numbers and the marked mines, which are
+    trusted to be correct.
+
+    Every revealed number gives a constraint: how many of its masked
+    neighbours are mines. The constraints are solved with the single square
+    rules, then by subtracting constraints that contain each other, and the
+    remaining frontier is enumerated exactly, one connected component at a
+    time, to get the mine probability of every square.
+
+    The analysis is kept between moves; `update` only rebuilds the
+    constraints around the squares that changed.
+    """
+
+    def __init__(self, field: Field):
+        self.field = field
+        self.constraints: dict[int, tuple[frozenset[int], int]] = {}
+        """The masked squares around each revealed number that are not known
+        yet, and how many of them are mines."""
+        self.safe: set[int] = set()
+        self.mines: set[int] = set()
+        self.probabilities: dict[int, float] = {}
+        self._components: dict[frozenset, dict[int, float]] = {}
+        self.update(field.unmasked_squares())
+
+    def update(self, changed: Iterable[int]) -> None:
+        """Updates the analysis after the specified squares were revealed or marked"""
+        field = self.field
+        dirty = set()
+        for index in changed:
+            self.safe.discard(index)
+            self.mines.discard(index)
+            dirty.add(index)
+            dirty.update(field.neighbours(index))
+
+        for index in dirty:
+            constraint = self._constraint(index)
+            if constraint is None:
+                self.constraints.pop(index, None)
+            else:
+                self.constraints[index] = constraint
+
+        self._propagate(dirty.intersection(self.constraints))
+        self._enumerate()
+
+    def hint(self) -> Hint | None:
+        """Returns the best move: a safe square, else a mine to mark,
+        else the square least likely to hold a mine."""
+        if self.safe:
+            return Hint(min(self.safe), 0.0)
+        if self.mines:
+            return Hint(min(self.mines), 1.0)
+        if self.probabilities:
+            index = min(self.probabilities, key=self.probabilities.__getitem__)
+            return Hint(index, self.probabilities[index])
+        return None
+
+    def _constraint(self, index: int) -> tuple[frozenset[int], int] | None:
+        """Builds the constraint given by the specified square, if it is a revealed number"""
+        field = self.field
+        if (
+            field.mask_map[index]
+            or field.flag_map[index]
+            or field.mine_map[index]
+            or field.count_map[index] == 0
+        ):
+            return None
+
+        mines = field.count_map[index]
+        cells = set()
+        for neighbour in field.neighbours(index):
+            if field.flag_map[neighbour] or neighbour in self.mines:
+                mines -= 1
+            elif field.mask_map[neighbour] and neighbour not in self.safe:
+                cells.add(neighbour)
+        if not cells:
+            return None
+        return frozenset(cells), mines
+
+    def _related(self, key: int) -> set[int]:
+        """Returns the constraints sharing a square with the specified one"""
+        related = set()
+        for cell in self.constraints[key][0]:
+            for neighbour in self.field.neighbours(cell):
+                if neighbour in self.constraints:
+                    related.add(neighbour)
+        related.discard(key)
+        return related
+
+    def _propagate(self, pending: set[int]) -> None:
+        """Applies the single square and the subset rules until nothing new is found"""
+        while pending:
+            key = pending.pop()
+            if key not in self.constraints:
+                continue
+            cells, mines = self.constraints[key]
+            if mines == 0:
+                self._learn(cells, False, pending)
+                continue
+            if mines == len(cells):
+                self._learn(cells, True, pending)
+                continue
+
+            for other in self._related(key):
+                if other not in self.constraints or key not in self.constraints:
+                    continue
+                other_cells, other_mines = self.constraints[other]
+                if cells < other_cells:
+                    rest, rest_mines = other_cells - cells, other_mines - mines
+                elif other_cells < cells:
+                    rest, rest_mines = cells - other_cells, mines - other_mines
+                else:
+                    continue
+                if rest_mines == 0:
+                    self._learn(rest, False, pending)
+                elif rest_mines == len(rest):
+                    self._learn(rest, True, pending)
+
+    def _learn(self, cells: Iterable[int], mine: bool, pending: set[int]) -> None:
+        """Records the specified squares as known and removes them from the constraints"""
+        known = self.mines if mine else self.safe
+        for cell in list(cells):
+            known.add(cell)
+            for key in self.field.neighbours(cell):
+                if key not in self.constraints:
+                    continue
+                key_cells, key_mines = self.constraints[key]
+                if cell not in key_cells:
+                    continue
+                key_cells = key_cells - {cell}
+                if mine:
+                    key_mines -= 1
+                if key_cells:
+                    self.constraints[key] = (key_cells, key_mines)
+                    pending.add(key)
+                else:
+                    del self.constraints[key]
+
+    def _enumerate(self) -> None:
+        """Computes the mine probability of the frontier squares.
+        Components that did not change since the last update reuse their result."""
+        components = {}
+        probabilities = {}
+        remaining = dict(self.constraints)
+        while remaining:
+            key, (cells, mines) = remaining.popitem()
+            component = {key: (cells, mines)}
+            component_cells = set(cells)
+            pending = list(cells)
+            while pending:
+                cell = pending.pop()
+                for other in self.field.neighbours(cell):
+                    if other in remaining:
+                        other_cells, _ = component[other] = remaining.pop(other)
+                        for other_cell in other_cells - component_cells:
+                            component_cells.add(other_cell)
+                            pending.append(other_cell)
+
+            if len(component_cells) > MAX_COMPONENT_SQUARES:
+                continue
+            component_key = frozenset(component.values())
+            result = self._components.get(component_key)
+            if result is None:
+                result = enumerate_component(list(component.values()))
+            components[component_key] = result
+            probabilities.update(result)
+
+        self._components = components
+        self.probabilities = probabilities
+
+        certain_safe = [cell for cell, p in probabilities.items() if p == 0.0]
+        certain_mines = [cell for cell, p in probabilities.items() if p == 1.0]
+        if certain_safe or certain_mines:
+            pending: set[int] = set()
+            self._learn(certain_safe, False, pending)
+            self._learn(certain_mines, True, pending)
+            self._propagate(pending)
+            self._enumerate()
+
+
+def enumerate_component(
+    constraints: list[tuple[frozenset[int], int]]
+) -> dict[int, float]:
+    """Enumerates every mine layout satisfying the constraints.
+
+    Returns:
+        dict[int, float]: The share of the layouts with a mine, for every square.
+    """
+    cells = sorted(set().union(*(cells for cells, _ in constraints)))
+    position = {cell: i for i, cell in enumerate(cells)}
+    members = [[position[cell] for cell in cells] for cells, _ in constraints]
+    needed = [mines for _, mines in constraints]
+    unassigned = [len(member) for member in members]
+    cell_constraints: list[list[int]] = [[] for _ in cells]
+    for constraint, member in enumerate(members):
+        for i in member:
+            cell_constraints[i].append(constraint)
+
+    assignment = [0] * len(cells)
+    mine_layouts = [0] * len(cells)
+    layouts = 0
+
+    def assign(i: int) -> None:
+        nonlocal layouts
+        if i == len(cells):
+            layouts += 1
+            for j, mine in enumerate(assignment):
+                mine_layouts[j] += mine
+            return
+        for mine in (0, 1):
+            fits = True
+            for constraint in cell_constraints[i]:
+                left = needed[constraint] - mine
+                if left < 0 or left > unassigned[constraint] - 1:
+                    fits = False
+                    break
+            if not fits:
+                continue
+            assignment[i] = mine
+            for constraint in cell_constraints[i]:
+                needed[constraint] -= mine
+                unassigned[constraint] -= 1
+            assign(i + 1)
+            for constraint in cell_constraints[i]:
+                needed[constraint] += mine
+                unassigned[constraint] += 1
+        assignment[i] = 0
+
+    assign(0)
+    if layouts == 0:
+        return {}
+    return {cell: mine_layouts[i] / layouts for i, cell in enumerate(cells)}
@@ -0,0 +1,177 @@
+"""Watches a game of the spectator feed, rendered with ANSI escape codes.
+
+Usage: python spectate.py --socket /tmp/minesweeper-spectators.sock --game 0
+
+The viewer keeps only the cells revealed or marked, and repaints only the
+rows of the terminal the moves changed. On a field larger than the
+terminal, the view follows the last cell changed.
+"""
+
+import argparse
+import asyncio
+import shutil
+import sys
+import zlib
+from pathlib import Path
+
+from server import DELTA, FRAME, MASKED, STATUSES
+from spectator import (
+    END,
+    FEED_DELTA_HEADER,
+    KEYFRAME,
+    KEYFRAME_HEADER,
+    SPECTATOR_SOCKET,
+    WATCH,
+    WATCH_PAYLOAD,
+    decode_cells,
+)
+
+RESET = "\x1b[0m"
+GLYPHS = [
+    "\x1b[37;40m ",
+    *[f"\x1b[32;40m{count}" for count in (1, 2)],
+    *[f"\x1b[33;40m{count}" for count in (3, 4, 5)],
+    *[f"\x1b[31;40m{count}" for count in (6, 7, 8)],
+    "\x1b[31;40m*",  # MINE
+    "\x1b[31;47m*",  # FLAGGED
+    "\x1b[37;47m ",  # MASKED
+]
+"""The cells by value, in the colours of the MinesGrid styles"""
+
+
+class BoardView:
+    """The cells of a watched game, rendered as ANSI text"""
+
+    def __init__(self, columns: int = 80, rows: int = 24):
+        """
+        Args:
+            columns (int): The width of the terminal.
+            rows (int): The height of the terminal, the last row for the status.
+        """
+        self.columns = columns
+        self.rows = rows - 1
+        self.game_id = 0
+        self.width = 0
+        self.height = 0
+        self.sequence = 0
+        self.status = STATUSES[0]
+        # The value of every cell that is not masked, or is marked
+        self.cells: dict[int, int] = {}
+        self.left = 0
+        self.top = 0
+        # The rows of the field to repaint, None to repaint every row
+        self.dirty: set[int] | None = None
+
+    def apply(self, kind: int, payload: bytes) -> bool:
+        """Applies a frame of the feed.
+
+        Returns:
+            bool: False if the game ended.
+        """
+        if kind == KEYFRAME:
+            header = KEYFRAME_HEADER.unpack_from(payload)
+            self.game_id, self.sequence, self.width, self.height, status = header
+            self.status = STATUSES[status]
+            cells = zlib.decompress(payload[KEYFRAME_HEADER.size :])
+            self.cells = dict(decode_cells(cells))
+            self.dirty = None
+        elif kind == DELTA:
+            sequence, status = FEED_DELTA_HEADER.unpack_from(payload)
+            if sequence <= self.sequence:
+                return True
+            self.sequence = sequence
+            self.status = STATUSES[status]
+            cells = self.cells
+            dirty = self.dirty
+            width = self.width
+            index = None
+            for index, value in decode_cells(payload[FEED_DELTA_HEADER.size :]):
+                if value == MASKED:
+                    cells.pop(index, None)
+                else:
+                    cells[index] = value
+                if dirty is not None:
+                    dirty.add(index // width)
+            if index is not None:
+                self.follow(index)
+        return kind != END
+
+    def follow(self, index: int) -> None:
+        """Scrolls the view, when needed, to show the specified cell"""
+        y, x = divmod(index, self.width)
+        left = self.left
+        top = self.top
+        if not left <= x < left + self.columns:
+            left = max(0, min(x - self.columns // 2, self.width - self.columns))
+        if not top <= y < top + self.rows:
+            top = max(0, min(y - self.rows // 2, self.height - self.rows))
+        if (left, top) != (self.left, self.top):
+            self.left, self.top = left, top
+            self.dirty = None
+
+    def render(self) -> str:
+        """Returns the escape codes that repaint the rows changed since the
+        last render, and the status line"""
+        top = self.top
+        bottom = min(top + self.rows, self.height)
+        if self.dirty is None:
+            rows = range(top, bottom)
+            output = ["\x1b[2J"]
+        else:
+            rows = sorted(y for y in self.dirty if top <= y < bottom)
+            output = []
+        self.dirty = set()
+
+        cells = self.cells
+        width = self.width
+        start_x = self.left
+        end_x = min(start_x + self.columns, width)
+        for y in rows:
+            start = y * width
+            line = "".join(
+                GLYPHS[cells.get(index, MASKED)]
+                for index in range(start + start_x, start + end_x)
+            )
+            output.append(f"\x1b[{y - top + 1};1H{line}{RESET}")
+        output.append(
+            f"\x1b[{self.rows + 1};1H\x1b[2K"
+            f"game {self.game_id}, move {self.sequence}, {self.status.value}"
+        )
+        return "".join(output)
+
+
+async def watch(path: Path, game_id: int, view: BoardView) -> None:
+    """Renders the feed of a game until it ends"""
+    reader, writer = await asyncio.open_unix_connection(path)
+    writer.write(FRAME.pack(WATCH, WATCH_PAYLOAD.size) + WATCH_PAYLOAD.pack(game_id))
+    out = sys.stdout
+    out.write("\x1b[?25l")
+    try:
+        while True:
+            kind, size = FRAME.unpack(await reader.readexactly(FRAME.size))
+            if not view.apply(kind, await reader.readexactly(size)):
+                break
+            out.write(view.render())
+            out.flush()
+    except asyncio.IncompleteReadError:
+        pass
+    finally:
+        out.write(f"{RESET}\x1b[?25h\n")
+        writer.close()
+
+
+def main():
+    """Parse the command line and watch a game"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", type=Path, default=SPECTATOR_SOCKET)
+    parser.add_argument("--game", type=int, default=0, help="0 for the latest game")
+    args = parser.parse_args()
+    columns, rows = shutil.get_terminal_size()
+    try:
+        asyncio.run(watch(args.socket, args.game, BoardView(columns, rows)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""Spectator feed of the multiplayer games, served to many local viewers.
+
+Usage: python spectator.py --port 8765 --socket /tmp/minesweeper-spectators.sock
+
+Runs the multiplayer server of server.py and publishes every move of its
+games to the viewers connected to a local socket, watched with spectate.py.
+A viewer never runs a Textual app nor holds a field.
+
+Every message is a frame: a kind byte and a payload size, then the payload.
+From the viewer:
+    WATCH: the id of the game to watch, 0 for the latest game started
+To the viewer:
+    KEYFRAME: the game id, the sequence number of the last move, the size
+        of the field and the status of the game, then the cells revealed
+        or marked, compressed
+    DELTA: the sequence number of the move and the status of the game,
+        then the cells the move changed
+    END: the game ended, its last player left
+
+The cells are sorted by index, each one a varint of the gap since the
+previous cell, shifted left by four bits and ORed with the cell value: a
+cell of a cascade usually takes one byte, and the DELTA of a move has the
+size of its changes whatever the size of the field.
+
+A feed keeps its last keyframe and the deltas after it only, taking a new
+keyframe every keyframe_interval moves, or once the deltas outgrow the
+keyframe and KEYFRAME_MIN_INTERVAL moves were played since the last one.
+The feed keeps the played cells from the deltas it publishes, so taking a
+keyframe never reads the field. A viewer that joins gets both; a viewer
+whose unsent frames exceed MAX_BUFFER bytes is skipped, and catches up the
+same way once its connection drains. The memory of a game is bounded
+either way.
+"""
+
+import argparse
+import asyncio
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from engine import GameStatus
+from field import Field
+from server import (
+    DELTA,
+    FRAME,
+    MASKED,
+    STATUSES,
+    GameServer,
+    Player,
+    ProtocolError,
+    SharedGame,
+    cell_value,
+    encode_frame,
+)
+
+WATCH = ord("W")
+KEYFRAME = ord("K")
+END = ord("E")
+
+WATCH_PAYLOAD = struct.Struct("<Q")
+"""game id"""
+KEYFRAME_HEADER = struct.Struct("<QIIIB")
+"""game id, sequence number, width, height, game status"""
+FEED_DELTA_HEADER = struct.Struct("<IB")
+"""sequence number, game status"""
+
+VALUE_BITS = 4
+"""The bits of the cell value in the varint of a cell, values 0 to 15"""
+
+SPECTATOR_SOCKET = Path(tempfile.gettempdir()) / "minesweeper-spectators.sock"
+
+KEYFRAME_INTERVAL = 256
+"""The number of moves between two keyframes, at most"""
+
+KEYFRAME_MIN_INTERVAL = 32
+"""The number of moves between two keyframes, at least, unless the field
+is reset"""
+
+MAX_BUFFER = 1 << 18
+"""The bytes a viewer can fall behind before its deltas are skipped"""
+
+
+def encode_cells(cells: Iterable[tuple[int, int]]) -> bytes:
+    """Returns the encoding of cells, sorted by index"""
+    data = bytearray()
+    previous = -1
+    for index, value in cells:
+        word = (index - previous - 1) << VALUE_BITS | value
+        previous = index
+        while word > 0x7F:
+            data.append(word & 0x7F | 0x80)
+            word >>= 7
+        data.append(word)
+    return bytes(data)
+
+
+def decode_cells(data: bytes) -> Iterator[tuple[int, int]]:
+    """Returns the index and the value of every cell of an encoding"""
+    index = -1
+    word = 0
+    shift = 0
+    for byte in data:
+        word |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        index += (word >> VALUE_BITS) + 1
+        yield index, word & 0xF
+        word = 0
+        shift = 0
+
+
+def field_cells(field: Field, indexes: Iterable[int]) -> list[tuple[int, int]]:
+    """Returns the index and the value of the specified squares, sorted"""
+    return [(index, cell_value(field, index)) for index in sorted(indexes)]
+
+
+class SpectatorFeed:
+    """The frames of a game for its viewers: the last keyframe and the deltas
+    of the moves played after it"""
+
+    def __init__(
+        self, game_id: int, field: Field, keyframe_interval: int = KEYFRAME_INTERVAL
+    ):
+        """
+        Args:
+            game_id (int): The id of the game.
+            field (Field): The field played.
+            keyframe_interval (int): The number of moves between two keyframes.
+        """
+        self.game_id = game_id
+        self.keyframe_interval = keyframe_interval
+        self.sequence = 0
+        self.deltas: list[bytes] = []
+        self.deltas_size = 0
+        self.field = field
+        self.cells = dict(field_cells(field, field.played_squares()))
+        self.keyframe = b""
+        self.take_keyframe(GameStatus.PLAYING)
+
+    def take_keyframe(self, status: GameStatus) -> None:
+        """Encodes the played cells as the keyframe, dropping the deltas"""
+        field = self.field
+        cells = encode_cells(sorted(self.cells.items()))
+        header = KEYFRAME_HEADER.pack(
+            self.game_id,
+            self.sequence,
+            field.width,
+            field.height,
+            STATUSES.index(status),
+        )
+        self.keyframe = encode_frame(KEYFRAME, header + zlib.compress(cells))
+        self.deltas.clear()
+        self.deltas_size = 0
+
+    def publish(self, changed: Iterable[int], status: GameStatus) -> bytes:
+        """Records the squares changed by a move.
+
+        Returns:
+            bytes: The DELTA frame of the move.
+        """
+        self.sequence += 1
+        cells = field_cells(self.field, changed)
+        for index, value in cells:
+            if value == MASKED:
+                self.cells.pop(index, None)
+            else:
+                self.cells[index] = value
+        header = FEED_DELTA_HEADER.pack(self.sequence, STATUSES.index(status))
+        frame = encode_frame(DELTA, header + encode_cells(cells))
+        self.deltas.append(frame)
+        self.deltas_size += len(frame)
+        moves = len(self.deltas)
+        outgrown = self.deltas_size > len(self.keyframe)
+        if moves >= self.keyframe_interval or (
+            outgrown and moves >= KEYFRAME_MIN_INTERVAL
+        ):
+            self.take_keyframe(status)
+        return frame
+
+    def reset(self, field: Field) -> bytes:
+        """Starts the feed of a new field.
+
+        Returns:
+            bytes: The KEYFRAME frame of the field.
+        """
+        self.field = field
+        self.cells = dict(field_cells(field, field.played_squares()))
+        self.sequence += 1
+        self.take_keyframe(GameStatus.PLAYING)
+        return self.keyframe
+
+    def catch_up(self) -> list[bytes]:
+        """Returns the frames that bring a viewer to the current move"""
+        return [self.keyframe, *self.deltas]
+
+
+class Viewer:
+    """A connection to the feed of one game"""
+
+    __slots__ = ("writer", "feed", "lagging")
+
+    def __init__(self, writer: asyncio.StreamWriter, feed: SpectatorFeed):
+        self.writer = writer
+        self.feed = feed
+        self.lagging = False
+
+    def send(self, frame: bytes) -> None:
+        """Writes a frame, or skips it when the viewer is too far behind"""
+        writer = self.writer
+        if writer.is_closing():
+            return
+        if writer.transport.get_write_buffer_size() > MAX_BUFFER:
+            self.lagging = True
+        elif self.lagging:
+            # The frame is the last one of the feed
+            self.lagging = False
+            writer.writelines(self.feed.catch_up())
+        else:
+            writer.write(frame)
+
+
+class SpectatedGame(SharedGame):
+    """A game played by several players and watched by viewers"""
+
+    def __init__(self, game_id: int, game_type_index: int):
+        super().__init__(game_id, game_type_index)
+        self.feed = SpectatorFeed(game_id, self.engine.field)
+        self.viewers: list[Viewer] = []
+
+    def play(self, player: Player, moves: list[tuple[int, int, int]]) -> list[int]:
+        """Applies a batch of moves and sends the changed cells to the players
+        and the viewers"""
+        changed = super().play(player, moves)
+        if changed:
+            frame = self.feed.publish(changed, self.engine.status)
+            for viewer in self.viewers:
+                viewer.send(frame)
+        return changed
+
+    def restart(self) -> None:
+        """Starts a new field and sends it to every player and viewer"""
+        super().restart()
+        frame = self.feed.reset(self.engine.field)
+        for viewer in self.viewers:
+            viewer.send(frame)
+
+    def end(self) -> None:
+        """Tells the viewers that the game ended, and disconnects them"""
+        frame = encode_frame(END, b"")
+        for viewer in self.viewers:
+            viewer.writer.write(frame)
+            viewer.writer.close()
+        self.viewers.clear()
+
+
+class SpectatorServer(GameServer):
+    """The multiplayer server, also serving the feeds of its games"""
+
+    game_class = SpectatedGame
+
+    async def handle_viewer(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serves one viewer until it disconnects or its game ends"""
+        game = None
+        viewer = None
+        try:
+            kind, size = FRAME.unpack(await reader.readexactly(FRAME.size))
+            if kind != WATCH or size != WATCH_PAYLOAD.size:
+                raise ProtocolError(f"Unexpected frame {kind}")
+            (game_id,) = WATCH_PAYLOAD.unpack(await reader.readexactly(size))
+            if game_id == 0 and self.games:
+                game_id = max(self.games)
+            game = self.games.get(game_id)
+            if game is None:
+                writer.write(encode_frame(END, b""))
+                return
+            viewer = Viewer(writer, game.feed)
+            game.viewers.append(viewer)
+            writer.writelines(game.feed.catch_up())
+            # A viewer sends nothing more, read until it disconnects
+            while await reader.read(MAX_BUFFER):
+                pass
+        except (asyncio.IncompleteReadError, ConnectionError, ProtocolError):
+            pass
+        finally:
+            if viewer is not None and viewer in game.viewers:
+                game.viewers.remove(viewer)
+            writer.close()
+
+    def leave(self, player: Player) -> None:
+        """Removes a player from their game, ending the game if it is empty"""
+        game = player.game
+        super().leave(player)
+        if game is not None and not game.players:
+            game.end()
+
+    async def serve_viewers(self, path: Path) -> asyncio.Server:
+        """Starts listening for viewers on a local socket"""
+        path.unlink(missing_ok=True)
+        return await asyncio.start_unix_server(self.handle_viewer, path)
+
+
+async def run(host: str, port: int, path: Path) -> None:
+    """Serves until interrupted"""
+    game_server = SpectatorServer()
+    server = await game_server.serve(host, port)
+    viewers = await game_server.serve_viewers(path)
+    address = server.sockets[0].getsockname()
+    print(f"Serving on {address[0]}:{address[1]}, viewers on {path}")
+    async with server, viewers:
+        await asyncio.gather(server.serve_forever(), viewers.serve_forever())
+
+
+def main():
+    """Parse the command line and run the server"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", type=Path, default=SPECTATOR_SOCKET)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,45 @@
 """Contains the square class"""
 
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from field import Field
+
 
 class Square:
-    """Contains the information for a field's square"""
+    """A lightweight view over one square of a field.
+    The square's state is stored in the field's packed buffers."""
+
+    __slots__ = ("field", "x", "y", "index")
+
+    def __init__(self, field: "Field", x: int, y: int):
+        self.field = field
+        self.x = x
+        self.y = y
+        self.index = y * field.width + x
+
+    @property
+    def mine(self) -> bool:
+        """True if there is a mine on the square"""
+        return self.field.mine_map[self.index] == 1
+
+    @property
+    def mask(self) -> bool:
+        """True if the square was not revealed yet"""
+        return self.field.mask_map[self.index] == 1
+
+    @property
+    def flag(self) -> bool:
+        """True if the square is marked as a mine"""
+        return self.field.flag_map[self.index] == 1
 
-    def __init__(self):
-        self.mine = False
-        self.mask = True
-        self.flag = False
-        self.mines = 0
+    @property
+    def mines(self) -> int:
+        """The number of adjacent mines, or -1 if the square holds a mine"""
+        if self.mine:
+            return -1
+        return self.field.count_map[self.index]
 
     def toggle_mine_marker(self):
         """Toggles the mine marker on the specified square"""
-        if (not self.mask) and (not self.flag):
-            return
-        self.flag = not self.flag
-        self.mask = not self.flag
+        self.field.toggle_mine_marker(self.x, self.y)
@@ -0,0 +1,20 @@
+"""Start-up timing marks, reported by `main.py --startup-profile`"""
+
+import time
+
+START = time.perf_counter()
+"""When the first module of the game was imported"""
+
+MARKS: dict[str, float] = {}
+
+
+def mark(name: str) -> None:
+    """Records the time elapsed since START, the first time name is reached"""
+    MARKS.setdefault(name, time.perf_counter() - START)
+
+
+def report() -> str:
+    """Returns the marks, in the order they were reached"""
+    return "\n".join(
+        f"{name:>16}: {elapsed * 1000:8.1f} ms" for name, elapsed in MARKS.items()
+    )
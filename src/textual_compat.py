@@ -0,0 +1,71 @@
+"""The private members of Textual used by the session server.
+
+Textual has no public API to share the parsed CSS between apps, to parse
+terminal input without a terminal, or to resize a driver, so this module
+is the only one reaching into it. The members are those of the version
+pinned in requirements.txt, any other version is refused at import.
+"""
+
+from importlib.metadata import version
+
+from textual._xterm_parser import XTermParser
+from textual.css.model import RuleSet
+from textual.css.stylesheet import Stylesheet
+from textual.driver import Driver
+
+TEXTUAL_VERSION = "0.26.0"
+"""The version of Textual whose private members are used"""
+
+if version("textual") != TEXTUAL_VERSION:
+    raise ImportError(
+        f"The session server needs textual=={TEXTUAL_VERSION}, "
+        f"found {version('textual')}"
+    )
+
+PARSED_RULES: dict[tuple, list[RuleSet]] = {}
+"""The rules parsed from every CSS source, shared by the sessions"""
+
+
+class SharedStylesheet(Stylesheet):
+    """A stylesheet that parses each CSS source once per process.
+
+    The parsed rules are not modified once built, so the sessions share
+    them instead of parsing the CSS of the app and of every widget again.
+    """
+
+    def _parse_rules(self, css, path, is_default_rules=False, tie_breaker=0):
+        key = (
+            css,
+            str(path),
+            is_default_rules,
+            tie_breaker,
+            tuple(sorted(self._variables.items())),
+        )
+        rules = PARSED_RULES.get(key)
+        if rules is None:
+            rules = PARSED_RULES[key] = super()._parse_rules(
+                css, path, is_default_rules, tie_breaker
+            )
+        return list(rules)
+
+    def copy(self) -> Stylesheet:
+        stylesheet = SharedStylesheet(variables=self._variables.copy())
+        stylesheet.source = self.source.copy()
+        return stylesheet
+
+    def reparse(self) -> None:
+        stylesheet = SharedStylesheet(variables=self._variables)
+        stylesheet.source = self.source.copy()
+        stylesheet.parse()
+        self._rules = stylesheet.rules
+        self._rules_map = None
+
+
+def input_parser(debug: bool = False) -> XTermParser:
+    """Returns a parser of terminal input into Textual events"""
+    return XTermParser(lambda: False, debug)
+
+
+def set_driver_size(driver: Driver, size: tuple[int, int]) -> None:
+    """Sets the terminal size a driver reports to its app"""
+    driver._size = size  # pylint: disable=protected-access
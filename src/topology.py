@@ -0,0 +1,184 @@
+"""The topologies of a field: which squares are adjacent to each other.
+
+The squares are always stored in rows, indexed by `y * width + x`; the
+topology decides their neighbours:
+    rectangle: the eight surrounding squares, inside the field
+    torus: the eight surrounding squares, the edges wrapping around
+    hexagonal: six squares, the odd rows shifted right by half a square
+
+The neighbours of a rectangle are computed from the coordinates of the
+square. For the other topologies, the neighbours of every square are
+precomputed into a NeighbourTable, in compressed sparse rows: the
+neighbours of square i are `indexes[offsets[i] : offsets[i + 1]]`. The
+tables never change, so the fields of the same shape share one table.
+"""
+
+from array import array
+from collections import OrderedDict
+from typing import NamedTuple
+
+RECTANGLE = "rectangle"
+TORUS = "torus"
+HEXAGONAL = "hexagonal"
+
+TOPOLOGIES = (RECTANGLE, TORUS, HEXAGONAL)
+"""The topologies, in the order of their codes in board_format"""
+
+SQUARE_DIRECTIONS = (
+    (0, -1),
+    (-1, -1),
+    (1, -1),
+    (-1, 0),
+    (1, 0),
+    (0, 1),
+    (-1, 1),
+    (1, 1),
+)
+"""The x, y offsets of the neighbours of the rectangle and the torus"""
+EVEN_ROW_DIRECTIONS = ((-1, -1), (0, -1), (-1, 0), (1, 0), (-1, 1), (0, 1))
+ODD_ROW_DIRECTIONS = ((0, -1), (1, -1), (-1, 0), (1, 0), (0, 1), (1, 1))
+"""The x, y offsets of the hexagonal neighbours, by row parity"""
+
+TABLE_CACHE_BYTES = 16 << 20
+"""The size of the neighbour tables kept for the fields of the same shape"""
+
+
+class NeighbourTable(NamedTuple):
+    """The neighbours of every square of a field, in compressed sparse rows"""
+
+    offsets: array
+    """Where the neighbours of each square start in indexes, one more for the end"""
+    indexes: array
+    """The indexes of the neighbours, square after square"""
+
+    def size(self) -> int:
+        """Returns the size of the table, in bytes"""
+        offsets, indexes = self
+        return offsets.itemsize * len(offsets) + indexes.itemsize * len(indexes)
+
+
+_tables: OrderedDict[tuple[str, int, int], NeighbourTable] = OrderedDict()
+"""The cached tables, the least recently used first"""
+
+
+def rectangle_neighbours(width: int, height: int, index: int) -> list[int]:
+    """Returns the indexes of the squares adjacent to a square of a rectangle"""
+    y, x = divmod(index, width)
+    last_x = width - 1
+    neighbours = []
+    if y > 0:
+        above = index - width
+        neighbours.append(above)
+        if x > 0:
+            neighbours.append(above - 1)
+        if x < last_x:
+            neighbours.append(above + 1)
+    if x > 0:
+        neighbours.append(index - 1)
+    if x < last_x:
+        neighbours.append(index + 1)
+    if y < height - 1:
+        below = index + width
+        neighbours.append(below)
+        if x > 0:
+            neighbours.append(below - 1)
+        if x < last_x:
+            neighbours.append(below + 1)
+    return neighbours
+
+
+def row_directions(topology: str, y: int) -> tuple[tuple[int, int], ...]:
+    """Returns the offsets of the neighbours of the squares of a row"""
+    if topology == HEXAGONAL:
+        return ODD_ROW_DIRECTIONS if y % 2 else EVEN_ROW_DIRECTIONS
+    return SQUARE_DIRECTIONS
+
+
+def square_neighbours(
+    topology: str, width: int, height: int, x: int, y: int
+) -> list[int]:
+    """Returns the indexes of the neighbours of one square, each one once"""
+    index = y * width + x
+    neighbours = []
+    for dx, dy in row_directions(topology, y):
+        neighbour_x, neighbour_y = x + dx, y + dy
+        if topology == TORUS:
+            neighbour_x %= width
+            neighbour_y %= height
+        elif not (0 <= neighbour_x < width and 0 <= neighbour_y < height):
+            continue
+        neighbour = neighbour_y * width + neighbour_x
+        if neighbour != index and neighbour not in neighbours:
+            neighbours.append(neighbour)
+    return neighbours
+
+
+def neighbour_table(topology: str, width: int, height: int) -> NeighbourTable:
+    """Returns the neighbours of every square of a field, shared by the fields
+    of the same shape.
+
+    The least recently used tables are dropped once the cached ones take
+    more than TABLE_CACHE_BYTES, a larger table is not cached at all.
+    """
+    key = (topology, width, height)
+    table = _tables.get(key)
+    if table is not None:
+        _tables.move_to_end(key)
+        return table
+    table = build_neighbour_table(topology, width, height)
+    if table.size() <= TABLE_CACHE_BYTES:
+        _tables[key] = table
+        while sum(cached.size() for cached in _tables.values()) > TABLE_CACHE_BYTES:
+            _tables.popitem(last=False)
+    return table
+
+
+def build_neighbour_table(topology: str, width: int, height: int) -> NeighbourTable:
+    """Returns the neighbours of every square of a field.
+
+    The first and last squares of each row are computed one by one; the
+    squares in between have the same neighbours shifted by one square,
+    so each of their directions is filled in one slice assignment.
+
+    Raises:
+        ValueError: If the topology is unknown.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology {topology}")
+    offsets = array("I", [0])
+    indexes = array("I")
+    # A narrower torus has neighbours that are the same square twice
+    inner = width - 2
+    if inner < 1 or (topology == TORUS and height < 3):
+        inner = 0
+
+    for y in range(height):
+        if not inner:
+            for x in range(width):
+                indexes.extend(square_neighbours(topology, width, height, x, y))
+                offsets.append(len(indexes))
+            continue
+
+        indexes.extend(square_neighbours(topology, width, height, 0, y))
+        offsets.append(len(indexes))
+
+        starts = []
+        for dx, dy in row_directions(topology, y):
+            neighbour_y = y + dy
+            if topology == TORUS:
+                neighbour_y %= height
+            elif not 0 <= neighbour_y < height:
+                continue
+            starts.append(neighbour_y * width + 1 + dx)
+        degree = len(starts)
+        block = array("I", [0]) * (degree * inner)
+        for slot, start in enumerate(starts):
+            block[slot::degree] = array("I", range(start, start + inner))
+        first = len(indexes)
+        indexes.extend(block)
+        offsets.extend(range(first + degree, len(indexes) + 1, degree))
+
+        indexes.extend(square_neighbours(topology, width, height, width - 1, y))
+        offsets.append(len(indexes))
+
+    return NeighbourTable(offsets, indexes)